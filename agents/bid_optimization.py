@@ -1,12 +1,20 @@
+import os
+import json
+import math
+import re
 import logging
-from apis.gemini_client import generate_content
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from apis.gemini_client import generate_content, generate_content_stream
+from utils.telemetry import traced, log_payload, span, increment
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@traced("agent.bid_optimization")
 def bid_optimization_agent(state):
-    logger.info(f"Bid optimization agent received state: {state}")
+    log_payload(logger, "Bid optimization agent received state", state)
     project_data = state.get("project_data", "")
     logger.info(f"Extracted project_data from state: {project_data}")
     if not isinstance(state, dict):
@@ -17,9 +25,139 @@ def bid_optimization_agent(state):
             logger.error("No project data provided for bid optimization")
             return {"optimal_bid": "Error: Please provide valid project data", "error": "No project data provided"}
         prompt = f"Provide a realistic bid optimization suggestion for a builder or contractor for the following project in India 2025: {project_data}. Include a total bid amount in INR, a breakdown of costs (materials, labor, overhead), and a competitive margin suggestion."
+        if state.get("stream", False):
+            # Caller renders the chunks incrementally; the final text is cached like a normal reply
+            return {"project_data": project_data, "optimal_bid_stream": generate_content_stream(prompt)}
         optimal_bid = generate_content(prompt)
-        logger.info(f"Generated optimal bid: {optimal_bid}")
+        log_payload(logger, "Generated optimal bid", optimal_bid)
         return {"project_data": project_data, "optimal_bid": optimal_bid}
     except Exception as e:
         logger.error(f"Error in bid_optimization_agent: {str(e)}")
-        return {"optimal_bid": f"Error optimizing bid: {str(e)}", "error": f"API error: {str(e)}"}
\ No newline at end of file
+        return {"optimal_bid": f"Error optimizing bid: {str(e)}", "error": f"API error: {str(e)}"}
+
+# State fields this agent reads (used to skip re-runs when none changed)
+bid_optimization_agent.reads = ("project_data", "stream")
+
+# Batch mode: several projects per Gemini request, answered as JSON that must match BID_SCHEMA
+BID_BATCH_SIZE = int(os.getenv("BID_BATCH_SIZE", "10"))
+BID_BATCH_WORKERS = int(os.getenv("BID_BATCH_WORKERS", "4"))
+BID_MAX_RETRIES = int(os.getenv("BID_MAX_RETRIES", "2"))
+# A bid is rejected when its total is this far (as a fraction) from (materials + labor + overhead) * (1 + margin)
+BID_TOTAL_TOLERANCE = float(os.getenv("BID_TOTAL_TOLERANCE", "0.1"))
+BID_FIELDS = ["total_bid", "materials", "labor", "overhead", "margin_percent"]
+BID_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "id": {"type": "string"},
+            "total_bid": {"type": "number", "description": "Total bid in INR"},
+            "materials": {"type": "number", "description": "Materials cost in INR"},
+            "labor": {"type": "number", "description": "Labor cost in INR"},
+            "overhead": {"type": "number", "description": "Overhead cost in INR"},
+            "margin_percent": {"type": "number", "description": "Suggested margin over cost, in percent"},
+            "notes": {"type": "string", "description": "One-sentence rationale"},
+        },
+        "required": ["id", *BID_FIELDS],
+    },
+}
+BID_GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": BID_SCHEMA}
+
+def _batch_prompt(items):
+    projects = "\n".join(f"- id {item_id}: {project}" for item_id, project in items)
+    return ("You are pricing construction bids for a builder or contractor in India 2025. For each project below, "
+            "return one object with its id, a realistic total bid in INR, the materials, labor and overhead costs in INR, "
+            "and a competitive margin percent, so that total_bid = (materials + labor + overhead) * (1 + margin_percent / 100).\n"
+            f"{projects}")
+
+def _parse_bids(text):
+    # Schema-constrained replies are bare JSON; fenced replies are tolerated
+    text = str(text or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`").split("\n", 1)[-1]
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get("bids", [data])
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array of bids")
+    return data
+
+def validate_bid(item):
+    # Returns (bid, None) for a usable bid, otherwise (None, reason)
+    if not isinstance(item, dict):
+        return None, "not an object"
+    bid = {}
+    for field in BID_FIELDS:
+        try:
+            value = float(item.get(field))
+        except (TypeError, ValueError):
+            return None, f"{field} is missing or not a number"
+        if not math.isfinite(value) or value < 0:
+            return None, f"{field} must be a non-negative number"
+        bid[field] = value
+    if bid["total_bid"] <= 0:
+        return None, "total_bid must be positive"
+    if bid["margin_percent"] > 100:
+        return None, "margin_percent above 100"
+    expected = (bid["materials"] + bid["labor"] + bid["overhead"]) * (1 + bid["margin_percent"] / 100)
+    if abs(expected - bid["total_bid"]) > BID_TOTAL_TOLERANCE * bid["total_bid"]:
+        return None, f"total_bid {bid['total_bid']:,.0f} does not match breakdown and margin ({expected:,.0f})"
+    bid["notes"] = str(item.get("notes") or "")
+    return bid, None
+
+def _run_batch(items, bypass_cache):
+    # One Gemini call for a chunk of (id, project); returns {id: bid} and {id: reason} for the ones that failed
+    text = generate_content(_batch_prompt(items), generation_config=BID_GENERATION_CONFIG, bypass_cache=bypass_cache)
+    if str(text).startswith("Error"):
+        return {}, {item_id: text for item_id, _ in items}
+    try:
+        replies = _parse_bids(text)
+    except ValueError as e:
+        return {}, {item_id: f"Invalid JSON response: {str(e)}" for item_id, _ in items}
+    bids, errors = {}, {}
+    # Ids are matched on their digits, so "3", 3 and "id 3" all name the same item
+    by_id = {re.sub(r"\D", "", str(reply.get("id"))): reply for reply in replies if isinstance(reply, dict)}
+    for item_id, _ in items:
+        bid, reason = validate_bid(by_id[item_id]) if item_id in by_id else (None, "missing from response")
+        if bid is None:
+            errors[item_id] = reason
+        else:
+            bids[item_id] = bid
+    return bids, errors
+
+def bid_optimization_batch(projects, batch_size=BID_BATCH_SIZE, max_retries=BID_MAX_RETRIES, max_workers=BID_BATCH_WORKERS):
+    # Structured bids for many project descriptions, BID_BATCH_SIZE per Gemini call; only failed items are retried
+    import pandas as pd
+    projects = [str(p or "").strip() for p in projects]
+    pending = [(str(i), project) for i, project in enumerate(projects) if project]
+    bids, errors = {}, {str(i): "No project data provided" for i, project in enumerate(projects) if not project}
+    calls = 0
+    with span("agent.bid_optimization_batch", projects=len(projects)) as current:
+        for attempt in range(max_retries + 1):
+            if not pending:
+                break
+            chunks = [pending[i:i + max(1, batch_size)] for i in range(0, len(pending), max(1, batch_size))]
+            # Retries skip the response cache so a rejected answer is not served again
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks))), thread_name_prefix="bid-batch") as pool:
+                outcomes = list(pool.map(lambda chunk: contextvars.copy_context().run(_run_batch, chunk, attempt > 0), chunks))
+            calls += len(chunks)
+            failed = {}
+            for chunk_bids, chunk_errors in outcomes:
+                bids.update(chunk_bids)
+                failed.update(chunk_errors)
+            errors.update(failed)
+            for item_id in bids:
+                errors.pop(item_id, None)
+            if failed:
+                logger.warning(f"Bid batch attempt {attempt + 1}: {len(failed)} of {len(pending)} items failed validation")
+                if attempt < max_retries:
+                    increment("agent.bid_optimization_batch.retried_items", len(failed))
+            pending = [(item_id, project) for item_id, project in pending if item_id in failed]
+        current.set(calls=calls, failed=len(errors))
+    logger.info(f"Bid batch priced {len(bids)} of {len(projects)} projects in {calls} Gemini calls")
+    rows = []
+    for i, project in enumerate(projects):
+        bid = bids.get(str(i), {})
+        rows.append({"project_data": project, **{field: bid.get(field) for field in BID_FIELDS},
+                     "notes": bid.get("notes", ""), "error": errors.get(str(i), "")})
+    return pd.DataFrame(rows, columns=["project_data", *BID_FIELDS, "notes", "error"])
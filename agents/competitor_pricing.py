@@ -1,15 +1,37 @@
 import logging
-from apis.tavily_client import tavily_client
+from apis.search import search_client, has_unit_price
 from utils.helpers import extract_competitor_prices
+from utils.extraction import parse_search_response
+from utils.price_observations import get_observation_store, is_fresh, format_aggregate, format_amount
+from utils.telemetry import traced, log_payload
+from utils.gazetteer import resolve_location, format_place, unresolved_message
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _summary(store, project_type, location_keys, fresh_only):
+    # Most specific location first; fresh_only requires enough recent quotes to answer without searching
+    for key in location_keys:
+        aggregate = store.aggregate("competitor", project_type, key)
+        if aggregate is not None and (is_fresh(aggregate) or not fresh_only):
+            return aggregate
+    return None
+
+def _from_summary(project_type, location, place, summary):
+    prices = [
+        format_aggregate(summary),
+        f"Range {format_amount(summary.low)}–{format_amount(summary.high)} {summary.unit}".rstrip(),
+    ]
+    return {"project_type": project_type, "location": location, "competitor_prices": prices,
+            "resolved_location": format_place(place), "place": place._asdict(),
+            "price_summary": summary._asdict(), "price_source": "observations"}
+
+@traced("agent.competitor_pricing")
 def competitor_pricing_agent(state):
-    logger.info(f"Competitor pricing agent received state: {state}")
+    log_payload(logger, "Competitor pricing agent received state", state)
     project_type = state.get("project_type", "")
-    location = state.get("location", "").lower()
+    location = state.get("location", "")
     logger.info(f"Extracted project_type from state: {project_type}, location: {location}")
     if not isinstance(state, dict):
         logger.error(f"Invalid state type: {type(state)}")
@@ -18,11 +40,35 @@ def competitor_pricing_agent(state):
         if not all([project_type, location]):
             logger.error("No project type or location provided for competitor pricing")
             return {"competitor_prices": ["Error: Please provide a valid project type and location"], "error": "No project type or location provided"}
-        query = f"competitor pricing for {project_type} construction projects in {location} India 2025 area-wise"
-        results = tavily_client.search(query)
-        logger.info(f"Tavily API results for {query}: {results}")
-        prices = extract_competitor_prices(results)
+        resolution = resolve_location(location)
+        if resolution.place is None:
+            message = unresolved_message(resolution)
+            logger.warning(message)
+            return {"competitor_prices": [f"Error: {message}"], "error": message}
+        place = resolution.place
+        # Observations are kept for the resolved place and rolled up to its state
+        location_keys = [format_place(place), place.state]
+        store = get_observation_store()
+        if not state.get("force_refresh", False):
+            summary = _summary(store, project_type, location_keys, fresh_only=True)
+            if summary is not None:
+                logger.info(f"Answering competitor pricing for {project_type} in {summary.location_key} from {summary.count} stored quotes")
+                return _from_summary(project_type, location, place, summary)
+        # Canonical names keep the search query (and its cache key) stable across spellings
+        query = f"competitor pricing for {project_type} construction projects in {format_place(place)} India 2025 area-wise"
+        results = search_client.search(query, accept=has_unit_price, bypass_cache=state.get("force_refresh", False))
+        log_payload(logger, f"Search results for {query}", results)
+        parsed = parse_search_response(results)
+        prices = extract_competitor_prices(parsed)
+        priced = [record for record in parsed.prices if record.unit]
+        # Cached responses were recorded when first fetched
+        if priced and results.get("upstream"):
+            store.record("competitor", project_type, location_keys, priced, source=query)
         if not prices or all("no competitor pricing" in p.lower() for p in prices):
+            # Older or sparser stored quotes beat hard-coded figures
+            summary = _summary(store, project_type, location_keys, fresh_only=False)
+            if summary is not None:
+                return _from_summary(project_type, location, place, summary)
             # Realistic mock data for builders, area-wise for Rajasthan and Delhi
             mock_prices = {
                 "residential construction": {
@@ -50,9 +96,18 @@ def competitor_pricing_agent(state):
                     ]
                 }
             }
-            prices = mock_prices.get(project_type.lower(), {}).get(location, ["No realistic competitor pricing data available for this area"])
+            prices = mock_prices.get(project_type.lower(), {}).get(place.state.lower(), ["No realistic competitor pricing data available for this area"])
             logger.info(f"Using mock competitor prices for {project_type} in {location}: {prices}")
-        return {"project_type": project_type, "location": location, "competitor_prices": prices}
+        result = {"project_type": project_type, "location": location, "competitor_prices": prices,
+                  "resolved_location": format_place(place), "place": place._asdict(), "price_source": "search",
+                  "search_provider": results.get("provider")}
+        summary = _summary(store, project_type, location_keys, fresh_only=False)
+        if summary is not None:
+            result["price_summary"] = summary._asdict()
+        return result
     except Exception as e:
         logger.error(f"Error in competitor_pricing_agent: {str(e)}")
-        return {"competitor_prices": ["Error fetching competitor prices"], "error": f"API error: {str(e)}"}
\ No newline at end of file
+        return {"competitor_prices": ["Error fetching competitor prices"], "error": f"API error: {str(e)}"}
+
+# State fields this agent reads (used to skip re-runs when none changed)
+competitor_pricing_agent.reads = ("project_type", "location", "force_refresh")
@@ -1,17 +1,44 @@
 import logging
+from utils.telemetry import traced, log_payload
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Material prices per sqft (2025 India estimates)
+MATERIAL_PRICES = {
+    "Bricks": 8.0 / 100,  # ₹ per sqft
+    "Cement": 4.0 / 100,  # ₹ per sqft
+    "Steel": 6.0 / 100    # ₹ per sqft
+}
+ALT_MATERIAL_PRICES = {
+    "Bricks": 8.0 / 100,
+    "Cement": 4.0 / 100,
+    "Steel": 6.0 / 100
+}
+DEFAULT_MATERIAL_PRICE = 100.0 / 100
+
+# Base cost per sqft based on building type (matched case-insensitively)
+BASE_COST_PER_SQFT = {
+    "residential": 2000.0,
+    "commercial": 2500.0,
+    "industrial": 3000.0
+}
+DEFAULT_BASE_COST = 2000.0
+DEFAULT_LABOR_RATE = 500.0  # ₹ per sqft
+
+# Approx 1.5 months per 1000 sqft per floor
+MONTHS_PER_1000_SQFT_FLOOR = 1.5
+
+@traced("agent.cost_estimation")
 def cost_estimation_agent(state):
-    logger.info(f"Cost estimation agent received state: {state}")
+    log_payload(logger, "Cost estimation agent received state", state)
     building_type = state.get("building_type", "Residential")
     location = state.get("location", "")
     floors = state.get("floors", 1)
     area_sqft = state.get("area_sqft", 1000)
     material = state.get("material", "Bricks")
-    labor_cost = state.get("labor_cost", 500.0 * area_sqft)
+    labor_cost = state.get("labor_cost", DEFAULT_LABOR_RATE * area_sqft)
     alternative_material = state.get("alternative_material", "Bricks")
     logger.info(f"Extracted from state: building_type={building_type}, location={location}, floors={floors}, area_sqft={area_sqft}, material={material}, labor_cost={labor_cost}, alternative_material={alternative_material}")
     if not isinstance(state, dict):
@@ -21,39 +48,21 @@ def cost_estimation_agent(state):
         if not all([location, material]):
             logger.error("Missing required fields for cost estimation")
             return {"total_cost": 0.0, "error": "Missing required fields (Location and Material)"}
-        
-        # Material prices per sqft (2025 India estimates)
-        material_prices = {
-            "Bricks": 8.0 / 100,  # ₹ per sqft
-            "Cement": 4.0 / 100,  # ₹ per sqft
-            "Steel": 6.0 / 100    # ₹ per sqft
-        }
-        alt_material_prices = {
-            "Bricks": 8.0 / 100,
-            "Cement": 4.0 / 100,
-            "Steel": 6.0 / 100
-        }
 
-        # Base cost per sqft based on building type
-        base_cost_per_sqft = {
-            "Residential": 2000.0,
-            "Commercial": 2500.0,
-            "Industrial": 3000.0
-        }
-        base_cost = base_cost_per_sqft.get(building_type.lower(), 2000.0) * area_sqft
+        base_cost = BASE_COST_PER_SQFT.get(building_type.lower(), DEFAULT_BASE_COST) * area_sqft
 
         # Total material cost
-        material_cost = material_prices.get(material, 100.0 / 100) * area_sqft
+        material_cost = MATERIAL_PRICES.get(material, DEFAULT_MATERIAL_PRICE) * area_sqft
         total_cost = base_cost + material_cost + labor_cost
         logger.info(f"Calculated total cost: {total_cost}")
 
         # Alternative material cost for optimization
-        alt_material_cost = alt_material_prices.get(alternative_material, 100.0 / 100) * area_sqft
+        alt_material_cost = ALT_MATERIAL_PRICES.get(alternative_material, DEFAULT_MATERIAL_PRICE) * area_sqft
         alt_total_cost = base_cost + alt_material_cost + labor_cost
         logger.info(f"Alternative cost with {alternative_material}: {alt_total_cost}")
 
-        # Estimate time (approx 1.5 months per 1000 sqft per floor)
-        time_months = (floors * (area_sqft / 1000)) * 1.5
+        # Estimate time
+        time_months = (floors * (area_sqft / 1000)) * MONTHS_PER_1000_SQFT_FLOOR
         logger.info(f"Estimated time: {time_months} months")
 
         return {
@@ -65,8 +74,93 @@ def cost_estimation_agent(state):
             "labor_cost": labor_cost,
             "total_cost": total_cost,
             "estimated_time": time_months,
-            "alternative_cost": alt_total_cost if alt_material != material else None
+            "alternative_cost": alt_total_cost if alternative_material != material else None
         }
     except Exception as e:
         logger.error(f"Error in cost_estimation_agent: {str(e)}")
-        return {"total_cost": 0.0, "error": f"Calculation error: {str(e)}"}
\ No newline at end of file
+        return {"total_cost": 0.0, "error": f"Calculation error: {str(e)}"}
+
+# State fields this agent reads (used to skip re-runs when none changed)
+cost_estimation_agent.reads = ("building_type", "location", "floors", "area_sqft", "material", "labor_cost", "alternative_material")
+
+# Columns accepted by cost_estimation_batch; labor_rate (₹ per sqft) is used when labor_cost is absent
+BATCH_COLUMNS = ["building_type", "location", "floors", "area_sqft", "material", "labor_cost", "labor_rate", "alternative_material"]
+
+# NumPy/pandas are only needed by the batch path, so they are imported on first use
+def _text_column(df, name, default):
+    import numpy as np
+    import pandas as pd
+    # Factorize once so table lookups run per distinct value instead of per row
+    if name not in df:
+        return np.zeros(len(df), dtype=np.intp), np.array([default], dtype=object)
+    codes, uniques = pd.factorize(df[name], use_na_sentinel=False)
+    uniques = np.array([default if pd.isna(u) else str(u) for u in uniques], dtype=object)
+    # Missing cells may collapse onto an existing value, so re-deduplicate the cleaned uniques
+    uniques, inverse = np.unique(uniques, return_inverse=True)
+    return inverse.reshape(-1)[codes], uniques
+
+def _lookup(codes, uniques, table, default, lower=False):
+    import numpy as np
+    rates = np.array([table.get(u.lower() if lower else u, default) for u in uniques], dtype=np.float64)
+    return rates[codes]
+
+def _numeric_column(df, name, default):
+    import numpy as np
+    import pandas as pd
+    if name not in df:
+        return np.full(len(df), default, dtype=np.float64)
+    values = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=np.float64)
+    return np.where(pd.isna(df[name]).to_numpy(), default, values)
+
+def cost_estimation_batch(projects):
+    # Vectorized cost_estimation_agent over a table of projects (DataFrame, list of dicts or dict of columns)
+    import numpy as np
+    import pandas as pd
+    df = projects if isinstance(projects, pd.DataFrame) else pd.DataFrame(projects)
+    df = df.rename(columns=lambda c: str(c).strip().lower())
+    n = len(df)
+    logger.info(f"Cost estimation batch received {n} rows")
+
+    type_codes, type_values = _text_column(df, "building_type", "Residential")
+    location_codes, location_values = _text_column(df, "location", "")
+    material_codes, material_values = _text_column(df, "material", "Bricks")
+    alt_codes, alt_values = _text_column(df, "alternative_material", "Bricks")
+    floors = _numeric_column(df, "floors", 1)
+    area = _numeric_column(df, "area_sqft", 1000)
+    labor_rate = _numeric_column(df, "labor_rate", DEFAULT_LABOR_RATE)
+    labor = _numeric_column(df, "labor_cost", np.nan)
+    labor = np.where(np.isnan(labor), labor_rate * area, labor)
+
+    base_rate = _lookup(type_codes, type_values, BASE_COST_PER_SQFT, DEFAULT_BASE_COST, lower=True)
+    material_rate = _lookup(material_codes, material_values, MATERIAL_PRICES, DEFAULT_MATERIAL_PRICE)
+    alt_rate = _lookup(alt_codes, alt_values, ALT_MATERIAL_PRICES, DEFAULT_MATERIAL_PRICE)
+    same_material = np.array([[m == a for a in alt_values] for m in material_values], dtype=bool)[material_codes, alt_codes]
+
+    base_cost = base_rate * area
+    total_cost = base_cost + material_rate * area + labor
+    alt_total_cost = base_cost + alt_rate * area + labor
+    time_months = (floors * (area / 1000)) * MONTHS_PER_1000_SQFT_FLOOR
+
+    missing = (location_values == "")[location_codes] | (material_values == "")[material_codes]
+    invalid = np.isnan(floors) | np.isnan(area) | np.isnan(labor)
+    failed = missing | invalid
+    error_codes = np.where(missing, 1, np.where(invalid, 2, 0))
+    errors = ["", "Missing required fields (Location and Material)", "Calculation error: non-numeric floors, area or labor"]
+
+    # Text columns come back as categoricals to keep large results compact
+    result = pd.DataFrame({
+        "building_type": pd.Categorical.from_codes(type_codes, type_values),
+        "location": pd.Categorical.from_codes(location_codes, location_values),
+        "floors": floors,
+        "area_sqft": area,
+        "material": pd.Categorical.from_codes(material_codes, material_values),
+        "labor_cost": labor,
+        "alternative_material": pd.Categorical.from_codes(alt_codes, alt_values),
+        "total_cost": np.where(failed, 0.0, total_cost),
+        "estimated_time": np.where(failed, np.nan, time_months),
+        # NaN where the agent would return None (same material, or a failed row)
+        "alternative_cost": np.where(failed | same_material, np.nan, alt_total_cost),
+        "error": pd.Categorical.from_codes(error_codes, errors),
+    }, index=df.index)
+    logger.info(f"Cost estimation batch computed {n - int(failed.sum())} rows, {int(failed.sum())} errors")
+    return result
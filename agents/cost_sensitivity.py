@@ -0,0 +1,129 @@
+import io
+import logging
+import numpy as np
+import pandas as pd
+from agents.cost_estimation import (
+    MATERIAL_PRICES,
+    ALT_MATERIAL_PRICES,
+    DEFAULT_MATERIAL_PRICE,
+    BASE_COST_PER_SQFT,
+    DEFAULT_BASE_COST,
+    MONTHS_PER_1000_SQFT_FLOOR,
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Grid axes, in array dimension order
+SWEEP_AXES = ("area_sqft", "floors", "labor_rate", "material")
+SWEEP_METRICS = ("total_cost", "alternative_cost", "estimated_time")
+
+def sweep_range(start, stop, steps):
+    # Inclusive, evenly spaced axis values
+    return np.linspace(float(start), float(stop), int(steps))
+
+class SweepResult:
+    """Dense cost/time grids over the Cartesian product of the sweep axes."""
+
+    __slots__ = ("axes", "total_cost", "alternative_cost", "estimated_time", "building_type", "alternative_material")
+
+    def __init__(self, axes, total_cost, alternative_cost, estimated_time, building_type, alternative_material):
+        self.axes = axes
+        self.total_cost = total_cost
+        self.alternative_cost = alternative_cost
+        self.estimated_time = estimated_time
+        self.building_type = building_type
+        self.alternative_material = alternative_material
+
+    @property
+    def shape(self):
+        return self.total_cost.shape
+
+    @property
+    def size(self):
+        return self.total_cost.size
+
+    def index_of(self, axis, value):
+        values = self.axes[axis]
+        if values.dtype.kind in "OUS":
+            matches = np.flatnonzero(values == value)
+            if not len(matches):
+                raise KeyError(f"{value!r} not in sweep axis {axis}")
+            return int(matches[0])
+        # Numeric axes snap to the nearest grid point
+        return int(np.abs(values - float(value)).argmin())
+
+    def sel(self, **fixed):
+        # Fix one or more axes to a value; the remaining axes stay in order
+        index = []
+        axes = {}
+        unknown = set(fixed) - set(self.axes)
+        if unknown:
+            raise KeyError(f"Unknown sweep axes: {sorted(unknown)}")
+        for axis in self.axes:
+            if axis in fixed:
+                index.append(self.index_of(axis, fixed[axis]))
+            else:
+                index.append(slice(None))
+                axes[axis] = self.axes[axis]
+        index = tuple(index)
+        return SweepResult(
+            axes,
+            self.total_cost[index],
+            self.alternative_cost[index],
+            self.estimated_time[index],
+            self.building_type,
+            self.alternative_material,
+        )
+
+    def to_frame(self, metrics=SWEEP_METRICS):
+        # Long-form table, one row per grid point (materialized on demand for export/plotting)
+        names = list(self.axes)
+        grids = np.meshgrid(*[self.axes[name] for name in names], indexing="ij")
+        data = {name: grid.reshape(-1) for name, grid in zip(names, grids)}
+        for metric in metrics:
+            data[metric] = getattr(self, metric).reshape(-1)
+        return pd.DataFrame(data)
+
+    def to_npz(self, file=None):
+        # Compact binary export; returns bytes when no file is given
+        buffer = io.BytesIO() if file is None else file
+        np.savez_compressed(
+            buffer,
+            **{f"axis_{name}": values for name, values in self.axes.items()},
+            total_cost=self.total_cost,
+            alternative_cost=self.alternative_cost,
+            estimated_time=self.estimated_time,
+        )
+        return buffer.getvalue() if file is None else None
+
+def cost_sensitivity_sweep(area_sqft, floors, labor_rate, materials, building_type="Residential", alternative_material="Bricks"):
+    # Evaluates cost_estimation_agent's formulas over the full grid in one broadcasted pass
+    area = np.atleast_1d(np.asarray(area_sqft, dtype=np.float64))
+    floor_values = np.atleast_1d(np.asarray(floors, dtype=np.float64))
+    labor = np.atleast_1d(np.asarray(labor_rate, dtype=np.float64))
+    material_values = np.array(list(materials) if not isinstance(materials, str) else [materials], dtype=object)
+    logger.info(f"Cost sensitivity sweep over {len(area)}x{len(floor_values)}x{len(labor)}x{len(material_values)} grid")
+
+    base_rate = BASE_COST_PER_SQFT.get(str(building_type).lower(), DEFAULT_BASE_COST)
+    material_rate = np.array([MATERIAL_PRICES.get(m, DEFAULT_MATERIAL_PRICE) for m in material_values], dtype=np.float64)
+    alt_rate = ALT_MATERIAL_PRICES.get(alternative_material, DEFAULT_MATERIAL_PRICE)
+
+    # Axis order (area, floors, labor, material); floors only affects time
+    a = area[:, None, None, None]
+    f = floor_values[None, :, None, None]
+    l = labor[None, None, :, None]
+    m = material_rate[None, None, None, :]
+    shape = (len(area), len(floor_values), len(labor), len(material_values))
+
+    # Same operation order as the scalar agent so results agree bit for bit
+    base_cost = base_rate * a
+    labor_cost = l * a
+    total_cost = np.broadcast_to(base_cost + m * a + labor_cost, shape).copy()
+    alternative_cost = np.broadcast_to(base_cost + alt_rate * a + labor_cost, shape).copy()
+    alternative_cost[..., material_values == alternative_material] = np.nan
+    estimated_time = np.broadcast_to(f * (a / 1000) * MONTHS_PER_1000_SQFT_FLOOR, shape).copy()
+
+    axes = {"area_sqft": area, "floors": floor_values, "labor_rate": labor, "material": material_values}
+    return SweepResult(axes, total_cost, alternative_cost, estimated_time, building_type, alternative_material)
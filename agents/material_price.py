@@ -1,13 +1,30 @@
+import os
+import time
 import logging
-from apis.tavily_client import tavily_client
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from apis.search import search_client, has_price
 from utils.helpers import extract_price
+from utils.extraction import parse_search_response
+from utils.price_observations import get_observation_store
+from utils.price_series import get_series_store
+from utils.materials import canonical_material, unit_factor
+from utils.telemetry import traced, log_payload, span
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _stored_price(series, material):
+    stored = series.fresh_price(material)
+    if stored is None:
+        return None
+    return {"material": material, "price": stored["price"], "unit": stored["unit"],
+            "price_source": "series", "observed_at": stored["ts"]}
+
+@traced("agent.material_price")
 def material_price_agent(state):
-    logger.info(f"Material price agent received state: {state}")
+    log_payload(logger, "Material price agent received state", state)
     material = state.get("material", "")
     logger.info(f"Extracted material from state: {material}")
     if not isinstance(state, dict):
@@ -17,15 +34,124 @@ def material_price_agent(state):
         if not material:
             logger.error("No material provided for price lookup")
             return {"price": 100.0, "error": "No material provided"}
+        series = get_series_store()
+        if not state.get("force_refresh", False):
+            stored = _stored_price(series, material)
+            if stored is not None:
+                logger.info(f"Serving stored price for {material}: {stored['price']}")
+                return stored
         query = f"current price of {material} in India 2025"
-        results = tavily_client.search(query)
-        logger.info(f"Tavily API results for {query}: {results}")
-        price = extract_price(results)
+        results = search_client.search(query, accept=has_price, bypass_cache=state.get("force_refresh", False))
+        log_payload(logger, f"Search results for {query}", results)
+        parsed = parse_search_response(results)
+        price = extract_price(parsed)
+        unit = None
+        if parsed.prices:
+            unit = parsed.prices[0].unit
+        if parsed.prices and results.get("upstream"):
+            # Material searches are India-wide; every extracted quote is kept as an observation. A cached
+            # response was already recorded when it was fetched, so recording it again would only add a stale point
+            get_observation_store().record("material", material, ["India"], parsed.prices, source=query)
+            # The quoted price (not a fallback figure) extends the material's history
+            series.append(material, parsed.prices[0].amount, unit)
         if price is None:
             logger.error(f"No price extracted for {material}")
             return {"price": 100.0, "error": f"No price found for {material}"}
         logger.info(f"Extracted price for {material}: {price}")
-        return {"material": material, "price": price}
+        return {"material": material, "price": price, "unit": unit or "", "price_source": "search",
+                "search_provider": results.get("provider")}
     except Exception as e:
         logger.error(f"Error in material_price_agent: {str(e)}")
-        return {"price": 100.0, "error": f"API error: {str(e)}"}
\ No newline at end of file
+        return {"price": 100.0, "error": f"API error: {str(e)}"}
+
+# State fields this agent reads (used to skip re-runs when none changed)
+material_price_agent.reads = ("material", "force_refresh")
+
+# Columns accepted by material_price_batch; unit is the BOM's own unit. A line is only totalled when its unit matches
+# (or converts to) the unit the price was quoted in; a line without a unit is taken to be in the price's unit
+BOM_COLUMNS = ["material", "quantity", "unit"]
+BOM_MAX_WORKERS = int(os.getenv("BOM_MAX_WORKERS", "32"))
+
+def price_materials(materials, force_refresh=False, max_workers=BOM_MAX_WORKERS):
+    # Agent result per distinct material: stored prices inline, the rest concurrently on a bounded pool
+    series = get_series_store()
+    results, missing = {}, []
+    for material in dict.fromkeys(materials):
+        stored = None if force_refresh else _stored_price(series, material)
+        if stored is not None:
+            results[material] = stored
+        else:
+            missing.append(material)
+    if missing:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(missing))), thread_name_prefix="bom") as pool:
+            # Each lookup runs in a copy of this context so a workflow deadline reaches it
+            futures = {
+                pool.submit(contextvars.copy_context().run, material_price_agent,
+                            {"material": material, "force_refresh": force_refresh}): material
+                for material in missing
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+    return results
+
+def material_price_batch(bom, force_refresh=False, max_workers=BOM_MAX_WORKERS):
+    # Prices a bill of materials (DataFrame, list of dicts or dict of columns); one lookup per canonical material
+    import numpy as np
+    import pandas as pd
+    df = bom if isinstance(bom, pd.DataFrame) else pd.DataFrame(bom)
+    df = df.rename(columns=lambda c: str(c).strip().lower())
+    if "material" not in df:
+        raise ValueError("BOM needs a 'material' column")
+    n = len(df)
+    start = time.perf_counter()
+    with span("agent.material_price_batch", lines=n) as current:
+        names = df["material"].fillna("").astype(str).str.strip()
+        codes, uniques = pd.factorize(names)
+        # Spelling variants collapse onto one canonical name, so "OPC cement 53 grade" and "Cement" share a lookup
+        canonical, name_codes = np.unique(np.array([canonical_material(u) for u in uniques], dtype=object), return_inverse=True)
+        line_codes = name_codes.reshape(-1)[codes]
+        results = price_materials([m for m in canonical if m], force_refresh=force_refresh, max_workers=max_workers)
+
+        empty = {"error": "No material provided", "price_source": "error"}
+        per_material = [results.get(m, empty) if m else empty for m in canonical]
+        failed = np.array([bool(r.get("error")) for r in per_material], dtype=bool)
+        unit_price = np.array([np.nan if r.get("error") else r.get("price", np.nan) for r in per_material], dtype=np.float64)
+        sources = np.array(["error" if r.get("error") else r.get("price_source", "search") for r in per_material], dtype=object)
+        price_units = np.array([r.get("unit") or "" for r in per_material], dtype=object)
+        errors = np.array([r.get("error") or "" for r in per_material], dtype=object)
+
+        if "quantity" in df:
+            quantity = pd.to_numeric(df["quantity"], errors="coerce").to_numpy(dtype=np.float64)
+        else:
+            quantity = np.ones(n, dtype=np.float64)
+        bad_quantity = np.isnan(quantity)
+        line_price = unit_price[line_codes]
+        line_units = df["unit"].fillna("").astype(str).to_numpy() if "unit" in df else np.full(n, "", dtype=object)
+        line_price_units = price_units[line_codes]
+        line_errors = np.where(bad_quantity & ~failed[line_codes], "Invalid quantity", errors[line_codes]).astype(object)
+        factor = np.ones(n, dtype=np.float64)
+        for i, (unit, price_unit) in enumerate(zip(line_units, line_price_units)):
+            if not unit.strip() or line_errors[i]:
+                continue
+            converted = unit_factor(unit, price_unit) if price_unit else None
+            if converted is None:
+                factor[i] = np.nan
+                line_errors[i] = (f"Unit mismatch: BOM in {unit}, price {price_unit}" if price_unit
+                                  else f"Price has no unit to check against {unit}")
+            else:
+                factor[i] = converted
+        result = pd.DataFrame({
+            "material": names.to_numpy(),
+            "canonical_material": pd.Categorical.from_codes(line_codes, canonical),
+            "quantity": quantity,
+            "unit": line_units,
+            "unit_price": line_price,
+            "price_unit": line_price_units,
+            "line_total": quantity * factor * line_price,
+            "price_source": sources[line_codes],
+            "error": line_errors,
+        }, index=df.index)
+        fetched = sum(1 for r in results.values() if r.get("price_source") != "series")
+        current.set(materials=len(results), fetched=fetched)
+    logger.info(f"Priced {n} BOM lines ({len(results)} distinct materials, {fetched} fetched) in {time.perf_counter() - start:.2f}s")
+    return result
@@ -1,11 +1,33 @@
 import logging
+from utils.telemetry import traced, log_payload
+from utils.gazetteer import resolve_location, format_place, unresolved_message
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Mock permit data by state and project type, keyed by canonical gazetteer state names
+PERMIT_DATA = {
+    "Maharashtra": {
+        "Residential": ["Building Permit", "Environmental Clearance", "Fire Safety NOC"],
+        "Commercial": ["Building Permit", "Trade License", "Environmental Clearance", "Fire Safety NOC"],
+        "Industrial": ["Building Permit", "Industrial License", "Environmental Clearance", "Fire Safety NOC", "Pollution Control Board Approval"]
+    },
+    "Rajasthan": {
+        "Residential": ["Building Permit", "Water Supply NOC", "Fire Safety NOC"],
+        "Commercial": ["Building Permit", "Trade License", "Water Supply NOC", "Fire Safety NOC"],
+        "Industrial": ["Building Permit", "Industrial License", "Water Supply NOC", "Fire Safety NOC", "Pollution Control Board Approval"]
+    },
+    "Delhi": {
+        "Residential": ["Building Permit", "Sanitation NOC", "Fire Safety NOC"],
+        "Commercial": ["Building Permit", "Trade License", "Sanitation NOC", "Fire Safety NOC"],
+        "Industrial": ["Building Permit", "Industrial License", "Sanitation NOC", "Fire Safety NOC", "Pollution Control Board Approval"]
+    }
+}
+
+@traced("agent.permit_detection")
 def permit_detection_agent(state):
-    logger.info(f"Permit detection agent received state: {state}")
+    log_payload(logger, "Permit detection agent received state", state)
     location = state.get("location", "")
     project_type = state.get("project_type", "Residential")
     logger.info(f"Extracted from state: location={location}, project_type={project_type}")
@@ -17,28 +39,19 @@ def permit_detection_agent(state):
             logger.error("No location provided for permit detection")
             return {"permits": "Error: Please provide a valid location", "error": "No location provided"}
         
-        # Mock permit data based on location and project type
-        permit_data = {
-            "Mumbai, Maharashtra": {
-                "Residential": ["Building Permit", "Environmental Clearance", "Fire Safety NOC"],
-                "Commercial": ["Building Permit", "Trade License", "Environmental Clearance", "Fire Safety NOC"],
-                "Industrial": ["Building Permit", "Industrial License", "Environmental Clearance", "Fire Safety NOC", "Pollution Control Board Approval"]
-            },
-            "Jaipur, Rajasthan": {
-                "Residential": ["Building Permit", "Water Supply NOC", "Fire Safety NOC"],
-                "Commercial": ["Building Permit", "Trade License", "Water Supply NOC", "Fire Safety NOC"],
-                "Industrial": ["Building Permit", "Industrial License", "Water Supply NOC", "Fire Safety NOC", "Pollution Control Board Approval"]
-            },
-            "Delhi, Delhi": {
-                "Residential": ["Building Permit", "Sanitation NOC", "Fire Safety NOC"],
-                "Commercial": ["Building Permit", "Trade License", "Sanitation NOC", "Fire Safety NOC"],
-                "Industrial": ["Building Permit", "Industrial License", "Sanitation NOC", "Fire Safety NOC", "Pollution Control Board Approval"]
-            }
-        }
-        location_key = next((k for k in permit_data.keys() if k in location), "Mumbai, Maharashtra")
-        permits = permit_data.get(location_key, {}).get(project_type, ["General Building Permit"])
-        logger.info(f"Detected permits for {location}, {project_type}: {permits}")
-        return {"location": location, "project_type": project_type, "permits": permits}
+        resolution = resolve_location(location)
+        if resolution.place is None:
+            message = unresolved_message(resolution)
+            logger.warning(message)
+            return {"location": location, "permits": f"Error: {message}", "error": message}
+        place = resolution.place
+        permits = PERMIT_DATA.get(place.state, {}).get(project_type, ["General Building Permit"])
+        logger.info(f"Detected permits for {format_place(place)} ({resolution.method} match), {project_type}: {permits}")
+        return {"location": location, "project_type": project_type, "permits": permits,
+                "resolved_location": format_place(place), "place": place._asdict()}
     except Exception as e:
         logger.error(f"Error in permit_detection_agent: {str(e)}")
-        return {"permits": f"Error detecting permits: {str(e)}", "error": f"API error: {str(e)}"}
\ No newline at end of file
+        return {"permits": f"Error detecting permits: {str(e)}", "error": f"API error: {str(e)}"}
+
+# State fields this agent reads (used to skip re-runs when none changed)
+permit_detection_agent.reads = ("location", "project_type")
@@ -1,12 +1,14 @@
 import logging
-from apis.gemini_client import generate_content
+from apis.gemini_client import generate_content, generate_content_stream
+from utils.telemetry import traced, log_payload
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@traced("agent.project_scheduling")
 def project_scheduling_agent(state):
-    logger.info(f"Project scheduling agent received state: {state}")
+    log_payload(logger, "Project scheduling agent received state", state)
     project_details = state.get("project_details", "")
     logger.info(f"Extracted project_details from state: {project_details}")
     if not isinstance(state, dict):
@@ -17,9 +19,15 @@ def project_scheduling_agent(state):
             logger.error("No project details provided for scheduling")
             return {"schedule": "Error: Please provide valid project details", "error": "No project details provided"}
         prompt = f"Generate a project schedule for: {project_details}"
+        if state.get("stream", False):
+            # Caller renders the chunks incrementally; the final text is cached like a normal reply
+            return {"project_details": project_details, "schedule_stream": generate_content_stream(prompt)}
         schedule = generate_content(prompt)
-        logger.info(f"Generated schedule: {schedule}")
+        log_payload(logger, "Generated schedule", schedule)
         return {"project_details": project_details, "schedule": schedule}
     except Exception as e:
         logger.error(f"Error in project_scheduling_agent: {str(e)}")
-        return {"schedule": f"Error generating schedule: {str(e)}", "error": f"API error: {str(e)}"}
\ No newline at end of file
+        return {"schedule": f"Error generating schedule: {str(e)}", "error": f"API error: {str(e)}"}
+
+# State fields this agent reads (used to skip re-runs when none changed)
+project_scheduling_agent.reads = ("project_details", "stream")
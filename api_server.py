@@ -0,0 +1,274 @@
+import os
+import json
+import math
+import asyncio
+import argparse
+import logging
+from collections import namedtuple
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from langgraph_workflow import (
+    material_price_workflow,
+    competitor_pricing_workflow,
+    cost_estimation_workflow,
+    project_scheduling_workflow,
+    permit_detection_workflow,
+    bid_optimization_workflow,
+    full_report_workflow,
+    run_project_graph,
+    GRAPH_DEPENDENCIES,
+)
+from apis.call_policy import deadline, policy_stats
+from utils import telemetry
+from utils.telemetry import span, increment
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", str(os.cpu_count() or 1)))
+# Worker threads per process for the (blocking) workflows
+API_THREADS = int(os.getenv("API_THREADS", "64"))
+# Requests wait this long for a free slot on their endpoint before getting a 429
+API_QUEUE_TIMEOUT = float(os.getenv("API_QUEUE_TIMEOUT", "5"))
+# Upper bound on a request's time budget; clients may ask for less with an X-Timeout header (seconds)
+API_REQUEST_TIMEOUT = float(os.getenv("API_REQUEST_TIMEOUT", "120"))
+MAX_BATCH_ITEMS = int(os.getenv("API_MAX_BATCH_ITEMS", "1000"))
+
+# Field types shared by every endpoint; validation coerces JSON values to these
+FIELD_TYPES = {
+    "material": str,
+    "project_type": str,
+    "location": str,
+    "building_type": str,
+    "alternative_material": str,
+    "project_details": str,
+    "project_data": str,
+    "thread_id": str,
+    "floors": int,
+    "area_sqft": float,
+    "labor_cost": float,
+    "timeout": float,
+    "force_refresh": bool,
+    "resume": bool,
+    "agents": list,
+    "bom": list,
+    "projects": list,
+}
+MINIMUMS = {"floors": 1, "area_sqft": 1, "labor_cost": 0, "timeout": 0.1}
+REPORT_FIELDS = ("project_details", "project_data", "location", "material", "building_type", "project_type",
+                 "floors", "area_sqft", "labor_cost", "alternative_material", "force_refresh")
+
+
+def _batch_bom(state):
+    from agents.material_price import material_price_batch
+    priced = material_price_batch(state["bom"], force_refresh=state.get("force_refresh", False))
+    return {"lines": json.loads(priced.to_json(orient="records")), "total": float(priced["line_total"].sum())}
+
+
+def _batch_bids(state):
+    from agents.bid_optimization import bid_optimization_batch
+    return {"bids": json.loads(bid_optimization_batch(state["projects"]).to_json(orient="records"))}
+
+
+def _project_graph(state):
+    options = {key: state.pop(key) for key in ("agents", "thread_id", "resume") if key in state}
+    return run_project_graph(state, **options)
+
+
+# handler(state) -> JSON-able dict; limit caps concurrent requests per process on that endpoint
+Endpoint = namedtuple("Endpoint", ["handler", "fields", "required", "limit"])
+ENDPOINTS = {
+    "material_price": Endpoint(material_price_workflow, ("material", "force_refresh"), ("material",), 32),
+    "competitor_pricing": Endpoint(competitor_pricing_workflow, ("project_type", "location", "force_refresh"),
+                                   ("project_type", "location"), 32),
+    "cost_estimation": Endpoint(cost_estimation_workflow, ("building_type", "location", "floors", "area_sqft", "material",
+                                                           "labor_cost", "alternative_material"), ("location", "material"), 64),
+    "permit_detection": Endpoint(permit_detection_workflow, ("location", "project_type"), ("location",), 32),
+    "project_scheduling": Endpoint(project_scheduling_workflow, ("project_details",), ("project_details",), 8),
+    "bid_optimization": Endpoint(bid_optimization_workflow, ("project_data",), ("project_data",), 8),
+    "full_report": Endpoint(lambda state: full_report_workflow(state, timeout=state.pop("timeout", None)),
+                            REPORT_FIELDS + ("timeout",), ("location", "material"), 4),
+    "project_graph": Endpoint(_project_graph, REPORT_FIELDS + ("agents", "thread_id", "resume"), ("location", "material"), 4),
+    "bom_pricing": Endpoint(_batch_bom, ("bom", "force_refresh"), ("bom",), 4),
+    "bid_screening": Endpoint(_batch_bids, ("projects",), ("projects",), 2),
+}
+
+
+def _limit(name, default):
+    return int(os.getenv(f"API_LIMIT_{name.upper()}", str(default)))
+
+
+def _coerce(field, value):
+    # Returns (value, None) or (None, reason)
+    kind = FIELD_TYPES[field]
+    if kind is str:
+        if not isinstance(value, str):
+            return None, "must be a string"
+        value = value.strip()
+    elif kind is bool:
+        if not isinstance(value, bool):
+            return None, "must be true or false"
+    elif kind in (int, float):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            return None, "must be a number"
+        if kind is int and value != int(value):
+            return None, "must be a whole number"
+        value = kind(value)
+        if field in MINIMUMS and value < MINIMUMS[field]:
+            return None, f"must be at least {MINIMUMS[field]:g}"
+    elif kind is list:
+        if not isinstance(value, list) or len(value) > MAX_BATCH_ITEMS:
+            return None, f"must be a list of at most {MAX_BATCH_ITEMS} items"
+        if field == "bom" and not all(isinstance(line, dict) and line.get("material") for line in value):
+            return None, "every line must be an object with a material"
+        if field in ("projects", "agents") and not all(isinstance(item, str) for item in value):
+            return None, "must be a list of strings"
+        if field == "agents" and not set(value) <= set(GRAPH_DEPENDENCIES):
+            return None, f"agents must be among {sorted(GRAPH_DEPENDENCIES)}"
+    return value, None
+
+
+def validate(endpoint, payload):
+    # Returns (state, errors); errors maps field name to a reason
+    if not isinstance(payload, dict):
+        return None, {"body": "must be a JSON object"}
+    errors = {field: "unknown field" for field in payload if field not in endpoint.fields}
+    state = {}
+    for field in endpoint.fields:
+        if field not in payload or payload[field] is None:
+            continue
+        value, reason = _coerce(field, payload[field])
+        if reason:
+            errors[field] = reason
+        else:
+            state[field] = value
+    for field in endpoint.required:
+        if field not in errors and not state.get(field):
+            errors[field] = "is required"
+    return state, errors
+
+
+def _render(content):
+    return json.dumps(content, default=str, ensure_ascii=False).encode("utf-8")
+
+
+class APIResponse(JSONResponse):
+    # Workflow results may hold dates or other non-JSON values; they are rendered as strings
+    def render(self, content):
+        return _render(content)
+
+
+def _request_timeout(request):
+    try:
+        requested = float(request.headers.get("x-timeout", API_REQUEST_TIMEOUT))
+    except ValueError:
+        requested = API_REQUEST_TIMEOUT
+    return max(0.1, min(requested, API_REQUEST_TIMEOUT))
+
+
+def _run(handler, state, timeout):
+    # Runs on a worker thread; the deadline caps every provider call the workflow makes
+    with deadline(timeout):
+        return handler(state)
+
+
+async def run_endpoint(request: Request):
+    name = request.path_params["name"]
+    endpoint = ENDPOINTS.get(name)
+    if endpoint is None:
+        return APIResponse({"error": f"Unknown workflow '{name}'", "workflows": sorted(ENDPOINTS)}, status_code=404)
+    try:
+        payload = await request.json()
+    except ValueError:
+        return APIResponse({"error": "Request body must be valid JSON"}, status_code=400)
+    state, errors = validate(endpoint, payload)
+    if errors:
+        return APIResponse({"error": "Invalid request", "fields": errors}, status_code=422)
+    # API callers always get complete text, never a stream
+    state["stream"] = False
+
+    semaphore, inflight = request.app.state.semaphores[name], request.app.state.inflight
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout=API_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        increment(f"api.{name}.rejected")
+        return APIResponse({"error": f"Too many concurrent '{name}' requests"}, status_code=429,
+                           headers={"Retry-After": str(max(1, int(API_QUEUE_TIMEOUT)))})
+    inflight[name] += 1
+    try:
+        with span(f"api.{name}") as current:
+            result = await run_in_threadpool(_run, endpoint.handler, state, _request_timeout(request))
+            if isinstance(result, dict) and result.get("error"):
+                current.set(error_class="WorkflowError")
+    except Exception as e:
+        logger.error(f"Error in {name} endpoint: {str(e)}")
+        return APIResponse({"error": f"{type(e).__name__}: {str(e)}"}, status_code=500)
+    finally:
+        inflight[name] -= 1
+        semaphore.release()
+    # Workflow-level errors keep the workflows' {"error": ...} contract with a 200
+    return APIResponse(result)
+
+
+async def health(request: Request):
+    return APIResponse({"status": "ok", "pid": os.getpid(), "inflight": dict(request.app.state.inflight),
+                        "providers": policy_stats()})
+
+
+async def metrics(request: Request):
+    # Per worker process; scrape each worker or run with --workers 1 behind the load balancer for exact totals
+    return PlainTextResponse(telemetry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+async def list_workflows(request: Request):
+    return APIResponse({
+        name: {"fields": list(endpoint.fields), "required": list(endpoint.required), "limit": _limit(name, endpoint.limit)}
+        for name, endpoint in ENDPOINTS.items()
+    })
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Created inside the worker's event loop (asyncio primitives bind to a loop on Python 3.9)
+    import anyio.to_thread
+    anyio.to_thread.current_default_thread_limiter().total_tokens = API_THREADS
+    app.state.semaphores = {name: asyncio.Semaphore(_limit(name, endpoint.limit)) for name, endpoint in ENDPOINTS.items()}
+    app.state.inflight = dict.fromkeys(ENDPOINTS, 0)
+    logger.info(f"API worker {os.getpid()} ready with {len(ENDPOINTS)} workflows")
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+        Route("/v1/workflows", list_workflows, methods=["GET"]),
+        Route("/v1/workflows/{name}", run_endpoint, methods=["POST"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the construction workflows as a JSON API.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="worker processes")
+    args = parser.parse_args()
+    # Rate limits are per process; the workers (which inherit this environment) split each provider's limit between them
+    os.environ["CALL_POLICY_PROCESSES"] = str(max(1, args.workers))
+    import uvicorn
+    uvicorn.run("api_server:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+import os
+import time
+import random
+import threading
+import contextvars
+import logging
+from contextlib import contextmanager
+
+from utils.telemetry import increment, observe
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Defaults shared by every provider; per-provider overrides use the <PROVIDER>_ prefix (e.g. TAVILY_MAX_ATTEMPTS)
+BACKOFF_BASE = float(os.getenv("CALL_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("CALL_BACKOFF_MAX", "8"))
+PROVIDER_DEFAULTS = {
+    "tavily": {"rate": 5.0, "burst": 10, "max_attempts": 3, "breaker_threshold": 5, "breaker_reset": 30.0},
+    "serper": {"rate": 5.0, "burst": 10, "max_attempts": 3, "breaker_threshold": 5, "breaker_reset": 30.0},
+    "gemini": {"rate": 1.0, "burst": 5, "max_attempts": 3, "breaker_threshold": 5, "breaker_reset": 60.0},
+}
+
+# Processes drawing on the same provider quotas (e.g. API server workers); each takes an equal share of rate and burst
+POLICY_PROCESSES = max(1, int(os.getenv("CALL_POLICY_PROCESSES", "1")))
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# Transport and SDK exception names treated as transient, matched by name so neither SDK is imported here
+RETRYABLE_ERRORS = {
+    "TimeoutException", "ConnectTimeout", "ReadTimeout", "WriteTimeout", "PoolTimeout", "ConnectError",
+    "ReadError", "RemoteProtocolError", "TimeoutError", "ConnectionError",
+    "ResourceExhausted", "ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "TooManyRequests",
+}
+
+_deadline = contextvars.ContextVar("call_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before (or while) calling a provider."""
+
+
+class CircuitOpenError(Exception):
+    """The provider's circuit breaker is open; the call was not attempted."""
+
+
+@contextmanager
+def deadline(seconds):
+    # Caps the remaining budget for every call made in this context (nested deadlines only shrink it)
+    if seconds is None:
+        yield
+        return
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(expires if current is None else min(current, expires))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    # Seconds left in the current deadline, or None when no deadline is set
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+def timeout_kwargs(timeout):
+    # httpx treats timeout=None as "no timeout", so only pass one when a budget applies
+    return {} if timeout is None else {"timeout": max(timeout, 0.001)}
+
+
+def _status_code(error):
+    response = getattr(error, "response", None)
+    code = getattr(response, "status_code", None) or getattr(error, "code", None)
+    try:
+        return int(code)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error):
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return type(error).__name__ in RETRYABLE_ERRORS
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket; reserve() takes a token and returns how long the caller must wait for it.
+
+    A rate of 0 or less means unlimited: every reserve() returns 0.0 and no tokens are tracked.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        # Caller holds _lock
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, max_wait=None):
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+    def refund(self):
+        # Returns a token taken by a call that was then never made
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+    def available(self):
+        # Tokens available now (negative while callers wait on reservations), or None when unlimited
+        if self.rate <= 0:
+            return None
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets one probe through after reset_timeout."""
+
+    def __init__(self, name, threshold, reset_timeout):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        # Returns True when this call is the half-open probe; the caller must then release() it
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return False
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+        increment(f"{self.name}.breaker_rejections")
+        raise CircuitOpenError(f"{self.name} circuit open")
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def release(self):
+        # Ends a probe that neither succeeded nor failed (a non-retryable error, a deadline), so the next call may probe
+        with self._lock:
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            reopen = self._probing
+            self._probing = False
+            if reopen or (self.opened_at is None and self.failures >= self.threshold):
+                self.opened_at = time.monotonic()
+                increment(f"{self.name}.breaker_trips")
+                logger.warning(f"Circuit breaker for {self.name} opened after {self.failures} failures")
+
+
+class CallPolicy:
+    """Rate limit, retry with jittered exponential backoff, circuit breaker and deadline for one provider."""
+
+    def __init__(self, name, rate, burst, max_attempts, breaker_threshold, breaker_reset,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(name, breaker_threshold, breaker_reset)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def _backoff(self, attempt, error):
+        # Full jitter, but never sooner than a server-sent Retry-After
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        retry_after = _retry_after(error)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    def _budget(self):
+        left = remaining()
+        if left is not None and left <= 0:
+            increment(f"{self.name}.deadline_exceeded")
+            raise DeadlineExceeded(f"{self.name}: deadline exceeded")
+        return left
+
+    def _admit(self):
+        # Returns (seconds to wait for a token, timeout for the attempt once it starts, whether it is the breaker probe).
+        # The token is taken first, so a probe is only granted to a call that will actually be made
+        left = self._budget()
+        wait = self.bucket.reserve(max_wait=left)
+        if wait is None:
+            increment(f"{self.name}.deadline_exceeded")
+            raise DeadlineExceeded(f"{self.name}: no rate-limit token before the deadline")
+        try:
+            probe = self.breaker.allow()
+        except CircuitOpenError:
+            self.bucket.refund()
+            raise
+        if wait:
+            observe(f"{self.name}.rate_limit_wait", wait)
+        return wait, None if left is None else left - wait, probe
+
+    def _failed(self, attempt, error):
+        # Returns the backoff delay when the call should be retried, otherwise None
+        if not is_retryable(error):
+            return None
+        self.breaker.failure()
+        if attempt + 1 >= self.max_attempts:
+            return None
+        delay = self._backoff(attempt, error)
+        left = remaining()
+        if left is not None and delay >= left:
+            return None
+        increment(f"{self.name}.retries")
+        logger.warning(f"{self.name} call failed ({type(error).__name__}); retry {attempt + 1} in {delay:.2f}s")
+        return delay
+
+    def call(self, fn):
+        # fn(timeout) performs one attempt; timeout is the remaining budget in seconds, or None
+        for attempt in range(self.max_attempts):
+            wait, timeout, probe = self._admit()
+            try:
+                if wait:
+                    time.sleep(wait)
+                result = fn(timeout)
+            except Exception as e:
+                delay = self._failed(attempt, e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            finally:
+                if probe:
+                    self.breaker.release()
+            self.breaker.success()
+            return result
+
+    async def acall(self, fn):
+        # Async variant: fn(timeout) returns an awaitable
+        import asyncio
+        for attempt in range(self.max_attempts):
+            wait, timeout, probe = self._admit()
+            try:
+                if wait:
+                    await asyncio.sleep(wait)
+                result = await fn(timeout)
+            except Exception as e:
+                delay = self._failed(attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            finally:
+                if probe:
+                    self.breaker.release()
+            self.breaker.success()
+            return result
+
+    def stats(self):
+        tokens = self.bucket.available()
+        return {"breaker": self.breaker.state, "failures": self.breaker.failures,
+                "tokens": None if tokens is None else round(tokens, 2)}
+
+
+def _setting(provider, key, cast):
+    value = os.getenv(f"{provider.upper()}_{key.upper()}")
+    return cast(value) if value is not None else PROVIDER_DEFAULTS.get(provider, PROVIDER_DEFAULTS["tavily"])[key]
+
+
+def _share(total, minimum):
+    # This process's part of a provider-wide limit
+    return max(minimum, total / POLICY_PROCESSES)
+
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+
+def get_policy(provider):
+    policy = _policies.get(provider)
+    if policy is None:
+        with _policies_lock:
+            policy = _policies.get(provider)
+            if policy is None:
+                policy = CallPolicy(
+                    provider,
+                    rate=_share(_setting(provider, "rate", float), 0.0),
+                    burst=int(_share(_setting(provider, "burst", int), 1)),
+                    max_attempts=_setting(provider, "max_attempts", int),
+                    breaker_threshold=_setting(provider, "breaker_threshold", int),
+                    breaker_reset=_setting(provider, "breaker_reset", float),
+                )
+                _policies[provider] = policy
+    return policy
+
+
+def policy_stats():
+    return {name: policy.stats() for name, policy in sorted(_policies.items())}
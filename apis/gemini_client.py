@@ -1,28 +1,163 @@
 import os
-import google.generativeai as genai
+import json
+import time
+import hashlib
+import threading
 import logging
+from utils.cache import TieredCache
+from utils.telemetry import span, log_payload
+from apis.call_policy import get_policy
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize Gemini client
-try:
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-    gemini_client = genai.GenerativeModel('gemini-1.5-flash')
-    logger.info("Gemini client initialized successfully")
-except Exception as e:
-    logger.error(f"Error initializing Gemini client: {str(e)}")
-    gemini_client = None
+GEMINI_MODEL = "gemini-1.5-flash"
+# Optional REST endpoint override (e.g. http://127.0.0.1:8765 for a local stand-in server); uses the REST transport
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "")
 
-def generate_content(prompt):
+# Exact-match response cache (memory LRU + size-bounded SQLite store)
+RESPONSE_CACHE_TTL = int(os.getenv("GEMINI_CACHE_TTL", "86400"))
+RESPONSE_CACHE_SIZE = int(os.getenv("GEMINI_CACHE_SIZE", "256"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", "5000"))
+response_cache = TieredCache(
+    "gemini_responses",
+    maxsize=RESPONSE_CACHE_SIZE,
+    ttl=RESPONSE_CACHE_TTL,
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+)
+
+# Gemini client is created on first use; importing the SDK alone costs several hundred ms
+gemini_client = None
+_client_lock = threading.Lock()
+_client_initialized = False
+
+def get_gemini_client():
+    global gemini_client, _client_initialized
+    if not _client_initialized:
+        with _client_lock:
+            if not _client_initialized:
+                try:
+                    import google.generativeai as genai
+                    if GEMINI_API_BASE:
+                        genai.configure(api_key=os.getenv("GEMINI_API_KEY"), transport="rest",
+                                        client_options={"api_endpoint": GEMINI_API_BASE})
+                    else:
+                        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                    gemini_client = genai.GenerativeModel(GEMINI_MODEL)
+                    logger.info("Gemini client initialized successfully")
+                except Exception as e:
+                    logger.error(f"Error initializing Gemini client: {str(e)}")
+                    gemini_client = None
+                _client_initialized = True
+    return gemini_client
+
+def request_options(timeout):
+    # Per-attempt timeout from the caller's deadline (the SDK default applies otherwise). The SDK's own
+    # retry is turned off: it retries 503s for up to 10 minutes regardless of the deadline, and CallPolicy
+    # already retries with backoff inside the budget
+    from google.api_core.retry import Retry
+    options = {"retry": Retry(predicate=lambda error: False)}
+    if timeout is not None:
+        options["timeout"] = max(timeout, 0.001)
+    return options
+
+def normalize_prompt(prompt):
+    # Whitespace-only differences map to the same entry; case is significant for the model
+    return " ".join(str(prompt).split())
+
+def cache_key(prompt, generation_config=None):
+    payload = {"model": GEMINI_MODEL, "prompt": normalize_prompt(prompt), "config": generation_config or {}}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def is_cacheable(text):
+    return isinstance(text, str) and bool(text) and not text.startswith("Error")
+
+def generate_content(prompt, generation_config=None, bypass_cache=False):
+    with span("gemini.generate_content") as current:
+        text, source = response_cache.get_or_compute(
+            cache_key(prompt, generation_config),
+            lambda: _generate_content(prompt, generation_config),
+            bypass=bypass_cache,
+            should_cache=is_cacheable,
+            with_source=True,
+        )
+        # A caller that waited on another's in-flight request is neither a hit nor a miss
+        current.set(**({"coalesced": True} if source == "coalesced" else {"cache_hit": source == "hit"}))
+        return text
+
+def _generate_content(prompt, generation_config=None):
+    gemini_client = get_gemini_client()
     if gemini_client is None:
         logger.error("Gemini client not initialized")
         return "Error: Gemini client not available"
-    try:
-        response = gemini_client.generate_content(prompt)
-        logger.info(f"Gemini API response for prompt '{prompt}': {response.text}")
-        return response.text.strip()
-    except Exception as e:
-        logger.error(f"Error generating content with Gemini: {str(e)}")
-        return f"Error: {str(e)}"
\ No newline at end of file
+    with span("gemini.http") as current:
+        try:
+            response = get_policy("gemini").call(
+                lambda timeout: gemini_client.generate_content(
+                    prompt, generation_config=generation_config, request_options=request_options(timeout)
+                )
+            )
+            log_payload(logger, f"Gemini API response for prompt '{prompt}'", response.text)
+            current.set(payload_bytes=len(response.text.encode("utf-8")))
+            return response.text.strip()
+        except Exception as e:
+            current.set(error_class=type(e).__name__)
+            logger.error(f"Error generating content with Gemini: {str(e)}")
+            return f"Error: {str(e)}"
+
+class StreamInterrupted(Exception):
+    """The Gemini stream failed after some text had been yielded; that text is incomplete."""
+
+def generate_content_stream(prompt, generation_config=None, bypass_cache=False):
+    # Yields text chunks as they arrive; the joined chunks equal generate_content's stripped text.
+    # A failure before any text yields one "Error: ..." chunk, like generate_content; a failure after
+    # some text raises StreamInterrupted, so the partial answer is never mistaken for a whole one
+    key = cache_key(prompt, generation_config)
+    if not bypass_cache:
+        cached = response_cache.get(key)
+        if is_cacheable(cached):
+            yield cached
+            return
+    gemini_client = get_gemini_client()
+    if gemini_client is None:
+        logger.error("Gemini client not initialized")
+        yield "Error: Gemini client not available"
+        return
+    parts = []
+    pending = ""
+    with span("gemini.stream") as current:
+        try:
+            # Retries cover opening the stream; a failure mid-stream is reported, not replayed
+            response = get_policy("gemini").call(
+                lambda timeout: gemini_client.generate_content(
+                    prompt, generation_config=generation_config, stream=True, request_options=request_options(timeout)
+                )
+            )
+            for chunk in response:
+                text = pending + (chunk.text or "")
+                if "first_chunk_ms" not in current.attributes:
+                    current.set(first_chunk_ms=round((time.perf_counter() - current.start) * 1000, 3))
+                if not parts:
+                    text = text.lstrip()
+                # Hold back trailing whitespace until more content arrives
+                body = text.rstrip()
+                pending = text[len(body):]
+                if body:
+                    parts.append(body)
+                    yield body
+        except Exception as e:
+            current.set(error_class=type(e).__name__)
+            logger.error(f"Error streaming content with Gemini: {str(e)}")
+            if parts:
+                raise StreamInterrupted(str(e)) from e
+            yield f"Error: {str(e)}"
+            return
+        text = "".join(parts)
+        current.set(payload_bytes=len(text.encode("utf-8")))
+    log_payload(logger, f"Gemini API streamed response for prompt '{prompt}'", text)
+    if is_cacheable(text):
+        response_cache.set(key, text)
+
+def cache_stats():
+    return response_cache.stats()
@@ -0,0 +1,119 @@
+import os
+import atexit
+import asyncio
+import threading
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Pool limits and timeouts shared by every outbound search client
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "20"))
+WRITE_TIMEOUT = float(os.getenv("HTTP_WRITE_TIMEOUT", "10"))
+POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "5"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") not in ("0", "false", "False")
+
+
+def _http2_available():
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("h2 package not installed; falling back to HTTP/1.1 keep-alive")
+        return False
+
+
+class TransportManager:
+    """Owns the long-lived sync and async httpx clients for the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync_client = None
+        self._async_clients = {}
+        self._options = None
+
+    def _client_options(self):
+        # httpx (and h2) are imported on the first outbound call, not at app start
+        if self._options is None:
+            import httpx
+            self._options = {
+                "limits": httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY,
+                ),
+                "timeout": httpx.Timeout(connect=CONNECT_TIMEOUT, read=READ_TIMEOUT, write=WRITE_TIMEOUT, pool=POOL_TIMEOUT),
+                "http2": _http2_available(),
+            }
+        return self._options
+
+    @property
+    def http2(self):
+        return self._client_options()["http2"]
+
+    def get_client(self):
+        if self._sync_client is None or self._sync_client.is_closed:
+            with self._lock:
+                if self._sync_client is None or self._sync_client.is_closed:
+                    import httpx
+                    self._sync_client = httpx.Client(**self._client_options())
+                    logger.info(f"Created shared HTTP client (http2={self.http2})")
+        return self._sync_client
+
+    def get_async_client(self):
+        # Async connections are bound to the event loop that opened them, so keep one client per loop
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for stale in [l for l in self._async_clients if l.is_closed()]:
+                self._async_clients.pop(stale)
+            client = self._async_clients.get(loop)
+            if client is None or client.is_closed:
+                import httpx
+                client = httpx.AsyncClient(**self._client_options())
+                self._async_clients[loop] = client
+                logger.info(f"Created shared async HTTP client (http2={self.http2})")
+        return client
+
+    async def aclose(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+    def close(self):
+        with self._lock:
+            sync_client, self._sync_client = self._sync_client, None
+            async_clients, self._async_clients = self._async_clients, {}
+        if sync_client is not None:
+            sync_client.close()
+        for loop, client in async_clients.items():
+            if client.is_closed:
+                continue
+            try:
+                if loop.is_closed():
+                    asyncio.run(client.aclose())
+                elif not loop.is_running():
+                    loop.run_until_complete(client.aclose())
+            except Exception as e:
+                logger.warning(f"Error closing async HTTP client: {str(e)}")
+        logger.info("Shared HTTP clients closed")
+
+
+transport = TransportManager()
+atexit.register(transport.close)
+
+
+def get_client():
+    return transport.get_client()
+
+
+def get_async_client():
+    return transport.get_async_client()
@@ -0,0 +1,200 @@
+import os
+import time
+import threading
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from apis.tavily_client import tavily_client
+from apis.serper_api import google_search
+from apis.call_policy import remaining
+from utils.extraction import parse_search_response
+from utils.telemetry import Histogram, span, increment
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Providers in preference order; the first available one is the primary
+SEARCH_PROVIDERS = [p.strip() for p in os.getenv("SEARCH_PROVIDERS", "tavily,serper").split(",") if p.strip()]
+# The secondary is launched once the primary has been silent for its own p95 latency, within these bounds
+HEDGE_DEFAULT_DELAY = float(os.getenv("SEARCH_HEDGE_DEFAULT_DELAY", "1.5"))
+HEDGE_MIN_DELAY = float(os.getenv("SEARCH_HEDGE_MIN_DELAY", "0.2"))
+HEDGE_MAX_DELAY = float(os.getenv("SEARCH_HEDGE_MAX_DELAY", "5"))
+HEDGE_MIN_SAMPLES = int(os.getenv("SEARCH_HEDGE_MIN_SAMPLES", "10"))
+HEDGE_QUANTILE = 0.95
+SEARCH_MAX_WORKERS = int(os.getenv("SEARCH_MAX_WORKERS", "32"))
+
+
+def normalize_tavily(query, response):
+    response = response if isinstance(response, dict) else {}
+    results = [
+        {"title": r.get("title") or "", "url": r.get("url") or "", "content": r.get("content") or ""}
+        for r in response.get("results") or () if isinstance(r, dict)
+    ]
+    return {"query": query, "provider": "tavily", "answer": response.get("answer") or "", "results": results}
+
+
+def normalize_serper(query, response):
+    # Answer box and knowledge graph snippets often carry the price, so they lead the results
+    response = response if isinstance(response, dict) else {}
+    results = []
+    box = response.get("answerBox")
+    if isinstance(box, dict):
+        content = " ".join(filter(None, (box.get("answer"), box.get("snippet"))))
+        if content:
+            results.append({"title": box.get("title") or "", "url": box.get("link") or "", "content": content})
+    graph = response.get("knowledgeGraph")
+    if isinstance(graph, dict) and graph.get("description"):
+        results.append({"title": graph.get("title") or "", "url": graph.get("descriptionLink") or "", "content": graph["description"]})
+    for r in response.get("organic") or ():
+        if isinstance(r, dict) and r.get("snippet"):
+            results.append({"title": r.get("title") or "", "url": r.get("link") or "", "content": r["snippet"]})
+    answer = box.get("answer") if isinstance(box, dict) else ""
+    return {"query": query, "provider": "serper", "answer": answer or "", "results": results}
+
+
+def has_price(parsed):
+    return bool(parsed.prices)
+
+
+def has_unit_price(parsed):
+    return any(record.unit for record in parsed.prices)
+
+
+class SearchProvider:
+    """One search backend: its fetch function, normalizer and running latency/win statistics.
+
+    fetch(query, bypass_cache) returns (response, upstream); only upstream calls feed the latency histogram.
+    """
+
+    def __init__(self, name, fetch, normalize, available):
+        self.name = name
+        self.fetch = fetch
+        self.normalize = normalize
+        self.available = available
+        self.latency = Histogram(window=512)
+        self.launched = 0
+        self.wins = 0
+        self._lock = threading.Lock()
+
+    def hedge_delay(self):
+        # p95 of this provider's recent latencies; a fixed default until there are enough samples
+        if self.latency.count < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        p95 = self.latency.percentiles((HEDGE_QUANTILE,))[HEDGE_QUANTILE]
+        return min(HEDGE_MAX_DELAY, max(HEDGE_MIN_DELAY, p95))
+
+    def stats(self):
+        quantiles = self.latency.percentiles((0.5, HEDGE_QUANTILE))
+        p50, p95 = quantiles[0.5], quantiles[HEDGE_QUANTILE]
+        with self._lock:
+            launched, wins = self.launched, self.wins
+        return {"launched": launched, "wins": wins, "win_rate": round(wins / launched, 3) if launched else 0.0,
+                "p50_ms": round(p50 * 1000, 1), "p95_ms": round(p95 * 1000, 1), "hedge_delay_ms": round(self.hedge_delay() * 1000, 1)}
+
+
+class HedgedSearch:
+    """Search facade that races providers: the secondary starts when the primary is slower than its p95."""
+
+    def __init__(self, providers=None):
+        self.providers = providers or {
+            "tavily": SearchProvider("tavily", lambda q, bypass: tavily_client.search(q, bypass_cache=bypass, return_upstream=True),
+                                     normalize_tavily, lambda: bool(tavily_client.api_key)),
+            "serper": SearchProvider("serper", lambda q, bypass: (google_search(q), True),
+                                     normalize_serper, lambda: bool(os.getenv("SERPER_API_KEY"))),
+        }
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _executor(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="search")
+        return self._pool
+
+    def _order(self):
+        names = [n for n in SEARCH_PROVIDERS if n in self.providers]
+        available = [self.providers[n] for n in names if self.providers[n].available()]
+        # With no keys configured the primary still runs, so callers see its usual empty result
+        return available or [self.providers[n] for n in names[:1]]
+
+    def _run(self, provider, query, bypass):
+        # Latency is recorded for every upstream response, including hedges that lose, so p95 stays honest;
+        # cache hits (near zero) are left out, or they would drag the hedge delay down to its floor
+        start = time.perf_counter()
+        upstream = True
+        with span(f"search.{provider.name}") as current:
+            try:
+                response, upstream = provider.fetch(query, bypass)
+                normalized = provider.normalize(query, response)
+            except Exception as e:
+                current.set(error_class=type(e).__name__)
+                logger.error(f"{provider.name} search failed: {str(e)}")
+                normalized = provider.normalize(query, {})
+            current.set(results=len(normalized["results"]), upstream=upstream)
+        # Callers only record prices from responses that came from the provider, not from a cache
+        normalized["upstream"] = upstream
+        if upstream:
+            provider.latency.observe(time.perf_counter() - start)
+        return provider, normalized, parse_search_response(normalized)
+
+    def _launch(self, provider, query, bypass):
+        with provider._lock:
+            provider.launched += 1
+        increment(f"search.{provider.name}.launched")
+        # Submitted in a copy of the caller's context so its deadline applies to the provider call
+        return self._executor().submit(contextvars.copy_context().run, self._run, provider, query, bypass)
+
+    def search(self, query, accept=has_price, bypass_cache=False):
+        """First normalized response whose parse satisfies accept(parsed); otherwise the first non-empty one, or {}."""
+        order = self._order()
+        if not order:
+            return {}
+        with span("search.hedged") as current:
+            queue = list(order)
+            primary = queue.pop(0)
+            pending = {self._launch(primary, query, bypass_cache)}
+            hedge_at = time.monotonic() + primary.hedge_delay()
+            fallback = None
+            while pending:
+                left = remaining()
+                if left is not None and left <= 0:
+                    current.set(error_class="DeadlineExceeded")
+                    break
+                if queue:
+                    timeout = max(0.0, hedge_at - time.monotonic())
+                    timeout = timeout if left is None else min(timeout, left)
+                else:
+                    timeout = left
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    if queue:
+                        secondary = queue.pop(0)
+                        increment("search.hedges")
+                        current.set(hedged=True)
+                        pending.add(self._launch(secondary, query, bypass_cache))
+                        hedge_at = time.monotonic() + secondary.hedge_delay()
+                    continue
+                for future in done:
+                    provider, normalized, parsed = future.result()
+                    if accept(parsed):
+                        with provider._lock:
+                            provider.wins += 1
+                        increment(f"search.{provider.name}.wins")
+                        current.set(provider=provider.name)
+                        return normalized
+                    if fallback is None and normalized["results"]:
+                        fallback = normalized
+                # An unusable answer is as good as a timeout: start the next provider now
+                if queue:
+                    pending.add(self._launch(queue.pop(0), query, bypass_cache))
+            current.set(provider=fallback["provider"] if fallback else None)
+            return fallback or {}
+
+    def stats(self):
+        return {name: provider.stats() for name, provider in self.providers.items()}
+
+
+search_client = HedgedSearch()
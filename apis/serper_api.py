@@ -1,7 +1,9 @@
 import os
-import httpx
 import logging
 from dotenv import load_dotenv
+from apis.http_transport import get_client, get_async_client
+from apis.call_policy import get_policy, timeout_kwargs
+from utils.telemetry import span
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -9,22 +11,59 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# SERPER_BASE_URL points the client at another host (e.g. a local stand-in server for benchmarks)
+SERPER_URL = os.getenv("SERPER_BASE_URL", "https://google.serper.dev").rstrip("/") + "/search"
+
 def google_search(query):
     api_key = os.getenv("SERPER_API_KEY")
     if not api_key:
         logger.error("SERPER_API_KEY is missing")
         return {}
-    url = "https://google.serper.dev/search"
     headers = {"X-API-KEY": api_key, "Content-Type": "application/json"}
     payload = {"q": query}
-    try:
-        with httpx.Client() as client:
-            response = client.post(url, headers=headers, json=payload)
+    import httpx
+    with span("serper.http") as current:
+
+        def attempt(timeout):
+            response = get_client().post(SERPER_URL, headers=headers, json=payload, **timeout_kwargs(timeout))
+            current.set(status_code=response.status_code, payload_bytes=len(response.content))
             response.raise_for_status()
             return response.json()
-    except httpx.HTTPStatusError as e:
-        logger.error(f"Serper API error: {str(e)}")
+
+        try:
+            return get_policy("serper").call(attempt)
+        except httpx.HTTPStatusError as e:
+            current.set(error_class=type(e).__name__)
+            logger.error(f"Serper API error: {str(e)}")
+            return {}
+        except Exception as e:
+            current.set(error_class=type(e).__name__)
+            logger.error(f"Unexpected error in Serper API: {str(e)}")
+            return {}
+
+async def async_google_search(query):
+    api_key = os.getenv("SERPER_API_KEY")
+    if not api_key:
+        logger.error("SERPER_API_KEY is missing")
         return {}
-    except Exception as e:
-        logger.error(f"Unexpected error in Serper API: {str(e)}")
-        return {}
\ No newline at end of file
+    headers = {"X-API-KEY": api_key, "Content-Type": "application/json"}
+    payload = {"q": query}
+    import httpx
+    with span("serper.http") as current:
+
+        async def attempt(timeout):
+            response = await get_async_client().post(SERPER_URL, headers=headers, json=payload, **timeout_kwargs(timeout))
+            current.set(status_code=response.status_code, payload_bytes=len(response.content))
+            response.raise_for_status()
+            return response.json()
+
+        try:
+            return await get_policy("serper").acall(attempt)
+        except httpx.HTTPStatusError as e:
+            current.set(error_class=type(e).__name__)
+            logger.error(f"Serper API error: {str(e)}")
+            return {}
+        except Exception as e:
+            current.set(error_class=type(e).__name__)
+            logger.error(f"Unexpected error in Serper API: {str(e)}")
+            return {}
@@ -1,7 +1,10 @@
 import os
-import httpx
 import logging
 from dotenv import load_dotenv
+from utils.cache import TieredCache, normalize_key
+from apis.http_transport import get_client, get_async_client
+from apis.call_policy import get_policy, timeout_kwargs
+from utils.telemetry import span
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -9,21 +12,67 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Search results change slowly; identical queries within the TTL share one upstream call
+SEARCH_CACHE_TTL = int(os.getenv("TAVILY_CACHE_TTL", "3600"))
+SEARCH_CACHE_SIZE = int(os.getenv("TAVILY_CACHE_SIZE", "512"))
+# Another host (e.g. the benchmark stub server) can stand in for the real API
+TAVILY_BASE_URL = os.getenv("TAVILY_BASE_URL", "https://api.tavily.com").rstrip("/")
+
 class TavilyClient:
     def __init__(self):
         self.api_key = os.getenv("TAVILY_API_KEY")
-        self.base_url = "https://api.tavily.com/search"
+        self.base_url = f"{TAVILY_BASE_URL}/search"
+        self.cache = TieredCache("tavily_search", maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+        self.policy = get_policy("tavily")
+
+    def search(self, query, bypass_cache=False, return_upstream=False):
+        # Empty results (API errors) are never cached. With return_upstream, returns (results, upstream) where
+        # upstream is True only when this call went to the API (not a cache hit or another caller's request)
+        with span("tavily.search") as current:
+            results, source = self.cache.get_or_compute(normalize_key(query), lambda: self._search(query),
+                                                        bypass=bypass_cache, with_source=True)
+            current.set(**({"coalesced": True} if source == "coalesced" else {"cache_hit": source == "hit"}))
+            upstream = source == "computed"
+            return (results, upstream) if return_upstream else results
+
+    def _search(self, query):
+        with span("tavily.http") as current:
+            headers = {"Content-Type": "application/json"}
+            payload = {"api_key": self.api_key, "query": query}
+
+            def attempt(timeout):
+                response = get_client().post(self.base_url, json=payload, headers=headers, **timeout_kwargs(timeout))
+                current.set(status_code=response.status_code, payload_bytes=len(response.content))
+                response.raise_for_status()
+                return response.json()
+
+            try:
+                return self.policy.call(attempt)
+            except Exception as e:
+                current.set(error_class=type(e).__name__)
+                logger.error(f"Tavily API error: {str(e)}")
+                return {}
 
-    def search(self, query):
-        try:
+    async def async_search(self, query):
+        # Uncached async variant for callers running their own event loop
+        with span("tavily.http") as current:
             headers = {"Content-Type": "application/json"}
             payload = {"api_key": self.api_key, "query": query}
-            with httpx.Client() as client:
-                response = client.post(self.base_url, json=payload, headers=headers)
+
+            async def attempt(timeout):
+                response = await get_async_client().post(self.base_url, json=payload, headers=headers, **timeout_kwargs(timeout))
+                current.set(status_code=response.status_code, payload_bytes=len(response.content))
                 response.raise_for_status()
                 return response.json()
-        except Exception as e:
-            logger.error(f"Tavily API error: {str(e)}")
-            return {}
 
-tavily_client = TavilyClient()
\ No newline at end of file
+            try:
+                return await self.policy.acall(attempt)
+            except Exception as e:
+                current.set(error_class=type(e).__name__)
+                logger.error(f"Tavily API error: {str(e)}")
+                return {}
+
+    def cache_stats(self):
+        return self.cache.stats()
+
+tavily_client = TavilyClient()
@@ -0,0 +1,42 @@
+import os
+import logging
+from apis.http_transport import get_client
+from utils.telemetry import span
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Base URL of a running api_server (e.g. http://workflows:8000); empty means workflows run in-process
+WORKFLOW_API_URL = os.getenv("WORKFLOW_API_URL", "").rstrip("/")
+WORKFLOW_API_TIMEOUT = float(os.getenv("WORKFLOW_API_TIMEOUT", "130"))
+
+
+class WorkflowAPIClient:
+    """Calls the workflows over the JSON API; failures come back in the workflows' {"error": ...} shape."""
+
+    def __init__(self, base_url=WORKFLOW_API_URL, timeout=WORKFLOW_API_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def run(self, name, state):
+        # The API rejects unknown fields and never streams, so only plain input fields are sent
+        payload = {key: value for key, value in dict(state).items() if key != "stream" and value is not None}
+        with span("workflow_api.call", workflow=name) as current:
+            try:
+                response = get_client().post(
+                    f"{self.base_url}/v1/workflows/{name}", json=payload, timeout=self.timeout,
+                    headers={"X-Timeout": str(self.timeout)},
+                )
+                current.set(status_code=response.status_code, payload_bytes=len(response.content))
+                body = response.json()
+            except Exception as e:
+                current.set(error_class=type(e).__name__)
+                logger.error(f"Workflow API error for {name}: {str(e)}")
+                return {"error": f"Workflow API error: {str(e)}"}
+            if response.status_code != 200:
+                current.set(error_class=f"HTTP{response.status_code}")
+                fields = body.get("fields") if isinstance(body, dict) else None
+                detail = "; ".join(f"{k} {v}" for k, v in fields.items()) if fields else body.get("error", response.text)
+                return {"error": f"Workflow API {response.status_code}: {detail}"}
+            return body
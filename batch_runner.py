@@ -0,0 +1,293 @@
+import os
+import io
+import sys
+import csv
+import json
+import math
+import time
+import argparse
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_EVERY = int(os.getenv("BATCH_CHECKPOINT_EVERY", "100"))
+CHECKPOINT_INTERVAL = float(os.getenv("BATCH_CHECKPOINT_INTERVAL", "10"))
+PROGRESS_INTERVAL = float(os.getenv("BATCH_PROGRESS_INTERVAL", "30"))
+# Distinct error messages kept for the summary; the rest are counted under "other"
+MAX_ERROR_KINDS = 50
+# Workflow fields that CSV input converts from text; every other column is passed through as a string
+NUMERIC_FIELDS = {"floors": int, "area_sqft": float, "labor_cost": float, "price": float, "quantity": float}
+BOOLEAN_FIELDS = ("force_refresh",)
+
+
+def _csv_value(key, text):
+    # CSV cells arrive as text; only the known numeric and boolean fields are converted, so codes like
+    # "0123" or a material called "NaN" stay strings. A bad number is left as text for the agent to reject
+    text = text.strip()
+    if key in BOOLEAN_FIELDS and text.lower() in ("true", "false"):
+        return text.lower() == "true"
+    cast = NUMERIC_FIELDS.get(key)
+    if cast is None:
+        return text
+    try:
+        value = float(text)
+    except ValueError:
+        return text
+    if not math.isfinite(value):
+        return text
+    return int(value) if cast is int and value.is_integer() else value
+
+
+def read_records(path):
+    # Yields (index, state) one record at a time, so memory does not grow with the input
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            for index, row in enumerate(csv.DictReader(f)):
+                yield index, {k.strip(): _csv_value(k.strip(), v) for k, v in row.items() if k and v is not None and v.strip() != ""}
+        else:
+            index = -1
+            for line in f:
+                if not line.strip():
+                    continue
+                index += 1
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    record = {"__invalid__": f"Invalid JSON: {str(e)}"}
+                yield index, record if isinstance(record, dict) else {"__invalid__": "Record is not a JSON object"}
+
+
+def run_record(workflow_name, state, timeout=None):
+    # Top-level so process pools can pickle it; the workflow is looked up in the worker
+    from langgraph_workflow import WORKFLOWS
+    from apis.call_policy import deadline
+    start = time.perf_counter()
+    if "__invalid__" in state:
+        return {"error": state["__invalid__"]}, 0.0
+    state = dict(state, stream=False)
+    try:
+        with deadline(timeout):
+            result = WORKFLOWS[workflow_name](state)
+    except Exception as e:
+        result = {"error": f"{type(e).__name__}: {str(e)}"}
+    if not isinstance(result, dict):
+        result = {"error": f"Invalid result from {workflow_name}"}
+    return result, time.perf_counter() - start
+
+
+class Checkpoint:
+    """Resume point: every index up to the watermark is done, plus the sparse set done beyond it.
+
+    output_bytes is the output size the checkpoint covers; on resume the output is cut back to it,
+    so records finished after the last checkpoint are re-run instead of duplicated.
+    """
+
+    def __init__(self, path, identity):
+        self.path = path
+        self.identity = identity
+        self.watermark = -1
+        self.done = set()
+        self.output_bytes = 0
+        self.totals = {"ok": 0, "errors": 0}
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("identity") != self.identity:
+            raise SystemExit(f"Checkpoint {self.path} belongs to a different run {data.get('identity')}; use --fresh to start over")
+        self.watermark = data["watermark"]
+        self.done = set(data["done"])
+        self.output_bytes = data["output_bytes"]
+        self.totals = data.get("totals", self.totals)
+        return True
+
+    def is_done(self, index):
+        return index <= self.watermark or index in self.done
+
+    def mark(self, index):
+        self.done.add(index)
+        while self.watermark + 1 in self.done:
+            self.watermark += 1
+            self.done.discard(self.watermark)
+
+    def save(self, output_bytes):
+        self.output_bytes = output_bytes
+        payload = {"identity": self.identity, "watermark": self.watermark, "done": sorted(self.done),
+                   "output_bytes": output_bytes, "totals": self.totals, "saved_at": time.time()}
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.path + ".tmp", self.path)
+
+
+class BatchRunner:
+    """Streams records through one workflow on a bounded pool, writing JSONL output and checkpoints as it goes."""
+
+    def __init__(self, workflow, input_path, output_path, checkpoint_path=None, executor="thread", workers=8,
+                 max_in_flight=None, timeout=None, max_consecutive_errors=50, fresh=False):
+        self.workflow = workflow
+        self.input_path = input_path
+        self.output_path = output_path
+        self.executor = executor
+        self.workers = workers
+        self.max_in_flight = max_in_flight or workers * 2
+        self.timeout = timeout
+        self.max_consecutive_errors = max_consecutive_errors
+        self.checkpoint = Checkpoint(checkpoint_path or output_path + ".checkpoint",
+                                     {"workflow": workflow, "input": os.path.abspath(input_path)})
+        if fresh:
+            for path in (self.checkpoint.path, output_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        self.error_kinds = Counter()
+        self.stop_reason = None
+        self._held = []
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+
+    def _open_output(self):
+        resumed = self.checkpoint.load()
+        out = open(self.output_path, "a+b")
+        # Anything past the checkpointed size was never acknowledged; it is re-run
+        out.truncate(self.checkpoint.output_bytes if resumed else 0)
+        out.seek(0, io.SEEK_END)
+        return out, resumed
+
+    def _write(self, out, index, result, elapsed):
+        record = {"index": index, "elapsed_ms": round(elapsed * 1000, 1), "result": result}
+        if result.get("error"):
+            record["error"] = result["error"]
+            self.checkpoint.totals["errors"] += 1
+            kind = str(result["error"])[:120]
+            self.error_kinds[kind if kind in self.error_kinds or len(self.error_kinds) < MAX_ERROR_KINDS else "other"] += 1
+        else:
+            self.checkpoint.totals["ok"] += 1
+        out.write((json.dumps(record, default=str, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.checkpoint.mark(index)
+        self._since_checkpoint += 1
+
+    def _finish(self, out, index, result, elapsed):
+        # A run of consecutive errors (e.g. an open breaker or exhausted quota) is held back rather than
+        # recorded; if it reaches the limit the run stops and a resume retries those records
+        if result.get("error"):
+            self._held.append((index, result, elapsed))
+            if len(self._held) >= self.max_consecutive_errors and not self.stop_reason:
+                self.stop_reason = f"{len(self._held)} consecutive errors, last: {result['error']}"
+            return
+        # Once the run is stopping the held errors stay unrecorded, so the resume retries them
+        if not self.stop_reason:
+            for held in self._held:
+                self._write(out, *held)
+            self._held = []
+        self._write(out, index, result, elapsed)
+
+    def _maybe_checkpoint(self, out, force=False):
+        if force or self._since_checkpoint >= CHECKPOINT_EVERY or time.monotonic() - self._last_checkpoint >= CHECKPOINT_INTERVAL:
+            out.flush()
+            os.fsync(out.fileno())
+            self.checkpoint.save(out.tell())
+            self._since_checkpoint = 0
+            self._last_checkpoint = time.monotonic()
+
+    def run(self):
+        out, resumed = self._open_output()
+        if resumed:
+            logger.info(f"Resuming {self.workflow} from record {self.checkpoint.watermark + 1} "
+                        f"({len(self.checkpoint.done)} later records already done)")
+        pool_class = ProcessPoolExecutor if self.executor == "process" else ThreadPoolExecutor
+        pool = pool_class(max_workers=self.workers)
+        start = last_progress = time.monotonic()
+        processed, skipped = 0, 0
+        pending = {}
+        records = read_records(self.input_path)
+        exhausted = False
+        try:
+            while True:
+                # Keep at most max_in_flight records submitted; the input is only read as slots free up
+                while not exhausted and not self.stop_reason and len(pending) < self.max_in_flight:
+                    try:
+                        index, state = next(records)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    if self.checkpoint.is_done(index):
+                        skipped += 1
+                        continue
+                    pending[pool.submit(run_record, self.workflow, state, self.timeout)] = index
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    try:
+                        result, elapsed = future.result()
+                    except Exception as e:
+                        result, elapsed = {"error": f"{type(e).__name__}: {str(e)}"}, 0.0
+                    self._finish(out, index, result, elapsed)
+                    processed += 1
+                self._maybe_checkpoint(out)
+                if time.monotonic() - last_progress >= PROGRESS_INTERVAL:
+                    last_progress = time.monotonic()
+                    rate = processed / max(last_progress - start, 1e-9)
+                    logger.info(f"{processed} records processed ({rate:.1f}/s), watermark {self.checkpoint.watermark}")
+        except KeyboardInterrupt:
+            self.stop_reason = "interrupted"
+            for future in pending:
+                future.cancel()
+        finally:
+            pool.shutdown(wait=self.stop_reason != "interrupted", cancel_futures=True)
+            if not self.stop_reason:
+                # Trailing errors below the limit are ordinary failures and are recorded
+                for held in self._held:
+                    self._write(out, *held)
+                self._held = []
+            self._maybe_checkpoint(out, force=True)
+            out.close()
+        elapsed = time.monotonic() - start
+        return {
+            "workflow": self.workflow,
+            "processed": processed,
+            "skipped_already_done": skipped,
+            "held_for_retry": len(self._held),
+            "elapsed_s": round(elapsed, 2),
+            "throughput_per_s": round(processed / elapsed, 2) if elapsed else 0.0,
+            "totals": dict(self.checkpoint.totals),
+            "errors": dict(self.error_kinds.most_common(10)),
+            "stopped": self.stop_reason,
+            "complete": exhausted and not pending and not self.stop_reason,
+        }
+
+
+def main(argv=None):
+    from langgraph_workflow import WORKFLOWS
+    parser = argparse.ArgumentParser(description="Run a workflow over a JSONL or CSV file of states, resumably.")
+    parser.add_argument("workflow", choices=sorted(WORKFLOWS))
+    parser.add_argument("input", help="JSONL (one state per line) or CSV (one state per row)")
+    parser.add_argument("output", help="JSONL results, appended as records finish")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--max-in-flight", type=int, help="records submitted but not finished (default: 2 x workers)")
+    parser.add_argument("--timeout", type=float, help="time budget per record in seconds")
+    parser.add_argument("--max-consecutive-errors", type=int, default=50, help="stop (resumably) after this many errors in a row")
+    parser.add_argument("--fresh", action="store_true", help="discard the checkpoint and output and start over")
+    args = parser.parse_args(argv)
+    runner = BatchRunner(args.workflow, args.input, args.output, args.checkpoint, args.executor, args.workers,
+                         args.max_in_flight, args.timeout, args.max_consecutive_errors, args.fresh)
+    summary = runner.run()
+    print(json.dumps(summary, indent=2))
+    if summary["stopped"]:
+        return 130 if summary["stopped"] == "interrupted" else 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
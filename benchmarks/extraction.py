@@ -0,0 +1,77 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+
+# Micro-benchmark for utils.extraction / utils.helpers over recorded Tavily responses
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+DEFAULT_DATA = os.path.join(REPO_ROOT, "benchmarks", "data", "tavily_responses.json")
+
+from utils.extraction import parse_search_response, parse_search_responses  # noqa: E402
+from utils.helpers import extract_price, extract_permits, extract_competitor_prices  # noqa: E402
+
+def timeit(fn, rounds):
+    # Best-of-rounds wall time, in seconds
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(responses, rounds, scale):
+    responses = responses * scale
+    n = len(responses)
+
+    def helpers_raw():
+        # Each helper re-parses the raw response
+        for response in responses:
+            extract_price(response)
+            extract_permits(response)
+            extract_competitor_prices(response)
+
+    def helpers_parsed_once():
+        for response in responses:
+            parsed = parse_search_response(response)
+            extract_price(parsed)
+            extract_permits(parsed)
+            extract_competitor_prices(parsed)
+
+    cases = {
+        "parse_only": lambda: [parse_search_response(r) for r in responses],
+        "parse_batch": lambda: parse_search_responses(responses),
+        "helpers_raw": helpers_raw,
+        "helpers_parsed_once": helpers_parsed_once,
+    }
+    report = {"responses": n, "rounds": rounds, "cases": {}}
+    for name, fn in cases.items():
+        seconds = timeit(fn, rounds)
+        report["cases"][name] = {"total_ms": seconds * 1000, "us_per_response": seconds / n * 1e6}
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark search-result extraction on recorded responses.")
+    parser.add_argument("--data", default=DEFAULT_DATA, help="JSON list of recorded Tavily responses")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--scale", type=int, default=25, help="repeat the recorded set this many times")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    # Helper logging would dominate the timings
+    logging.disable(logging.CRITICAL)
+    with open(args.data, encoding="utf-8") as f:
+        responses = json.load(f)
+    report = run(responses, args.rounds, args.scale)
+    print(f"{report['responses']} responses, best of {report['rounds']} rounds")
+    for name, result in report["cases"].items():
+        print(f"  {name:<22} {result['total_ms']:9.2f} ms  {result['us_per_response']:8.2f} us/response")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+
+# Cold-start import benchmark: each sample runs in a fresh interpreter with -X importtime
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TARGETS = ["langgraph_workflow", "streamlit_app"]
+DEFAULT_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))
+
+def parse_importtime(stderr):
+    # Lines look like "import time:   self [us] | cumulative | <indent>module"
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, rest = line.split(":", 1)
+        self_us, cumulative_us, name = rest.split("|", 2)
+        module = name.strip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((module, depth, int(self_us), int(cumulative_us)))
+    return entries
+
+def measure(target, env):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{proc.stderr[-2000:]}")
+    entries = parse_importtime(proc.stderr)
+    total_us = next(cum for module, depth, _, cum in entries if module == target and depth == 0)
+    by_package = defaultdict(int)
+    for module, _, self_us, _ in entries:
+        by_package[module.split(".")[0]] += self_us
+    return total_us / 1000.0, {name: us / 1000.0 for name, us in by_package.items()}
+
+def run(targets, repeat, budget_ms, top):
+    env = dict(os.environ)
+    # Keep benchmark runs from touching the real on-disk caches
+    env.setdefault("CACHE_DIR", os.path.join(REPO_ROOT, ".cache", "startup-bench"))
+    report = {"budget_ms": budget_ms, "targets": {}}
+    for target in targets:
+        totals, packages = [], defaultdict(list)
+        for _ in range(repeat):
+            total_ms, by_package = measure(target, env)
+            totals.append(total_ms)
+            for name, ms in by_package.items():
+                packages[name].append(ms)
+        median_packages = {name: statistics.median(values) for name, values in packages.items()}
+        report["targets"][target] = {
+            "median_ms": statistics.median(totals),
+            "min_ms": min(totals),
+            "max_ms": max(totals),
+            "packages_ms": dict(sorted(median_packages.items(), key=lambda item: -item[1])[:top]),
+            "over_budget": statistics.median(totals) > budget_ms,
+        }
+    return report
+
+def print_report(report):
+    for target, result in report["targets"].items():
+        status = "OVER BUDGET" if result["over_budget"] else "ok"
+        print(f"{target}: median {result['median_ms']:.1f} ms (min {result['min_ms']:.1f}, max {result['max_ms']:.1f}), budget {report['budget_ms']:.0f} ms [{status}]")
+        for name, ms in result["packages_ms"].items():
+            print(f"    {name:<32} {ms:8.1f} ms")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report per-package import time and enforce a cold-start budget.")
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS, help="modules to import (default: %(default)s)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="fail if a target's median import time exceeds this")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per target")
+    parser.add_argument("--top", type=int, default=15, help="packages to list per target")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = run(args.targets, args.repeat, args.budget_ms, args.top)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if any(result["over_budget"] for result in report["targets"].values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import threading
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Local stand-ins for Tavily, Serper and Gemini that replay recorded responses with injected latency and errors
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA = os.path.join(REPO_ROOT, "benchmarks", "data", "tavily_responses.json")
+# Leading query words that identify what kind of search a recording answers
+KIND_WORDS = 3
+
+class Faults:
+    """Latency (lognormal around a median, with a p95) and error injection for one stub."""
+
+    def __init__(self, median_ms=50.0, p95_ms=None, error_rate=0.0, error_status=503, seed=None):
+        self.median = median_ms / 1000.0
+        p95 = (p95_ms if p95_ms is not None else median_ms * 2) / 1000.0
+        # p95 = median * exp(1.645 * sigma)
+        self.sigma = math.log(max(p95, self.median) / self.median) / 1.645 if self.median > 0 else 0.0
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self):
+        # Returns (delay in seconds, injected status or None)
+        with self._lock:
+            delay = self.median * math.exp(self._random.gauss(0, self.sigma)) if self.median > 0 else 0.0
+            failed = self._random.random() < self.error_rate
+        return delay, self.error_status if failed else None
+
+def _words(query):
+    return str(query).lower().split()
+
+class Recordings:
+    """Recorded Tavily responses, looked up by query.
+
+    An unseen query is answered round-robin from the recordings of the same kind (the ones sharing its
+    opening words, e.g. "current price of"), so a material query never gets a permit page back.
+    """
+
+    def __init__(self, path=DEFAULT_DATA):
+        with open(path, encoding="utf-8") as f:
+            self.responses = json.load(f)
+        self.by_query = {" ".join(_words(r.get("query", ""))): r for r in self.responses}
+        self.by_kind = {}
+        for response in self.responses:
+            self.by_kind.setdefault(tuple(_words(response.get("query", ""))[:KIND_WORDS]), []).append(response)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def tavily(self, query):
+        words = _words(query)
+        response = self.by_query.get(" ".join(words))
+        if response is None:
+            candidates = self.by_kind.get(tuple(words[:KIND_WORDS]), self.responses)
+            with self._lock:
+                response = candidates[self._next % len(candidates)]
+                self._next += 1
+        return dict(response, query=query)
+
+    def serper(self, query):
+        results = self.tavily(query).get("results") or []
+        organic = [{"title": r.get("title", ""), "link": r.get("url", ""), "snippet": r.get("content", ""), "position": i + 1}
+                   for i, r in enumerate(results)]
+        return {"searchParameters": {"q": query, "type": "search"}, "organic": organic}
+
+BID_IDS = re.compile(r"- id (\d+):")
+
+def gemini_text(prompt, generation_config):
+    # Structured bid requests get schema-shaped JSON; everything else gets fixed prose
+    if (generation_config or {}).get("responseMimeType") == "application/json":
+        bids = []
+        for item_id in BID_IDS.findall(prompt):
+            materials, labor, overhead, margin = 1200000.0, 600000.0, 200000.0, 12.0
+            bids.append({"id": item_id, "total_bid": (materials + labor + overhead) * (1 + margin / 100), "materials": materials,
+                         "labor": labor, "overhead": overhead, "margin_percent": margin, "notes": "Stub bid"})
+        return json.dumps(bids)
+    return ("Phase 1 (Weeks 1-4): site preparation and foundation. Phase 2 (Weeks 5-12): structure. "
+            "Phase 3 (Weeks 13-20): finishing. Suggested bid ₹2,400 per sqft with a 12% margin.")
+
+def gemini_response(text):
+    return {
+        "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+        "usageMetadata": {"promptTokenCount": 50, "candidatesTokenCount": len(text.split()), "totalTokenCount": 50 + len(text.split())},
+    }
+
+class StubServer:
+    """One threaded HTTP stub on 127.0.0.1; kind is tavily, serper or gemini."""
+
+    def __init__(self, kind, recordings, faults, port=0):
+        self.kind = kind
+        self.recordings = recordings
+        self.faults = faults
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    body = {}
+                delay, status = stub.faults.sample()
+                time.sleep(delay)
+                with stub._lock:
+                    stub.requests += 1
+                    stub.errors += status is not None
+                if status is not None:
+                    # Google's error shape, which the Gemini SDK parses; the search clients only look at the status
+                    self._send(status, {"error": {"code": status, "message": "injected failure", "status": "UNAVAILABLE"}})
+                    return
+                if stub.kind == "tavily":
+                    self._send(200, stub.recordings.tavily(body.get("query", "")))
+                elif stub.kind == "serper":
+                    self._send(200, stub.recordings.serper(body.get("q", "")))
+                else:
+                    prompt = " ".join(p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", []))
+                    response = gemini_response(gemini_text(prompt, body.get("generationConfig")))
+                    # streamGenerateContent (REST, alt=json) answers with a JSON array of chunks
+                    self._send(200, [response] if ":streamGenerateContent" in self.path else response)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name=f"stub-{self.kind}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "injected_errors": self.errors}
+
+def start_stubs(data=DEFAULT_DATA, latency=None, error_rate=0.0, seed=0):
+    # latency maps kind -> (median_ms, p95_ms); returns {kind: StubServer} plus the env that points the clients at them
+    latency = latency or {}
+    recordings = Recordings(data)
+    stubs = {}
+    for offset, kind in enumerate(("tavily", "serper", "gemini")):
+        median_ms, p95_ms = latency.get(kind, (50.0, 120.0) if kind != "gemini" else (300.0, 800.0))
+        stubs[kind] = StubServer(kind, recordings, Faults(median_ms, p95_ms, error_rate, seed=seed + offset)).start()
+    env = {
+        "TAVILY_BASE_URL": stubs["tavily"].url,
+        "SERPER_BASE_URL": stubs["serper"].url,
+        "GEMINI_API_BASE": stubs["gemini"].url,
+        "TAVILY_API_KEY": os.getenv("TAVILY_API_KEY", "stub"),
+        "SERPER_API_KEY": os.getenv("SERPER_API_KEY", "stub"),
+        "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY", "stub"),
+    }
+    return stubs, env
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Tavily/Serper/Gemini stand-in servers until interrupted.")
+    parser.add_argument("--data", default=DEFAULT_DATA)
+    parser.add_argument("--search-latency-ms", type=float, nargs=2, default=(50.0, 120.0), metavar=("MEDIAN", "P95"))
+    parser.add_argument("--gemini-latency-ms", type=float, nargs=2, default=(300.0, 800.0), metavar=("MEDIAN", "P95"))
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+    latency = {"tavily": tuple(args.search_latency_ms), "serper": tuple(args.search_latency_ms), "gemini": tuple(args.gemini_latency_ms)}
+    stubs, env = start_stubs(args.data, latency, args.error_rate)
+    for key, value in env.items():
+        print(f"export {key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for stub in stubs.values():
+            stub.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import argparse
+import platform
+import shutil
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# Offline benchmark: agents and workflows against local Tavily/Serper/Gemini stubs, results written as JSON
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.stub_servers import DEFAULT_DATA, start_stubs  # noqa: E402
+
+AGENTS = ["material_price", "competitor_pricing", "permit_detection", "cost_estimation", "project_scheduling", "bid_optimization"]
+WORKFLOWS = ["material_price", "competitor_pricing", "cost_estimation", "permit_detection", "project_scheduling",
+             "bid_optimization", "full_report", "project_graph"]
+# Materials with recorded search responses; other names are answered from the same recordings in turn
+MATERIALS = ["Cement", "Steel", "Bricks", "Sand", "Aggregate", "TMT Bars", "Ready Mix Concrete", "Tiles"]
+LOCATIONS = ["Mumbai", "Pune", "Jaipur", "Delhi"]
+QUANTILES = (0.5, 0.95, 0.99)
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+def summarize(latencies, errors=0):
+    values = sorted(latencies)
+    summary = {"n": len(values), "errors": errors, "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0}
+    for q in QUANTILES:
+        summary[f"p{int(q * 100)}_ms"] = round(percentile(values, q) * 1000, 2)
+    return summary
+
+def make_state(i):
+    # Every call gets fresh inputs and force_refresh, so no cache or stored price answers it
+    tag = uuid.uuid4().hex[:8]
+    return {
+        "material": MATERIALS[i % len(MATERIALS)],
+        "project_type": ["Residential", "Commercial", "Industrial"][i % 3],
+        "location": LOCATIONS[i % len(LOCATIONS)],
+        "building_type": "Residential",
+        "floors": 1 + i % 5,
+        "area_sqft": 1000 + 50 * i,
+        "labor_cost": 500.0,
+        "alternative_material": "Bricks",
+        "project_details": f"{2 + i % 4}-floor residential building, {1000 + 50 * i} sqft, ref {tag}",
+        "project_data": f"{2 + i % 4}-floor residential building in {LOCATIONS[i % len(LOCATIONS)]}, ref {tag}",
+        "force_refresh": True,
+        "stream": False,
+    }
+
+def _failed(result):
+    return not isinstance(result, dict) or bool(result.get("error")) or bool(result.get("errors"))
+
+def measure(fn, calls):
+    latencies, errors = [], 0
+    for i in range(calls):
+        state = make_state(i)
+        start = time.perf_counter()
+        try:
+            failed = _failed(fn(state))
+        except Exception:
+            failed = True
+        latencies.append(time.perf_counter() - start)
+        errors += failed
+    return summarize(latencies, errors)
+
+def throughput(fn, concurrency, calls):
+    # calls requests shared by concurrency callers; reports completed calls per second and the latency they saw
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    counter = iter(range(calls))
+
+    def caller():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            state = make_state(i)
+            start = time.perf_counter()
+            try:
+                failed = _failed(fn(state))
+            except Exception:
+                failed = True
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                errors[0] += failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(caller)
+    wall = time.perf_counter() - start
+    return dict(summarize(latencies, errors[0]), concurrency=concurrency, wall_s=round(wall, 3),
+                calls_per_s=round(len(latencies) / wall, 2) if wall else 0.0)
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+    except OSError:
+        return None, None
+    return commit or None, dirty
+
+def run_suite(args):
+    latency = {"tavily": tuple(args.search_latency_ms), "serper": tuple(args.search_latency_ms),
+               "gemini": tuple(args.gemini_latency_ms)}
+    stubs, env = start_stubs(args.data, latency, args.error_rate, args.seed)
+    os.environ.update(env)
+    # Every store goes to a throwaway directory, even when the shell points them elsewhere: the runs write stub
+    # prices and checkpoints that must never reach real price history
+    scratch = tempfile.mkdtemp(prefix="bench-cache-")
+    os.environ.update({
+        "CACHE_DIR": scratch,
+        "PRICE_SERIES_DIR": os.path.join(scratch, "price_series"),
+        "PRICE_OBSERVATIONS_DB": os.path.join(scratch, "price_observations.sqlite3"),
+        "WORKFLOW_CHECKPOINT_DB": os.path.join(scratch, "workflow_checkpoints.sqlite3"),
+        "INVENTORY_DB": os.path.join(scratch, "inventory.sqlite3"),
+        "TENDERS_DB": os.path.join(scratch, "tenders.sqlite3"),
+    })
+    if not args.real_limits:
+        # The stubs take any rate; the suite measures the code, not the providers' quotas
+        for provider in ("tavily", "serper", "gemini"):
+            os.environ.setdefault(f"{provider.upper()}_RATE", "100000")
+            os.environ.setdefault(f"{provider.upper()}_BURST", "100000")
+        os.environ.setdefault("CALL_BACKOFF_BASE", "0.01")
+
+    # App modules read their endpoints and limits at import, so they load only once the stubs are up
+    from langgraph_workflow import WORKFLOWS as WORKFLOW_FUNCTIONS, FULL_REPORT_AGENTS
+    from apis.call_policy import policy_stats
+    from benchmarks.extraction import run as run_extraction
+
+    report = {"meta": {}, "agents": {}, "workflows": {}, "throughput": {}, "extraction": {}}
+    try:
+        for name in args.agents:
+            report["agents"][name] = measure(FULL_REPORT_AGENTS[name], args.calls)
+        for name in args.workflows:
+            fn = WORKFLOW_FUNCTIONS[name]
+            if name == "project_graph":
+                # A fresh checkpoint thread per call; resuming would skip the work being measured
+                fn = lambda state, run=fn: run(state, thread_id=uuid.uuid4().hex, resume=False)  # noqa: E731
+            report["workflows"][name] = measure(fn, args.workflow_calls)
+        target = WORKFLOW_FUNCTIONS[args.throughput_workflow]
+        for concurrency in args.concurrency:
+            report["throughput"][f"{args.throughput_workflow}@{concurrency}"] = throughput(
+                target, concurrency, max(args.throughput_calls, concurrency))
+        if not args.skip_extraction:
+            with open(args.data, encoding="utf-8") as f:
+                responses = json.load(f)
+            report["extraction"] = run_extraction(responses, args.extraction_rounds, args.extraction_scale)
+        report["providers"] = policy_stats()
+    finally:
+        report["stubs"] = {kind: stub.stats() for kind, stub in stubs.items()}
+        for stub in stubs.values():
+            stub.stop()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    commit, dirty = git_revision()
+    report["meta"] = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "calls": args.calls,
+            "workflow_calls": args.workflow_calls,
+            "throughput_workflow": args.throughput_workflow,
+            "throughput_calls": args.throughput_calls,
+            "concurrency": args.concurrency,
+            "search_latency_ms": list(args.search_latency_ms),
+            "gemini_latency_ms": list(args.gemini_latency_ms),
+            "error_rate": args.error_rate,
+            "real_limits": args.real_limits,
+            "seed": args.seed,
+        },
+    }
+    return report
+
+def metrics(report):
+    # Flattens a report to {name: (value, higher_is_better)} for comparison
+    flat = {}
+    for section in ("agents", "workflows", "throughput"):
+        for name, result in report.get(section, {}).items():
+            for key in ("p50_ms", "p95_ms"):
+                flat[f"{section}.{name}.{key}"] = (result[key], False)
+            if "calls_per_s" in result:
+                flat[f"{section}.{name}.calls_per_s"] = (result["calls_per_s"], True)
+    for name, result in report.get("extraction", {}).get("cases", {}).items():
+        flat[f"extraction.{name}.us_per_response"] = (result["us_per_response"], False)
+    return flat
+
+def compare(baseline, current, threshold, min_delta_ms=1.0):
+    # Returns the metrics that got worse by more than threshold (a fraction), printing every shared metric;
+    # latencies must also move by min_delta_ms, so sub-millisecond jitter on local agents is not flagged
+    old, new = metrics(baseline), metrics(current)
+    regressions = []
+    print(f"\nAgainst {baseline.get('meta', {}).get('commit') or 'baseline'} (regression threshold {threshold:.0%})")
+    for name in sorted(set(old) & set(new)):
+        (before, higher_is_better), (after, _) = old[name], new[name]
+        if not before:
+            continue
+        change = (after - before) / before
+        worse = -change if higher_is_better else change
+        significant = not name.endswith("_ms") or abs(after - before) >= min_delta_ms
+        flag = "REGRESSION" if worse > threshold and significant else ""
+        if flag:
+            regressions.append(name)
+        print(f"  {name:<55} {before:>11.2f} -> {after:>11.2f}  {change:+7.1%} {flag}")
+    return regressions
+
+def print_report(report):
+    for section in ("agents", "workflows", "throughput"):
+        if not report[section]:
+            continue
+        print(f"\n{section}")
+        for name, result in report[section].items():
+            extra = f"  {result['calls_per_s']:8.2f} calls/s" if "calls_per_s" in result else ""
+            print(f"  {name:<28} n={result['n']:<4} err={result['errors']:<3} p50 {result['p50_ms']:9.2f} ms  "
+                  f"p95 {result['p95_ms']:9.2f} ms  p99 {result['p99_ms']:9.2f} ms{extra}")
+    if report["extraction"]:
+        print("\nextraction")
+        for name, result in report["extraction"]["cases"].items():
+            print(f"  {name:<28} {result['us_per_response']:9.2f} us/response")
+    print(f"\nstub requests: {report['stubs']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the agents and workflows against local provider stubs.")
+    parser.add_argument("--data", default=DEFAULT_DATA, help="JSON list of recorded Tavily responses to replay")
+    parser.add_argument("--agents", nargs="*", choices=AGENTS, default=AGENTS)
+    parser.add_argument("--workflows", nargs="*", choices=WORKFLOWS, default=WORKFLOWS)
+    parser.add_argument("--calls", type=int, default=30, help="sequential calls per agent")
+    parser.add_argument("--workflow-calls", type=int, default=10, help="sequential calls per workflow")
+    parser.add_argument("--throughput-workflow", choices=WORKFLOWS, default="material_price")
+    parser.add_argument("--throughput-calls", type=int, default=200, help="calls per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--search-latency-ms", type=float, nargs=2, default=(50.0, 120.0), metavar=("MEDIAN", "P95"))
+    parser.add_argument("--gemini-latency-ms", type=float, nargs=2, default=(300.0, 800.0), metavar=("MEDIAN", "P95"))
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub responses that are 503s")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--real-limits", action="store_true", help="keep the providers' configured rate limits and backoff")
+    parser.add_argument("--skip-extraction", action="store_true")
+    parser.add_argument("--extraction-rounds", type=int, default=5)
+    parser.add_argument("--extraction-scale", type=int, default=25)
+    parser.add_argument("--json", dest="json_path", help="write the report to this JSON file")
+    parser.add_argument("--compare", help="earlier report to compare against; exits 1 on a regression")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change that counts as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="smallest latency change that counts as a regression")
+    args = parser.parse_args(argv)
+
+    # Agent logging would dominate the timings
+    logging.disable(logging.CRITICAL)
+    report = run_suite(args)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(baseline, report, args.threshold, args.min_delta_ms):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,63 +1,375 @@
-from langgraph.graph import StateGraph, END
 from agents.material_price import material_price_agent
 from agents.competitor_pricing import competitor_pricing_agent
 from agents.cost_estimation import cost_estimation_agent
 from agents.project_scheduling import project_scheduling_agent
 from agents.permit_detection import permit_detection_agent
 from agents.bid_optimization import bid_optimization_agent
+from utils.telemetry import span, log_payload
+from apis.call_policy import deadline
+import os
+import json
+import time
+import sqlite3
+import hashlib
 import logging
+import operator
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Define state schema
-from typing import Dict, Any
+from typing import Dict, Any, TypedDict, Annotated
+
+# Field defaults, applied in one update; mutable defaults are copied per instance
+STATE_DEFAULTS = {
+    "material": "",
+    "price": 100.0,
+    "project_type": "",
+    "competitor_prices": ["No data"],
+    "quantity": 1,
+    "labor_cost": 0.0,
+    "total_cost": 0.0,
+    "project_details": "",
+    "schedule": "No schedule",
+    "location": "",
+    "permits": "No permit information",
+    "project_data": "",
+    "optimal_bid": "No bid suggestion",
+    "error": None,
+    "building_type": "Residential",
+    "floors": 1,
+    "area_sqft": 1000,
+    "estimated_time": 0.0,
+    "alternative_material": "Bricks",
+    "alternative_cost": 0.0,
+    "inventory_materials": {},
+    "force_refresh": False,
+    "stream": False,
+}
+_MUTABLE_DEFAULTS = tuple(k for k, v in STATE_DEFAULTS.items() if isinstance(v, (list, dict)))
 
 class State(Dict[str, Any]):
+    # Still a dict (agents check isinstance(state, dict)), pre-filled with the field defaults; change
+    # tracking lives in IncrementalRunner, so a State pickles and copies like any dict
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.setdefault("material", "")
-        self.setdefault("price", 100.0)
-        self.setdefault("project_type", "")
-        self.setdefault("competitor_prices", ["No data"])
-        self.setdefault("quantity", 1)
-        self.setdefault("labor_cost", 0.0)
-        self.setdefault("total_cost", 0.0)
-        self.setdefault("project_details", "")
-        self.setdefault("schedule", "No schedule")
-        self.setdefault("location", "")
-        self.setdefault("permits", "No permit information")
-        self.setdefault("project_data", "")
-        self.setdefault("optimal_bid", "No bid suggestion")
-        self.setdefault("error", None)
-        self.setdefault("building_type", "Residential")
-        self.setdefault("floors", 1)
-        self.setdefault("area_sqft", 1000)
-        self.setdefault("estimated_time", 0.0)
-        self.setdefault("alternative_material", "Bricks")
-        self.setdefault("alternative_cost", 0.0)
-        self.setdefault("inventory_materials", {})
-
-# Simplified workflow execution to bypass LangGraph issues
-def run_workflow(agent_func, state):
-    logger.info(f"Running workflow with agent {agent_func.__name__} and state: {state}")
-    state = State(state) if isinstance(state, dict) else State()
-    result = agent_func(state)
-    logger.info(f"Workflow result: {result}")
-    return result if isinstance(result, dict) else {"error": f"Invalid result from {agent_func.__name__}"}
+        super().__init__(STATE_DEFAULTS)
+        for key in _MUTABLE_DEFAULTS:
+            self[key] = STATE_DEFAULTS[key].copy()
+        self.update(*args, **kwargs)
+
+def _fingerprint(value):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return json.dumps(value, sort_keys=True, default=str)
+
+class IncrementalRunner:
+    """Memoizes agent results per session and re-runs an agent only when a field it reads changed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._memo = {}
+        self.executed = 0
+        self.skipped = 0
+        self.interaction = {"executed": 0, "skipped": 0}
+
+    def begin_interaction(self):
+        # Call once per Streamlit rerun to reset the per-interaction counters
+        with self._lock:
+            self.interaction = {"executed": 0, "skipped": 0}
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+            self.interaction[name] += 1
+
+    def run(self, agent_func, state):
+        state = state if isinstance(state, State) else State(state)
+        reads = getattr(agent_func, "reads", None)
+        name = agent_func.__name__
+        if reads is None:
+            self._count("executed")
+            return agent_func(state)
+        inputs = {field: _fingerprint(state.get(field)) for field in reads}
+        memo = self._memo.get(name)
+        if memo is not None and not state.get("force_refresh"):
+            changed = {field for field in reads if inputs[field] != memo[0].get(field)}
+            if not changed:
+                self._count("skipped")
+                logger.info(f"Skipping {name}: inputs {list(reads)} unchanged")
+                return memo[1]
+            logger.info(f"Re-running {name}: changed fields {sorted(changed)}")
+        result = agent_func(state)
+        self._count("executed")
+        # Errors and streamed results are not memoized
+        if isinstance(result, dict) and not result.get("error") and not any(k.endswith("_stream") for k in result):
+            with self._lock:
+                self._memo[name] = (inputs, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {"executed": self.executed, "skipped": self.skipped, **{f"interaction_{k}": v for k, v in self.interaction.items()}}
+
+# Time budget for one workflow; every provider call made inside it gets what is left as its timeout
+WORKFLOW_DEADLINE = float(os.getenv("WORKFLOW_DEADLINE", "60"))
+
+# Single-agent execution through that agent's compiled subgraph (no checkpointing, so streamed results pass
+# through, and the agent gets the caller's state unchanged); pass a runner to skip agents whose inputs did not change
+def run_workflow(agent_func, state, runner=None):
+    name = AGENT_NAMES[agent_func]
+    logger.info(f"Running workflow with agent {agent_func.__name__}")
+    log_payload(logger, "Workflow state", state)
+    with deadline(WORKFLOW_DEADLINE), span("workflow.run", agent=agent_func.__name__) as current:
+        state = State(state) if isinstance(state, dict) else State()
+        graph = get_project_graph([name], checkpointed=False, report=False)
+        final = graph.invoke({"inputs": dict(state), "results": {}, "timings": {}, "errors": {}},
+                             {"configurable": {"runner": runner}})
+        result = final["results"][name]
+        log_payload(logger, "Workflow result", result)
+        if result.get("error"):
+            current.set(error_class="AgentError")
+        return result
 
 # Workflow definitions
-material_price_workflow = lambda state: run_workflow(material_price_agent, state)
-competitor_pricing_workflow = lambda state: run_workflow(competitor_pricing_agent, state)
-project_scheduling_workflow = lambda state: run_workflow(project_scheduling_agent, state)
-permit_detection_workflow = lambda state: run_workflow(permit_detection_agent, state)
-bid_optimization_workflow = lambda state: run_workflow(bid_optimization_agent, state)
-
-# Cost Estimation workflow
-def cost_estimation_workflow(state):
-    logger.info(f"Running cost estimation workflow with state: {state}")
+material_price_workflow = lambda state, runner=None: run_workflow(material_price_agent, state, runner)
+competitor_pricing_workflow = lambda state, runner=None: run_workflow(competitor_pricing_agent, state, runner)
+cost_estimation_workflow = lambda state, runner=None: run_workflow(cost_estimation_agent, state, runner)
+project_scheduling_workflow = lambda state, runner=None: run_workflow(project_scheduling_agent, state, runner)
+permit_detection_workflow = lambda state, runner=None: run_workflow(permit_detection_agent, state, runner)
+bid_optimization_workflow = lambda state, runner=None: run_workflow(bid_optimization_agent, state, runner)
+
+# Full project report: independent agents fanned out on a bounded thread pool
+FULL_REPORT_AGENTS = {
+    "material_price": material_price_agent,
+    "competitor_pricing": competitor_pricing_agent,
+    "permit_detection": permit_detection_agent,
+    "cost_estimation": cost_estimation_agent,
+    "project_scheduling": project_scheduling_agent,
+    "bid_optimization": bid_optimization_agent,
+}
+AGENT_NAMES = {agent_func: name for name, agent_func in FULL_REPORT_AGENTS.items()}
+FULL_REPORT_MAX_WORKERS = int(os.getenv("FULL_REPORT_MAX_WORKERS", "6"))
+FULL_REPORT_TIMEOUT = float(os.getenv("FULL_REPORT_TIMEOUT", "120"))
+
+def _prepare_report_state(state):
+    # One project description feeds both the scheduling and the bid prompt
     state = State(state) if isinstance(state, dict) else State()
-    result = cost_estimation_agent(state)
-    logger.info(f"Cost estimation result: {result}")
-    return result if isinstance(result, dict) else {"error": "Invalid result from cost_estimation_agent"}
\ No newline at end of file
+    description = state["project_details"] or state["project_data"]
+    state["project_details"] = state["project_details"] or description
+    state["project_data"] = state["project_data"] or description
+    if not state["project_type"]:
+        state["project_type"] = state["building_type"]
+    return state
+
+def _full_report_state(name, state):
+    # Each agent gets its own copy; competitor pricing expects e.g. "Residential Construction"
+    agent_state = State(state)
+    if name == "competitor_pricing" and not agent_state["project_type"].lower().endswith("construction"):
+        agent_state["project_type"] = f"{agent_state['project_type']} Construction"
+    return agent_state
+
+def _timed_agent(agent_func, state, runner=None):
+    start = time.perf_counter()
+    try:
+        result = runner.run(agent_func, state) if runner is not None else agent_func(state)
+        if not isinstance(result, dict):
+            result = {"error": f"Invalid result from {agent_func.__name__}"}
+    except Exception as e:
+        logger.error(f"Error in {agent_func.__name__}: {str(e)}")
+        result = {"error": f"{type(e).__name__}: {str(e)}"}
+    return result, time.perf_counter() - start
+
+def full_report_workflow(state, timeout=None, runner=None):
+    log_payload(logger, "Running full report workflow with state", state)
+    state = _prepare_report_state(state)
+    timeout = FULL_REPORT_TIMEOUT if timeout is None else timeout
+
+    results, timings, errors = {}, {}, {}
+    start = time.perf_counter()
+    with deadline(timeout), span("workflow.full_report") as current:
+        pool = ThreadPoolExecutor(max_workers=FULL_REPORT_MAX_WORKERS, thread_name_prefix="full-report")
+        # Each task runs in a copy of this context so the deadline reaches the worker threads
+        futures = {
+            pool.submit(contextvars.copy_context().run, _timed_agent, agent_func, _full_report_state(name, state), runner): name
+            for name, agent_func in FULL_REPORT_AGENTS.items()
+        }
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                name = futures[future]
+                results[name], timings[name] = future.result()
+                if results[name].get("error"):
+                    errors[name] = results[name]["error"]
+        except FuturesTimeoutError:
+            for future, name in futures.items():
+                if name not in results:
+                    future.cancel()
+                    results[name] = {"error": f"Timed out after {timeout:g}s"}
+                    errors[name] = results[name]["error"]
+        finally:
+            pool.shutdown(wait=False)
+        if errors:
+            current.set(error_class="AgentError", failed_agents=sorted(errors))
+    wall_time = time.perf_counter() - start
+    logger.info(f"Full report finished in {wall_time:.2f}s (serial sum {sum(timings.values()):.2f}s), errors: {errors}")
+    return {"results": results, "timings": timings, "errors": errors, "wall_time": wall_time}
+
+# Compiled LangGraph pipeline. An edge is declared only where a node reads another node's output; none
+# of the agents does today (each works from the project inputs), so all six run in one parallel
+# superstep. Progress is checkpointed to SQLite: when a Gemini node fails, the writes of the nodes
+# that finished are kept, and a resume re-runs only the failed node instead of redoing the lookups.
+GRAPH_DEPENDENCIES = {
+    "material_price": [],
+    "competitor_pricing": [],
+    "permit_detection": [],
+    "cost_estimation": [],
+    "project_scheduling": [],
+    "bid_optimization": [],
+}
+# Nodes whose Gemini text output signals failure with an "Error..." prefix
+GRAPH_TEXT_OUTPUTS = {"project_scheduling": "schedule", "bid_optimization": "optimal_bid"}
+CHECKPOINT_DB = os.getenv("WORKFLOW_CHECKPOINT_DB", os.path.join(os.getenv("CACHE_DIR", ".cache"), "workflow_checkpoints.sqlite3"))
+
+class GraphState(TypedDict, total=False):
+    inputs: Dict[str, Any]
+    results: Annotated[Dict[str, Any], operator.or_]
+    timings: Annotated[Dict[str, float], operator.or_]
+    errors: Annotated[Dict[str, str], operator.or_]
+
+class NodeFailure(Exception):
+    pass
+
+def _graph_node(name, agent_func, resumable, report):
+    # config["configurable"]["runner"] is an optional IncrementalRunner (single-agent workflows only);
+    # report nodes adjust each agent's copy of the inputs the way the full report does
+    def node(graph_state, config):
+        state = State(graph_state["inputs"])
+        if report:
+            state = _full_report_state(name, state)
+        runner = config.get("configurable", {}).get("runner")
+        with span(f"graph.{name}") as current:
+            result, elapsed = _timed_agent(agent_func, state, runner)
+            text_key = GRAPH_TEXT_OUTPUTS.get(name)
+            if resumable and text_key and str(result.get(text_key, "")).startswith("Error"):
+                # Raising leaves the checkpoint at the last good superstep so the run can resume
+                current.set(error_class="NodeFailure")
+                raise NodeFailure(f"{name}: {result[text_key]}")
+        update = {"results": {name: result}, "timings": {name: elapsed}}
+        if result.get("error"):
+            update["errors"] = {name: result["error"]}
+        return update
+    node.__name__ = f"{name}_node"
+    return node
+
+_graph_lock = threading.Lock()
+_graphs = {}
+_checkpointer = None
+
+def _get_checkpointer():
+    global _checkpointer
+    if _checkpointer is None:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+        directory = os.path.dirname(CHECKPOINT_DB)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _checkpointer = SqliteSaver(sqlite3.connect(CHECKPOINT_DB, check_same_thread=False))
+    return _checkpointer
+
+def build_project_graph(agents=None, checkpointed=True, report=True):
+    # Compiles the pipeline, or the subgraph for a subset of agents (dependencies outside it are dropped).
+    # Checkpointed graphs fail a node on Gemini error text so it can be resumed; the others return it as a result.
+    # report=False passes the inputs to each agent as given (the single-agent workflows)
+    from langgraph.graph import StateGraph, START, END
+    names = [name for name in GRAPH_DEPENDENCIES if agents is None or name in agents]
+    if not names:
+        raise ValueError(f"No known agents in {agents}")
+    builder = StateGraph(GraphState)
+    for name in names:
+        builder.add_node(name, _graph_node(name, FULL_REPORT_AGENTS[name], checkpointed, report))
+    has_successor = set()
+    for name in names:
+        deps = [dep for dep in GRAPH_DEPENDENCIES[name] if dep in names]
+        has_successor.update(deps)
+        builder.add_edge(deps if len(deps) > 1 else (deps[0] if deps else START), name)
+    for name in names:
+        if name not in has_successor:
+            builder.add_edge(name, END)
+    return builder.compile(checkpointer=_get_checkpointer() if checkpointed else None)
+
+def get_project_graph(agents=None, checkpointed=True, report=True):
+    key = (tuple(sorted(agents)) if agents is not None else None, checkpointed, report)
+    graph = _graphs.get(key)
+    if graph is None:
+        with _graph_lock:
+            graph = _graphs.get(key)
+            if graph is None:
+                graph = _graphs[key] = build_project_graph(agents, checkpointed, report)
+    return graph
+
+def _thread_id(inputs, agents):
+    # Same inputs map to the same checkpoint thread, so a retry picks up where the last run failed
+    payload = json.dumps({"inputs": inputs, "agents": sorted(agents) if agents else None}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+def run_project_graph(state, agents=None, thread_id=None, resume=True, timeout=None):
+    state = _prepare_report_state(state)
+    state["stream"] = False
+    inputs = dict(state)
+    graph = get_project_graph(agents)
+    thread_id = thread_id or _thread_id(inputs, agents)
+    config = {"configurable": {"thread_id": thread_id}}
+    start = time.perf_counter()
+    resumed = False
+    # LangGraph runs nodes in a context copy, so the deadline covers every node's provider calls
+    with deadline(FULL_REPORT_TIMEOUT if timeout is None else timeout), span("workflow.project_graph") as current:
+        try:
+            snapshot = graph.get_state(config)
+            if resume and snapshot.next:
+                logger.info(f"Resuming project graph {thread_id} at {list(snapshot.next)}")
+                resumed = True
+                final = graph.invoke(None, config)
+            else:
+                final = graph.invoke({"inputs": inputs, "results": {}, "timings": {}, "errors": {}}, config)
+            failure = None
+        except Exception as e:
+            logger.error(f"Project graph {thread_id} stopped: {str(e)}")
+            current.set(error_class=type(e).__name__)
+            final = graph.get_state(config).values
+            failure = str(e)
+        current.set(resumed=resumed)
+    errors = dict(final.get("errors", {}))
+    pending = list(graph.get_state(config).next) if failure else []
+    if failure:
+        errors["graph"] = failure
+    else:
+        # A finished thread has nothing to resume; dropping it keeps the checkpoint DB from growing per input
+        try:
+            _get_checkpointer().delete_thread(thread_id)
+        except Exception as e:
+            logger.warning(f"Could not delete checkpoint thread {thread_id}: {str(e)}")
+    return {
+        "results": final.get("results", {}),
+        "timings": final.get("timings", {}),
+        "errors": errors,
+        "wall_time": time.perf_counter() - start,
+        "thread_id": thread_id,
+        "resumed": resumed,
+        "pending": pending,
+    }
+
+# Workflows by name, for callers that pick one at run time; each takes a state dict and returns a dict
+WORKFLOWS = {
+    "material_price": material_price_workflow,
+    "competitor_pricing": competitor_pricing_workflow,
+    "cost_estimation": cost_estimation_workflow,
+    "project_scheduling": project_scheduling_workflow,
+    "permit_detection": permit_detection_workflow,
+    "bid_optimization": bid_optimization_workflow,
+    "full_report": full_report_workflow,
+    "project_graph": run_project_graph,
+}
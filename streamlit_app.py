@@ -1,3 +1,4 @@
+import os
 import streamlit as st
 import logging
 from langgraph_workflow import (
@@ -6,10 +7,25 @@ from langgraph_workflow import (
     cost_estimation_workflow,
     project_scheduling_workflow,
     permit_detection_workflow,
-    bid_optimization_workflow
+    bid_optimization_workflow,
+    full_report_workflow,
+    run_project_graph,
+    IncrementalRunner
 )
-from agents.material_price import material_price_agent
-import requests
+from agents.cost_estimation import cost_estimation_batch, BATCH_COLUMNS
+from agents.material_price import material_price_batch, BOM_COLUMNS
+from agents.bid_optimization import bid_optimization_batch
+from apis.tavily_client import tavily_client
+from apis import gemini_client
+from apis.gemini_client import StreamInterrupted
+from apis.call_policy import policy_stats
+from apis.search import search_client
+from apis.workflow_api import WorkflowAPIClient, WORKFLOW_API_URL
+from utils import telemetry
+from utils.telemetry import log_payload
+from utils.inventory import InventoryStore, DEFAULT_SITE, SHORTAGE_BELOW, OVERSTOCK_ABOVE
+from utils.price_series import get_series_store, rolling_stats
+from utils.tenders import TenderStore, TenderPoller, COST_BANDS, SAMPLE_SOURCE, UNKNOWN as UNKNOWN_BAND
 from datetime import datetime
 
 # Set up logging
@@ -18,30 +34,117 @@ logger = logging.getLogger(__name__)
 
 st.title("Construction Assistant for Builders & Contractors")
 
+# Optional Prometheus endpoint (METRICS_PORT); started once per process
+telemetry.start_metrics_server()
+
+# Cross-session TTL for pure workflow results (cost, permits, competitor pricing)
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "3600"))
+
 # Initialize session state for input persistence
-if "material_price" not in st.session_state:
-    st.session_state.material_price = ""
-if "competitor_pricing" not in st.session_state:
-    st.session_state.competitor_pricing = ""
-if "cost_material" not in st.session_state:
-    st.session_state.cost_material = ""
-if "project_scheduling" not in st.session_state:
-    st.session_state.project_scheduling = ""
-if "permit_detection" not in st.session_state:
-    st.session_state.permit_detection = ""
-if "bid_optimization" not in st.session_state:
-    st.session_state.bid_optimization = ""
-if "inventory_materials" not in st.session_state:
-    st.session_state.inventory_materials = {}
-
-tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs([
+SESSION_DEFAULTS = {
+    "material_price": "",
+    "competitor_pricing": "",
+    "cost_material": "",
+    "project_scheduling": "",
+    "permit_detection": "",
+    "bid_optimization": "",
+}
+for key, value in SESSION_DEFAULTS.items():
+    if key not in st.session_state:
+        st.session_state[key] = value
+if "incremental_runner" not in st.session_state:
+    st.session_state.incremental_runner = IncrementalRunner()
+
+# Upper bound on the sweep's floors axis; with the step limits this caps the grid (and its memory) per material
+SWEEP_MAX_FLOORS = int(os.getenv("SWEEP_MAX_FLOORS", "100"))
+
+# Inventory rows rendered per page
+INVENTORY_PAGE_SIZE = int(os.getenv("INVENTORY_PAGE_SIZE", "50"))
+
+# Tenders rendered per page
+TENDER_PAGE_SIZE = int(os.getenv("TENDER_PAGE_SIZE", "20"))
+
+@st.cache_resource
+def tender_poller():
+    # One background poller per process (TENDER_SOURCES, TENDER_POLL_INTERVAL) feeding a local SQLite table
+    return TenderPoller(TenderStore()).start()
+
+@st.cache_resource
+def inventory_store():
+    # One SQLite (WAL) inventory connection per process; every session sees the same stock
+    return InventoryStore()
+
+# Workflows run in-process unless WORKFLOW_API_URL points at api_server.py, which Streamlit then calls like any client
+WORKFLOWS = {
+    "material_price": material_price_workflow,
+    "competitor_pricing": competitor_pricing_workflow,
+    "cost_estimation": cost_estimation_workflow,
+    "project_scheduling": project_scheduling_workflow,
+    "permit_detection": permit_detection_workflow,
+    "bid_optimization": bid_optimization_workflow,
+    "full_report": full_report_workflow,
+    "project_graph": lambda state, runner=None: run_project_graph(state),
+}
+CACHED_WORKFLOWS = ("cost_estimation", "permit_detection", "competitor_pricing")
+
+@st.cache_resource
+def workflow_api():
+    return WorkflowAPIClient() if WORKFLOW_API_URL else None
+
+def lazy_download_button(container, label, build, file_name, mime, key, version=None):
+    # Large exports are only built when asked for; the built file is dropped from the session once downloaded.
+    # version identifies the inputs the file was built from, so a file prepared for other inputs is not offered
+    data_key = f"{key}_data"
+    if container.button(f"Prepare {label[0].lower()}{label[1:]}", key=f"{key}_prepare"):
+        st.session_state[data_key] = (version, build())
+    prepared = st.session_state.get(data_key)
+    if prepared is not None and prepared[0] == version:
+        container.download_button(label, prepared[1], file_name=file_name, mime=mime, key=key,
+                                  on_click=lambda: st.session_state.pop(data_key, None))
+
+def call_workflow(name, state, incremental=True):
+    api = workflow_api()
+    if api is not None:
+        return api.run(name, state)
+    return WORKFLOWS[name](state, runner=runner if incremental else None)
+
+class UncachedResult(Exception):
+    # Carries an error result out of cached_workflow_result so st.cache_data does not store it
+    def __init__(self, result):
+        super().__init__("uncached workflow result")
+        self.result = result
+
+@st.cache_data(ttl=RESULT_CACHE_TTL, show_spinner=False)
+def cached_workflow_result(name, state):
+    result = call_workflow(name, state, incremental=False)
+    if not isinstance(result, dict) or result.get("error"):
+        raise UncachedResult(result)
+    return result
+
+def cached_workflow(name, state):
+    # Results are keyed by the input state and shared across sessions; force_refresh goes straight to the agent
+    if state.get("force_refresh"):
+        return call_workflow(name, state)
+    try:
+        return cached_workflow_result(name, state)
+    except UncachedResult as e:
+        return e.result
+
+# Agents whose inputs did not change since the last run return their memoized result
+runner = st.session_state.incremental_runner
+runner.begin_interaction()
+
+tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8, tab9 = st.tabs([
     "Material Prices", "Competitor Pricing", "Cost Estimation",
-    "Project Scheduling", "Permit Detection", "Bid Optimization", "Government Projects", "Inventory Management"
+    "Project Scheduling", "Permit Detection", "Bid Optimization", "Government Projects", "Inventory Management",
+    "Full Project Report"
 ])
 
-with tab1:
+@st.fragment
+def material_prices_tab():
     st.write("Enter a construction material to fetch its current price in India (INR).")
     material_input = st.text_input("Material name (e.g., Bricks, Cement, Steel):", value=st.session_state.material_price, key="material_price_input")
+    material_refresh = st.checkbox("Force refresh (skip cached search results)", key="material_price_refresh")
     if st.button("Get Price", key="get_price_button"):
         material = material_input.strip()
         if not material:
@@ -50,11 +153,11 @@ with tab1:
         else:
             st.session_state.material_price = material
             logger.info(f"Material input: {material}")
-            state = {"material": material}
-            logger.info(f"State sent to material_price_workflow: {state}")
+            state = {"material": material, "force_refresh": material_refresh}
+            log_payload(logger, "State sent to material_price_workflow", state)
             try:
-                result = material_price_workflow(state)
-                logger.info(f"Material price workflow result: {result}")
+                result = call_workflow("material_price", state)
+                log_payload(logger, "Material price workflow result", result)
                 if result is None:
                     logger.error("Material price workflow returned None")
                     st.error("Failed to fetch material price. Workflow returned no result.")
@@ -62,7 +165,10 @@ with tab1:
                     logger.error(f"Material price error: {result['error']}")
                     st.error(f"Error: {result['error']}")
                 elif "price" in result and isinstance(result["price"], (int, float)):
-                    st.success(f"Current price of {material} in India: ₹{result['price']:.2f}")
+                    unit = f" {result['unit']}" if result.get("unit") else ""
+                    st.success(f"Current price of {material} in India: ₹{result['price']:.2f}{unit}")
+                    if result.get("price_source") == "series":
+                        st.caption(f"From stored price history (recorded {datetime.fromtimestamp(result['observed_at']).strftime('%Y-%m-%d %H:%M')}); tick Force refresh to search again.")
                 else:
                     logger.error(f"Material price result invalid: {result}")
                     st.error("Failed to fetch material price. Invalid result format.")
@@ -70,10 +176,57 @@ with tab1:
                 logger.error(f"Error in material price tab: {str(e)}")
                 st.error(f"Error: {str(e)}")
 
-with tab2:
+    # Price history for the last material looked up, read from its memory-mapped series
+    history_material = st.session_state.material_price
+    if history_material:
+        series = get_series_store().load(history_material)
+        if len(series) > 1:
+            import pandas as pd
+            st.subheader(f"{history_material} price history")
+            window = st.selectbox("Rolling window", ["7d", "30d", "90d", "365d"], index=1, key="material_history_window")
+            stats = rolling_stats(series["ts"], series["price"], window)
+            frame = pd.DataFrame(
+                {"price": stats["price"], f"{window} mean": stats["mean"], f"{window} min": stats["min"], f"{window} max": stats["max"]},
+                index=pd.to_datetime(stats["ts"], unit="s"),
+            )
+            st.line_chart(frame)
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Latest", f"₹{stats['price'][-1]:,.2f}", f"{stats['price'][-1] - stats['mean'][-1]:+,.2f} vs {window} mean")
+            col2.metric(f"{window} range", f"₹{stats['min'][-1]:,.2f} – ₹{stats['max'][-1]:,.2f}")
+            volatility = stats["volatility"][-1]
+            col3.metric(f"{window} volatility", "n/a" if volatility != volatility else f"{volatility * 100:.2f}%")
+
+    st.subheader("Bill of Materials Pricing")
+    st.write("Upload a CSV or Excel file with columns: " + ", ".join(BOM_COLUMNS) + ". Spelling variants (e.g. \"OPC cement 53 grade\" and \"Cement\") are priced once.")
+    bom_file = st.file_uploader("Bill of materials", type=["csv", "xlsx", "xls"], key="bom_upload")
+    bom_refresh = st.checkbox("Force refresh (skip stored prices)", key="bom_refresh")
+    if bom_file is not None and st.button("Price BOM", key="price_bom_button"):
+        try:
+            import pandas as pd
+            if bom_file.name.lower().endswith(".csv"):
+                bom = pd.read_csv(bom_file)
+            else:
+                bom = pd.read_excel(bom_file)
+            priced = material_price_batch(bom, force_refresh=bom_refresh)
+            failed = int((priced["error"] != "").sum())
+            st.success(f"Priced {len(priced) - failed} of {len(priced)} lines ({priced['canonical_material'].nunique()} distinct materials). BOM total: ₹{priced['line_total'].sum():,.2f}")
+            if failed:
+                st.warning(f"{failed} lines could not be priced (or their unit does not match the price's unit) and are left out of the total; see the error column.")
+            st.dataframe(priced)
+            st.download_button("Download priced BOM (CSV)", priced.to_csv(index=False), file_name="priced_bom.csv", mime="text/csv", key="bom_download")
+        except Exception as e:
+            logger.error(f"Error in BOM pricing: {str(e)}")
+            st.error(f"Error: {str(e)}")
+
+with tab1:
+    material_prices_tab()
+
+@st.fragment
+def competitor_pricing_tab():
     st.write("Enter a project type and location to fetch area-wise competitor pricing in India.")
     project_type_input = st.text_input("Project type (e.g., Residential Construction):", value=st.session_state.competitor_pricing, key="competitor_pricing_input")
     location_input = st.text_input("Location (e.g., Rajasthan, Delhi):", key="location_input_competitor")
+    competitor_refresh = st.checkbox("Force refresh (skip cached search results)", key="competitor_pricing_refresh")
     if st.button("Get Competitor Prices", key="get_competitor_prices_button"):
         project_type = project_type_input.strip()
         location = location_input.strip()
@@ -83,11 +236,11 @@ with tab2:
         else:
             st.session_state.competitor_pricing = project_type
             logger.info(f"Project type input: {project_type}, location: {location}")
-            state = {"project_type": project_type, "location": location}
-            logger.info(f"State sent to competitor_pricing_workflow: {state}")
+            state = {"project_type": project_type, "location": location, "force_refresh": competitor_refresh}
+            log_payload(logger, "State sent to competitor_pricing_workflow", state)
             try:
-                result = competitor_pricing_workflow(state)
-                logger.info(f"Competitor pricing workflow result: {result}")
+                result = cached_workflow("competitor_pricing", state)
+                log_payload(logger, "Competitor pricing workflow result", result)
                 if result is None:
                     logger.error("Competitor pricing workflow returned None")
                     st.error("Failed to fetch competitor prices. Workflow returned no result.")
@@ -105,7 +258,11 @@ with tab2:
                 logger.error(f"Error in competitor pricing tab: {str(e)}")
                 st.error(f"Error: {str(e)}")
 
-with tab3:
+with tab2:
+    competitor_pricing_tab()
+
+@st.fragment
+def cost_estimation_tab():
     st.write("Enter details to estimate construction cost, optimize costs, and save time in India.")
     building_type = st.selectbox("Building Type", ["Residential", "Commercial", "Industrial"], key="building_type_input")
     location = st.text_input("Location (e.g., Mumbai, Maharashtra)", key="location_input")
@@ -130,10 +287,10 @@ with tab3:
                 "labor_cost": labor_cost * area_sqft,
                 "alternative_material": alternative_material
             }
-            logger.info(f"State sent to cost_estimation_workflow: {state}")
+            log_payload(logger, "State sent to cost_estimation_workflow", state)
             try:
-                result = cost_estimation_workflow(state)
-                logger.info(f"Cost estimation workflow result: {result}")
+                result = cached_workflow("cost_estimation", state)
+                log_payload(logger, "Cost estimation workflow result", result)
                 if result is None:
                     logger.error("Cost estimation workflow returned None")
                     st.error("Failed to estimate cost and time. Workflow returned no result.")
@@ -144,7 +301,7 @@ with tab3:
                     time_months = result["estimated_time"]
                     st.success(f"Estimated Cost in {location}, India: ₹{result['total_cost']:.2f}")
                     st.success(f"Estimated Time: Approximately {time_months:.1f} months")
-                    if "alternative_cost" in result:
+                    if result.get("alternative_cost") is not None:
                         st.write(f"**Cost Optimization Suggestion:** Switching to {alternative_material} could reduce costs to ₹{result['alternative_cost']:.2f}")
                     if floors > 1 and area_sqft > 1000:
                         st.write(f"**Time-Saving Tip:** Consider modular construction techniques to reduce time by up to 20% for projects with {floors} floors and {area_sqft} sqft.")
@@ -155,7 +312,85 @@ with tab3:
                 logger.error(f"Error in cost estimation tab: {str(e)}")
                 st.error(f"Error: {str(e)}")
 
-with tab4:
+    st.subheader("Portfolio Cost Estimation")
+    st.write("Upload a CSV or Excel file with columns: " + ", ".join(BATCH_COLUMNS) + ". labor_cost is the total for the row; labor_rate (₹ per sqft) is used when it is absent.")
+    portfolio_file = st.file_uploader("Project portfolio", type=["csv", "xlsx", "xls"], key="portfolio_upload")
+    if portfolio_file is not None:
+        try:
+            import pandas as pd
+            if portfolio_file.name.lower().endswith(".csv"):
+                portfolio = pd.read_csv(portfolio_file)
+            else:
+                portfolio = pd.read_excel(portfolio_file)
+            estimates = cost_estimation_batch(portfolio)
+            failed = int((estimates["error"] != "").sum())
+            st.success(f"Estimated {len(estimates) - failed} of {len(estimates)} projects. Total portfolio cost: ₹{estimates['total_cost'].sum():,.2f}")
+            if failed:
+                st.warning(f"{failed} rows could not be estimated; see the error column.")
+            st.dataframe(estimates)
+            st.download_button("Download estimates (CSV)", estimates.to_csv(index=False), file_name="cost_estimates.csv", mime="text/csv", key="portfolio_download")
+        except Exception as e:
+            logger.error(f"Error in portfolio cost estimation: {str(e)}")
+            st.error(f"Error: {str(e)}")
+
+    st.subheader("Sensitivity Sweep")
+    st.write("See how cost and time move across ranges of area, floors, labor rate and material.")
+    run_sweep = st.toggle("Run sensitivity sweep", key="sweep_toggle")
+    if run_sweep:
+        # NumPy/Altair are only imported once the sweep is switched on
+        from agents.cost_sensitivity import cost_sensitivity_sweep, sweep_range, SWEEP_AXES, SWEEP_METRICS
+        import altair as alt
+        sweep_cols = st.columns(3)
+        with sweep_cols[0]:
+            sweep_area_min = st.number_input("Area from (sqft)", min_value=100, value=500, key="sweep_area_min")
+            sweep_area_max = st.number_input("Area to (sqft)", min_value=100, value=5000, key="sweep_area_max")
+            sweep_area_steps = st.number_input("Area steps", min_value=1, max_value=1000, value=20, key="sweep_area_steps")
+        with sweep_cols[1]:
+            sweep_floors_min = st.number_input("Floors from", min_value=1, max_value=SWEEP_MAX_FLOORS, value=1, key="sweep_floors_min")
+            sweep_floors_max = st.number_input("Floors to", min_value=1, max_value=SWEEP_MAX_FLOORS, value=10, key="sweep_floors_max")
+        with sweep_cols[2]:
+            sweep_labor_min = st.number_input("Labor rate from (₹/sqft)", min_value=0.0, value=300.0, key="sweep_labor_min")
+            sweep_labor_max = st.number_input("Labor rate to (₹/sqft)", min_value=0.0, value=800.0, key="sweep_labor_max")
+            sweep_labor_steps = st.number_input("Labor rate steps", min_value=1, max_value=1000, value=20, key="sweep_labor_steps")
+        sweep_materials = st.multiselect("Materials", material_options, default=material_options, key="sweep_materials")
+        sweep_metric = st.selectbox("Metric", SWEEP_METRICS, key="sweep_metric")
+        heat_x = st.selectbox("Heatmap X axis", SWEEP_AXES, index=0, key="sweep_heat_x")
+        heat_y = st.selectbox("Heatmap Y axis", [a for a in SWEEP_AXES if a != heat_x], index=0, key="sweep_heat_y")
+        if sweep_materials:
+            sweep = cost_sensitivity_sweep(
+                sweep_range(sweep_area_min, sweep_area_max, sweep_area_steps),
+                range(int(sweep_floors_min), int(max(sweep_floors_min, sweep_floors_max)) + 1),
+                sweep_range(sweep_labor_min, sweep_labor_max, sweep_labor_steps),
+                sweep_materials,
+                building_type=building_type,
+                alternative_material=alternative_material
+            )
+            st.caption(f"{sweep.size:,} grid points evaluated.")
+            fixed = {}
+            for axis in SWEEP_AXES:
+                if axis not in (heat_x, heat_y):
+                    fixed[axis] = st.selectbox(f"Fix {axis} at", list(sweep.axes[axis]), key=f"sweep_fix_{axis}")
+            heatmap = sweep.sel(**fixed).to_frame(metrics=[sweep_metric])
+            chart = alt.Chart(heatmap).mark_rect().encode(
+                x=alt.X(f"{heat_x}:O", title=heat_x),
+                y=alt.Y(f"{heat_y}:O", title=heat_y),
+                color=alt.Color(f"{sweep_metric}:Q", title=sweep_metric),
+                tooltip=[heat_x, heat_y, sweep_metric]
+            )
+            st.altair_chart(chart, use_container_width=True)
+            st.download_button("Download slice (CSV)", heatmap.to_csv(index=False), file_name="cost_sweep_slice.csv", mime="text/csv", key="sweep_csv_download")
+            sweep_inputs = (sweep_area_min, sweep_area_max, sweep_area_steps, sweep_floors_min, sweep_floors_max, sweep_labor_min,
+                            sweep_labor_max, sweep_labor_steps, tuple(sweep_materials), building_type, alternative_material)
+            lazy_download_button(st, "Download full grid (NumPy .npz)", sweep.to_npz, "cost_sweep.npz",
+                                 "application/octet-stream", "sweep_npz_download", version=sweep_inputs)
+        else:
+            st.info("Select at least one material to run the sweep.")
+
+with tab3:
+    cost_estimation_tab()
+
+@st.fragment
+def project_scheduling_tab():
     st.write("Enter project details to generate a schedule.")
     project_details_input = st.text_area("Project details (e.g., Build a 2000 sqft house in Mumbai):", value=st.session_state.project_scheduling, key="project_scheduling_input")
     if st.button("Generate Schedule", key="generate_schedule_button"):
@@ -166,28 +401,41 @@ with tab4:
         else:
             st.session_state.project_scheduling = project_details
             logger.info(f"Project details input: {project_details}")
-            state = {"project_details": project_details}
-            logger.info(f"State sent to project_scheduling_workflow: {state}")
+            state = {"project_details": project_details, "stream": True}
+            log_payload(logger, "State sent to project_scheduling_workflow", state)
             try:
-                result = project_scheduling_workflow(state)
-                logger.info(f"Project scheduling workflow result: {result}")
+                result = call_workflow("project_scheduling", state)
+                log_payload(logger, "Project scheduling workflow result", result)
                 if result is None:
                     logger.error("Project scheduling workflow returned None")
                     st.error("Failed to generate schedule. Workflow returned no result.")
                 elif "error" in result and result["error"]:
                     logger.error(f"Project scheduling error: {result['error']}")
                     st.error(f"Error: {result['error']}")
+                elif "schedule_stream" in result:
+                    st.success("Project Schedule:")
+                    schedule = st.write_stream(result["schedule_stream"])
+                    if isinstance(schedule, str) and schedule.startswith("Error"):
+                        logger.error(f"Project scheduling error: {schedule}")
+                        st.error(schedule)
                 elif "schedule" in result:
                     st.success("Project Schedule:")
                     st.write(result["schedule"])
                 else:
                     logger.error(f"Project scheduling result invalid: {result}")
                     st.error("Failed to generate schedule. Invalid result format.")
+            except StreamInterrupted as e:
+                logger.error(f"Project schedule stream interrupted: {str(e)}")
+                st.error(f"The schedule above is incomplete; the response was cut off: {str(e)}")
             except Exception as e:
                 logger.error(f"Error in project scheduling tab: {str(e)}")
                 st.error(f"Error: {str(e)}")
 
-with tab5:
+with tab4:
+    project_scheduling_tab()
+
+@st.fragment
+def permit_detection_tab():
     st.write("Enter a location in India to detect required permits and estimate costs.")
     location_input = st.text_input("Location (e.g., Mumbai, Maharashtra):", value=st.session_state.permit_detection, key="permit_detection_input")
     project_type_input = st.selectbox("Project Type", ["Residential", "Commercial", "Industrial"], key="project_type_permit_input")
@@ -201,10 +449,10 @@ with tab5:
             st.session_state.permit_detection = location
             logger.info(f"Location input: {location}, Project type: {project_type}")
             state = {"location": location, "project_type": project_type}
-            logger.info(f"State sent to permit_detection_workflow: {state}")
+            log_payload(logger, "State sent to permit_detection_workflow", state)
             try:
-                result = permit_detection_workflow(state)
-                logger.info(f"Permit detection workflow result: {result}")
+                result = cached_workflow("permit_detection", state)
+                log_payload(logger, "Permit detection workflow result", result)
                 if result is None:
                     logger.error("Permit detection workflow returned None")
                     st.error("Failed to detect permits. Workflow returned no result.")
@@ -212,7 +460,7 @@ with tab5:
                     logger.error(f"Permit detection error: {result['error']}")
                     st.error(f"Error: {result['error']}")
                 elif "permits" in result:
-                    st.success(f"Required permits in {location}, India:")
+                    st.success(f"Required permits in {result.get('resolved_location') or location}, India:")
                     st.write(result["permits"])
                     # Automated Permit Cost Calculator
                     permit_costs = {
@@ -220,7 +468,8 @@ with tab5:
                         "Commercial": {"Mumbai": 100000, "Jaipur": 70000, "Delhi": 90000},
                         "Industrial": {"Mumbai": 150000, "Jaipur": 100000, "Delhi": 120000}
                     }
-                    estimated_cost = permit_costs.get(project_type, {}).get(location.split(",")[0].strip(), 50000)
+                    city = (result.get("place") or {}).get("city")
+                    estimated_cost = permit_costs.get(project_type, {}).get(city, 50000)
                     st.write(f"**Estimated Permit Cost:** ₹{estimated_cost:.2f} (based on 2025 averages)")
                 else:
                     logger.error(f"Permit detection result invalid: {result}")
@@ -229,7 +478,11 @@ with tab5:
                 logger.error(f"Error in permit detection tab: {str(e)}")
                 st.error(f"Error: {str(e)}")
 
-with tab6:
+with tab5:
+    permit_detection_tab()
+
+@st.fragment
+def bid_optimization_tab():
     st.write("Enter project data to optimize your bid.")
     project_data_input = st.text_area("Project data (e.g., Build a 2000 sqft house in Mumbai):", value=st.session_state.bid_optimization, key="bid_optimization_input")
     if st.button("Optimize Bid", key="optimize_bid_button"):
@@ -240,152 +493,314 @@ with tab6:
         else:
             st.session_state.bid_optimization = project_data
             logger.info(f"Project data input: {project_data}")
-            state = {"project_data": project_data}
-            logger.info(f"State sent to bid_optimization_workflow: {state}")
+            state = {"project_data": project_data, "stream": True}
+            log_payload(logger, "State sent to bid_optimization_workflow", state)
             try:
-                result = bid_optimization_workflow(state)
-                logger.info(f"Bid optimization workflow result: {result}")
+                result = call_workflow("bid_optimization", state)
+                log_payload(logger, "Bid optimization workflow result", result)
                 if result is None:
                     logger.error("Bid optimization workflow returned None")
                     st.error("Failed to optimize bid. Workflow returned no result.")
                 elif "error" in result and result["error"]:
                     logger.error(f"Bid optimization error: {result['error']}")
                     st.error(f"Error: {result['error']}")
+                elif "optimal_bid_stream" in result:
+                    st.success("Optimal Bid Suggestion:")
+                    optimal_bid = st.write_stream(result["optimal_bid_stream"])
+                    if isinstance(optimal_bid, str) and optimal_bid.startswith("Error"):
+                        logger.error(f"Bid optimization error: {optimal_bid}")
+                        st.error(optimal_bid)
                 elif "optimal_bid" in result:
                     st.success("Optimal Bid Suggestion:")
                     st.write(result["optimal_bid"])
                 else:
                     logger.error(f"Bid optimization result invalid: {result}")
                     st.error("Failed to optimize bid. Invalid result format.")
+            except StreamInterrupted as e:
+                logger.error(f"Bid optimization stream interrupted: {str(e)}")
+                st.error(f"The bid suggestion above is incomplete; the response was cut off: {str(e)}")
             except Exception as e:
                 logger.error(f"Error in bid optimization tab: {str(e)}")
                 st.error(f"Error: {str(e)}")
 
-with tab7:
-    st.header("Government Construction Project Opportunities")
-    st.subheader(f"Latest Projects in India (Updated: {datetime.now().strftime('%I:%M %p IST, %B %d, %Y')})")
-    st.write("Explore real-time opportunities for builders and contractors. Data fetched from official sources.")
-
-    # API endpoint for real-time government project data (mocked for now)
-    api_url = "https://api.example.com/govt_projects"  # Placeholder URL
-    projects = st.session_state.get("govt_projects", [])
-    if st.button("Refresh Projects"):
+    st.subheader("Batch Bid Screening")
+    st.write("Enter one project per line, or upload a CSV with a project_data column. Projects are priced several per Gemini request as structured bids.")
+    batch_text = st.text_area("Projects (one per line):", key="bid_batch_input")
+    batch_file = st.file_uploader("Projects CSV", type=["csv"], key="bid_batch_upload")
+    if st.button("Screen Bids", key="screen_bids_button"):
         try:
-            response = requests.get(api_url, timeout=10)
-            if response.status_code == 200:
-                projects = response.json()
-                st.session_state["govt_projects"] = projects
-                logger.info("Government projects refreshed successfully")
+            projects = [line for line in batch_text.splitlines() if line.strip()]
+            if batch_file is not None:
+                import pandas as pd
+                uploaded = pd.read_csv(batch_file)
+                if "project_data" not in uploaded:
+                    raise ValueError("CSV needs a project_data column")
+                projects += uploaded["project_data"].dropna().astype(str).tolist()
+            if not projects:
+                st.error("Please enter at least one project.")
             else:
-                logger.error(f"API request failed with status code: {response.status_code}")
-                # Mock new projects on refresh
-                projects = [
-                    {
-                        "name": "Mumbai Coastal Road Phase 2",
-                        "location": "Mumbai, Maharashtra",
-                        "status": "Tendering (Opens Jul 15, 2025)",
-                        "cost": "₹12,000 crore",
-                        "tender_deadline": "Aug 10, 2025",
-                        "apply_process": "Submit bids via Mumbai Metropolitan Region Development Authority (MMRDA) at mmrda.maharashtra.gov.in. Required: Technical proposal, financial bid, experience certificate.",
-                        "contact": "MMRDA Office, Mumbai"
-                    },
-                    {
-                        "name": "Hyderabad Metro Expansion",
-                        "location": "Hyderabad, Telangana",
-                        "status": "Planning (Tender opens Jul 20, 2025)",
-                        "cost": "₹15,000 crore",
-                        "tender_deadline": "Sep 5, 2025",
-                        "apply_process": "Apply through Hyderabad Metro Rail Limited (HMRL) at hmrl.co.in. Submit pre-qualification and bid documents.",
-                        "contact": "HMRL Office, Hyderabad"
-                    }
-                ]
-                st.session_state["govt_projects"] = projects
-                logger.warning("Using mock data due to API failure")
+                bids = bid_optimization_batch(projects)
+                failed = int((bids["error"] != "").sum())
+                st.success(f"Priced {len(bids) - failed} of {len(bids)} projects.")
+                if failed:
+                    st.warning(f"{failed} projects could not be priced; see the error column.")
+                st.dataframe(bids)
+                st.download_button("Download bids (CSV)", bids.to_csv(index=False), file_name="bids.csv", mime="text/csv", key="bid_batch_download")
         except Exception as e:
-            logger.error(f"Error fetching government projects: {str(e)}")
-            projects = [
-                {
-                    "name": "Mumbai Coastal Road Phase 2",
-                    "location": "Mumbai, Maharashtra",
-                    "status": "Tendering (Opens Jul 15, 2025)",
-                    "cost": "₹12,000 crore",
-                    "tender_deadline": "Aug 10, 2025",
-                    "apply_process": "Submit bids via Mumbai Metropolitan Region Development Authority (MMRDA) at mmrda.maharashtra.gov.in. Required: Technical proposal, financial bid, experience certificate.",
-                    "contact": "MMRDA Office, Mumbai"
-                },
-                {
-                    "name": "Hyderabad Metro Expansion",
-                    "location": "Hyderabad, Telangana",
-                    "status": "Planning (Tender opens Jul 20, 2025)",
-                    "cost": "₹15,000 crore",
-                    "tender_deadline": "Sep 5, 2025",
-                    "apply_process": "Apply through Hyderabad Metro Rail Limited (HMRL) at hmrl.co.in. Submit pre-qualification and bid documents.",
-                    "contact": "HMRL Office, Hyderabad"
-                }
-            ]
-            st.session_state["govt_projects"] = projects
-            logger.warning("Using mock data due to network error")
-
-    for project in projects:
-        with st.expander(f"{project['name']} - {project['location']}"):
-            st.write(f"**Status:** {project['status']}")
-            st.write(f"**Estimated Cost:** {project['cost']}")
-            st.write(f"**Tender Deadline:** {project['tender_deadline']}")
-            st.write(f"**Application Process:** {project['apply_process']}")
-            st.write(f"**Contact:** {project['contact']}")
-            st.write("---")
+            logger.error(f"Error in batch bid screening: {str(e)}")
+            st.error(f"Error: {str(e)}")
+
+with tab6:
+    bid_optimization_tab()
+
+@st.fragment
+def government_projects_tab():
+    st.header("Government Construction Project Opportunities")
+    poller = tender_poller()
+    store = poller.store
+    updated = datetime.fromtimestamp(poller.last_poll).strftime('%I:%M %p, %B %d, %Y') if poller.last_poll else "pending"
+    st.subheader(f"Latest Projects in India (Last feed check: {updated})")
+    st.write("Explore opportunities for builders and contractors. Tenders are refreshed in the background and served from a local copy.")
+
+    # Wakes the background poller; the page renders from the local table without waiting on the network
+    if st.button("Refresh Projects"):
+        poller.trigger()
+        st.info("Refresh requested; new or changed tenders will appear on the next rerun.")
+
+    col1, col2 = st.columns(2)
+    state_filter = col1.selectbox("State", ["All states"] + store.states(), key="tender_state_filter")
+    band_filter = col2.multiselect("Cost band", [band for band, _ in COST_BANDS] + [UNKNOWN_BAND], key="tender_band_filter")
+    col1, col2 = st.columns(2)
+    deadline_from = col1.date_input("Deadline from", value=None, key="tender_deadline_from")
+    deadline_to = col2.date_input("Deadline to", value=None, key="tender_deadline_to")
+    search = st.text_input("Search by name or location", key="tender_search").strip()
+    filters = {
+        "state": None if state_filter == "All states" else state_filter,
+        "cost_bands": band_filter,
+        "deadline_from": deadline_from,
+        "deadline_to": deadline_to,
+        "search": search,
+    }
+    total = store.count(**filters)
+    if not total:
+        st.write("No tenders match these filters.")
+    else:
+        pages = (total - 1) // TENDER_PAGE_SIZE + 1
+        page = st.number_input(f"Page (of {pages}, {total} tenders)", min_value=1, max_value=pages, value=1, key="tender_page_input")
+        for project in store.query(limit=TENDER_PAGE_SIZE, offset=(page - 1) * TENDER_PAGE_SIZE, **filters):
+            with st.expander(f"{project['name']} - {project['location']}"):
+                st.write(f"**Status:** {project['status']}")
+                st.write(f"**Estimated Cost:** {project['cost']} ({project['cost_band']})")
+                st.write(f"**Tender Deadline:** {project['tender_deadline']}")
+                st.write(f"**Application Process:** {project['apply_process']}")
+                st.write(f"**Contact:** {project['contact']}")
+                if project["source"] == SAMPLE_SOURCE:
+                    st.caption("Sample listing shown until a tender feed has been fetched.")
+
+    failed = [source for source in store.sources() if source["error"]]
+    if failed:
+        st.caption("Feed errors: " + "; ".join(f"{source['url']}: {source['error'][:80]}" for source in failed))
 
     st.write("**Note:** Ensure compliance with local regulations and submit bids well before deadlines. Regularly check official government portals for updates.")
 
-with tab8:
+with tab7:
+    government_projects_tab()
+
+@st.fragment
+def inventory_tab():
     st.header("Inventory Management Tracker")
     st.write("Track on-site materials to minimize waste and reduce costs.")
-    
-    # Initialize or update inventory
-    if "add_material" not in st.session_state:
-        st.session_state.add_material = ""
-    if "add_quantity" not in st.session_state:
-        st.session_state.add_quantity = 0
-    
+    store = inventory_store()
+    sites = store.sites()
+    site_options = sorted(set(sites) | {DEFAULT_SITE})
+    site = st.selectbox("Site", site_options, index=site_options.index(DEFAULT_SITE), key="inventory_site_input")
+    new_site = st.text_input("Or enter a new site name", key="inventory_new_site_input").strip()
+    site = new_site or site
+
     # Add material to inventory
     st.subheader("Add Material to Inventory")
-    material_input = st.text_input("Material (e.g., Bricks, Cement)", value=st.session_state.add_material, key="inventory_material_input")
-    quantity_input = st.number_input("Quantity", min_value=0, value=st.session_state.add_quantity, key="inventory_quantity_input")
+    material_input = st.text_input("Material (e.g., Bricks, Cement)", key="inventory_material_input")
+    quantity_input = st.number_input("Quantity", min_value=0, value=0, key="inventory_quantity_input")
     if st.button("Add to Inventory", key="add_inventory_button"):
-        if material_input and quantity_input > 0:
-            st.session_state.inventory_materials[material_input] = st.session_state.inventory_materials.get(material_input, 0) + quantity_input
-            st.session_state.add_material = ""
-            st.session_state.add_quantity = 0
-            logger.info(f"Added {quantity_input} units of {material_input} to inventory")
-            st.success(f"Added {quantity_input} units of {material_input} to inventory.")
+        if material_input.strip() and quantity_input > 0:
+            balance = store.add(material_input, quantity_input, site=site)
+            logger.info(f"Added {quantity_input} units of {material_input} to inventory at {site}")
+            st.success(f"Added {quantity_input} units of {material_input} to inventory at {site} (now {balance:g}).")
         else:
             st.error("Please enter a valid material and quantity.")
             logger.warning("Invalid input for adding material to inventory")
 
-    # Display current inventory
-    st.subheader("Current Inventory")
-    if st.session_state.inventory_materials:
-        for material, quantity in st.session_state.inventory_materials.items():
-            st.write(f"{material}: {quantity} units")
-            # Alert for overstocking (>500 units) or shortages (<50 units)
-            if quantity > 500:
-                st.warning(f"Overstocking alert for {material}! Consider reducing orders to minimize waste.")
-            elif quantity < 50:
-                st.warning(f"Shortage alert for {material}! Order more to avoid delays.")
-    else:
-        st.write("No materials tracked yet. Add materials to begin.")
-
     # Remove material option
     st.subheader("Remove Material")
-    remove_material = st.selectbox("Select Material to Remove", list(st.session_state.inventory_materials.keys()), key="remove_material_input")
-    remove_quantity = st.number_input("Quantity to Remove", min_value=0, max_value=st.session_state.inventory_materials.get(remove_material, 0), value=0, key="remove_quantity_input")
+    in_stock = [row["material"] for row in store.balances(site=site, limit=1000, in_stock=True)]
+    remove_material = st.selectbox("Select Material to Remove", in_stock, key="remove_material_input")
+    if remove_material:
+        st.caption(f"In stock at {site}: {store.balance(remove_material, site=site):g} units")
+    # The store rejects removals larger than the balance
+    remove_quantity = st.number_input("Quantity to Remove", min_value=0, value=0, key="remove_quantity_input")
     if st.button("Remove from Inventory", key="remove_inventory_button"):
         if remove_material and remove_quantity > 0:
-            st.session_state.inventory_materials[remove_material] -= remove_quantity
-            if st.session_state.inventory_materials[remove_material] <= 0:
-                del st.session_state.inventory_materials[remove_material]
-            logger.info(f"Removed {remove_quantity} units of {remove_material} from inventory")
-            st.success(f"Removed {remove_quantity} units of {remove_material} from inventory.")
+            try:
+                balance = store.remove(remove_material, remove_quantity, site=site)
+                logger.info(f"Removed {remove_quantity} units of {remove_material} from inventory at {site}")
+                st.success(f"Removed {remove_quantity} units of {remove_material} from inventory (now {balance:g}).")
+            except ValueError as e:
+                st.error(str(e))
         else:
             st.error("Please select a material and valid quantity to remove.")
-            logger.warning("Invalid input for removing material from inventory")
\ No newline at end of file
+            logger.warning("Invalid input for removing material from inventory")
+
+    # Alerts come from indexed range queries rather than a check per rendered row
+    st.subheader("Alerts")
+    alert_site = None if st.checkbox("All sites", key="inventory_all_sites") else site
+    counts = store.alert_counts(site=alert_site)
+    col1, col2 = st.columns(2)
+    col1.metric(f"Shortages (< {SHORTAGE_BELOW:g} units)", counts["shortage"])
+    col2.metric(f"Overstock (> {OVERSTOCK_ABOVE:g} units)", counts["overstock"])
+    if counts["shortage"]:
+        with st.expander("Shortage alerts: order more to avoid delays"):
+            st.dataframe(store.shortages(site=alert_site, limit=INVENTORY_PAGE_SIZE), hide_index=True)
+    if counts["overstock"]:
+        with st.expander("Overstocking alerts: consider reducing orders to minimize waste"):
+            st.dataframe(store.overstock(site=alert_site, limit=INVENTORY_PAGE_SIZE), hide_index=True)
+
+    # Display current inventory, one page at a time
+    st.subheader("Current Inventory")
+    total = store.count(site=alert_site)
+    if total:
+        pages = (total - 1) // INVENTORY_PAGE_SIZE + 1
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key="inventory_page_input")
+        rows = store.balances(site=alert_site, limit=INVENTORY_PAGE_SIZE, offset=(page - 1) * INVENTORY_PAGE_SIZE)
+        st.dataframe(
+            [{"site": r["site"], "material": r["material"], "quantity": r["quantity"],
+              "updated": datetime.fromtimestamp(r["updated_at"]).strftime("%Y-%m-%d %H:%M")} for r in rows],
+            hide_index=True
+        )
+        st.caption(f"{total} site/material balances")
+    else:
+        st.write("No materials tracked yet. Add materials to begin.")
+
+    # Bulk import/export
+    st.subheader("Bulk Import / Export")
+    upload = st.file_uploader("Import movements CSV (site, material, quantity, reason; negative quantity = issue)", type=["csv"], key="inventory_csv_upload")
+    if upload is not None and st.button("Import CSV", key="inventory_import_button"):
+        try:
+            summary = store.import_csv(upload.getvalue().decode("utf-8"), default_site=site)
+            st.success(f"Imported {summary['imported']} movements ({summary['skipped']} rows skipped).")
+        except Exception as e:
+            logger.error(f"Inventory CSV import failed: {str(e)}")
+            st.error(f"Import failed: {str(e)}")
+    col1, col2 = st.columns(2)
+    lazy_download_button(col1, "Export balances (CSV)", lambda: store.export_csv(site=alert_site),
+                         "inventory_balances.csv", "text/csv", "inventory_export_balances")
+    lazy_download_button(col2, "Export movement ledger (CSV)", store.export_movements_csv,
+                         "inventory_movements.csv", "text/csv", "inventory_export_movements")
+
+with tab8:
+    inventory_tab()
+
+@st.fragment
+def full_report_tab():
+    st.header("Full Project Report")
+    st.write("Describe one project to run pricing, permits, cost, schedule and bid agents at once.")
+    report_details = st.text_area("Project description (e.g., Build a 2000 sqft house in Mumbai):", key="report_details_input")
+    report_location = st.text_input("Location (e.g., Mumbai, Maharashtra)", key="report_location_input")
+    report_material = st.text_input("Primary Material (e.g., Bricks)", key="report_material_input")
+    report_building_type = st.selectbox("Building Type", ["Residential", "Commercial", "Industrial"], key="report_building_type_input")
+    report_floors = st.number_input("Number of Floors", min_value=1, value=1, key="report_floors_input")
+    report_area = st.number_input("Area (sqft)", min_value=100, value=1000, key="report_area_input")
+    report_labor = st.number_input("Labor Cost (₹ per sqft)", min_value=0.0, value=500.0, key="report_labor_input")
+    report_checkpointed = st.checkbox("Run as checkpointed pipeline (a failed Gemini step resumes without redoing lookups)", key="report_checkpointed_input")
+    if st.button("Generate Full Report", key="full_report_button"):
+        details = report_details.strip()
+        if not all([details, report_location.strip(), report_material.strip()]):
+            st.error("Please enter a project description, location and primary material.")
+            logger.warning("Missing required fields in Full Project Report tab")
+        else:
+            state = {
+                "project_details": details,
+                "location": report_location.strip(),
+                "material": report_material.strip(),
+                "building_type": report_building_type,
+                "project_type": report_building_type,
+                "floors": report_floors,
+                "area_sqft": report_area,
+                "labor_cost": report_labor * report_area
+            }
+            try:
+                with st.spinner("Running all agents concurrently..."):
+                    report = call_workflow("project_graph" if report_checkpointed else "full_report", state)
+                if not isinstance(report, dict) or report.get("error"):
+                    # The API client answers rejections (429, 422) and transport failures with {"error": ...}
+                    error = report.get("error") if isinstance(report, dict) else "Invalid report"
+                    logger.error(f"Full report failed: {error}")
+                    st.error(f"Error: {error}")
+                    return
+                results = report["results"]
+                if report.get("resumed"):
+                    st.info("Resumed from the last checkpoint; completed steps were not re-run.")
+                if report.get("pending"):
+                    st.warning(f"Stopped before: {', '.join(report['pending'])}. Generate again to resume from the checkpoint.")
+                st.success(f"Report generated in {report['wall_time']:.1f}s (sum of agent times: {sum(report['timings'].values()):.1f}s)")
+                for name, error in report["errors"].items():
+                    st.error(f"{name.replace('_', ' ').title()}: {error}")
+                price = results.get("material_price", {})
+                if not price.get("error"):
+                    st.subheader("Material Price")
+                    st.write(f"{report_material.strip()}: ₹{price.get('price', 0.0):.2f}")
+                competitor = results.get("competitor_pricing", {})
+                if not competitor.get("error"):
+                    st.subheader("Competitor Pricing")
+                    for line in competitor.get("competitor_prices", []):
+                        st.write(f"- {line}")
+                permits = results.get("permit_detection", {})
+                if not permits.get("error"):
+                    st.subheader("Required Permits")
+                    st.write(permits.get("permits"))
+                cost = results.get("cost_estimation", {})
+                if not cost.get("error"):
+                    st.subheader("Cost & Time")
+                    st.write(f"Estimated Cost: ₹{cost.get('total_cost', 0.0):.2f}, Estimated Time: {cost.get('estimated_time', 0.0):.1f} months")
+                schedule = results.get("project_scheduling", {})
+                if not schedule.get("error"):
+                    st.subheader("Project Schedule")
+                    st.write(schedule.get("schedule"))
+                bid = results.get("bid_optimization", {})
+                if not bid.get("error"):
+                    st.subheader("Optimal Bid Suggestion")
+                    st.write(bid.get("optimal_bid"))
+                st.subheader("Agent Timings")
+                st.table({"Agent": list(report["timings"]), "Seconds": [round(t, 3) for t in report["timings"].values()]})
+            except Exception as e:
+                logger.error(f"Error in full report tab: {str(e)}")
+                st.error(f"Error: {str(e)}")
+
+with tab9:
+    full_report_tab()
+
+with st.sidebar:
+    st.subheader("Performance")
+    metrics = telemetry.snapshot()
+    if metrics["spans"]:
+        st.dataframe(
+            [
+                {"span": name, "calls": m["count"], "p50 ms": round(m["p50_ms"], 1), "p95 ms": round(m["p95_ms"], 1),
+                 "p99 ms": round(m["p99_ms"], 1), "errors": m["errors"], "cache hits": m["cache_hits"],
+                 "coalesced": m["coalesced"]}
+                for name, m in metrics["spans"].items()
+            ],
+            hide_index=True
+        )
+    else:
+        st.write("No calls recorded yet.")
+    if WORKFLOW_API_URL:
+        st.caption(f"Workflows served by {WORKFLOW_API_URL}")
+    st.caption(f"Agent runs: {runner.stats()}")
+    st.caption(f"Search cache: {tavily_client.cache_stats()}")
+    st.caption(f"Gemini cache: {gemini_client.cache_stats()}")
+    if metrics["counters"]:
+        st.caption(f"Counters: {metrics['counters']}")
+    st.caption(f"Provider policies: {policy_stats()}")
+    st.caption(f"Search providers: {search_client.stats()}")
+    st.caption(f"Workflow result cache TTL: {RESULT_CACHE_TTL}s")
+    st.download_button("Download metrics (Prometheus text)", telemetry.render_prometheus(), file_name="metrics.txt", mime="text/plain", key="metrics_download")
@@ -0,0 +1,52 @@
+import json
+
+from batch_runner import BatchRunner, Checkpoint, _csv_value
+
+
+def test_checkpoint_watermark_and_sparse_done(tmp_path):
+    path = str(tmp_path / "run.checkpoint")
+    checkpoint = Checkpoint(path, {"workflow": "material_price"})
+    for index in (0, 1, 3, 5):
+        checkpoint.mark(index)
+    assert (checkpoint.watermark, checkpoint.done) == (1, {3, 5})
+    checkpoint.save(123)
+
+    resumed = Checkpoint(path, {"workflow": "material_price"})
+    assert resumed.load()
+    assert [i for i in range(7) if not resumed.is_done(i)] == [2, 4, 6]
+    resumed.mark(2)
+    assert (resumed.watermark, resumed.done, resumed.output_bytes) == (3, {5}, 123)
+
+
+def test_resume_reruns_only_unfinished_records(tmp_path, monkeypatch):
+    import langgraph_workflow
+    source = tmp_path / "in.jsonl"
+    source.write_text("".join(json.dumps({"n": n}) + "\n" for n in range(6)))
+    output = str(tmp_path / "out.jsonl")
+    seen = []
+
+    def flaky(state):
+        seen.append(state["n"])
+        return {"error": "quota"} if state["n"] >= 3 else {"n": state["n"]}
+
+    monkeypatch.setitem(langgraph_workflow.WORKFLOWS, "flaky", flaky)
+    summary = BatchRunner("flaky", str(source), output, workers=1, max_in_flight=1, max_consecutive_errors=3).run()
+    assert summary["stopped"] and not summary["complete"]
+
+    seen.clear()
+    monkeypatch.setitem(langgraph_workflow.WORKFLOWS, "flaky", lambda state: seen.append(state["n"]) or {"n": state["n"]})
+    summary = BatchRunner("flaky", str(source), output, workers=1).run()
+    assert summary["complete"]
+    assert sorted(seen) == [3, 4, 5]
+    with open(output, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert sorted(r["index"] for r in records) == list(range(6))
+    assert not any("error" in r for r in records)
+
+
+def test_csv_values_only_coerce_known_fields():
+    assert _csv_value("floors", "3") == 3
+    assert _csv_value("area_sqft", "1e3") == 1000.0
+    assert _csv_value("material", "NaN") == "NaN"
+    assert _csv_value("location", "0123") == "0123"
+    assert _csv_value("floors", "nan") == "nan"
@@ -0,0 +1,42 @@
+import threading
+import time
+
+from utils.cache import TieredCache
+
+
+def test_concurrent_misses_share_one_fill(tmp_path):
+    cache = TieredCache("test", path=str(tmp_path / "cache.sqlite3"))
+    calls = []
+    release = threading.Event()
+
+    def fill():
+        calls.append(1)
+        release.wait(2)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("key", fill, with_source=True)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(source for _, source in results) == ["coalesced"] * 4 + ["computed"]
+    assert {value for value, _ in results} == {"value"}
+    assert cache.get_or_compute("key", fill, with_source=True) == ("value", "hit")
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 4, 1)
+
+
+def test_uncacheable_values_and_disk_tier(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TieredCache("test", path=path)
+    assert cache.get_or_compute("bad", lambda: "Error: quota", should_cache=lambda v: not v.startswith("Error")) == "Error: quota"
+    assert cache.get("bad") is None
+    cache.get_or_compute("good", lambda: {"price": 380})
+    # A fresh instance (e.g. after a restart) is served from SQLite
+    assert TieredCache("test", path=path).get("good") == {"price": 380}
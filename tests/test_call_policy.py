@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from apis.call_policy import CallPolicy, CircuitOpenError, DeadlineExceeded, TokenBucket, deadline
+
+
+class StatusError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+def fail(code):
+    def attempt(timeout):
+        raise StatusError(code)
+    return attempt
+
+
+def make_policy(**overrides):
+    settings = dict(rate=1000.0, burst=1000, max_attempts=1, breaker_threshold=1, breaker_reset=0.05, backoff_base=0.0)
+    settings.update(overrides)
+    return CallPolicy("test", **settings)
+
+
+def test_non_retryable_probe_does_not_wedge_breaker():
+    policy = make_policy()
+    with pytest.raises(StatusError):
+        policy.call(fail(503))
+    assert policy.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        policy.call(lambda timeout: "ok")
+
+    time.sleep(0.06)
+    # The half-open probe gets a 400: not a provider failure, but the probe must still end
+    with pytest.raises(StatusError):
+        policy.call(fail(400))
+    assert policy.call(lambda timeout: "ok") == "ok"
+    assert policy.breaker.state == "closed"
+
+
+def test_deadline_before_token_does_not_take_probe():
+    policy = make_policy(rate=0.001, burst=1)
+    with pytest.raises(StatusError):
+        policy.call(fail(503))
+    time.sleep(0.06)
+    # The bucket is empty, so the call gives up on the deadline without being granted the probe
+    with deadline(0.01), pytest.raises(DeadlineExceeded):
+        policy.call(lambda timeout: "ok")
+    assert not policy.breaker._probing
+    policy.bucket.refund()
+    assert policy.call(lambda timeout: "ok") == "ok"
+
+
+def test_token_bucket_waits_and_reports_available():
+    bucket = TokenBucket(10.0, 2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.02)
+    assert bucket.reserve(max_wait=0.01) is None
+    assert bucket.available() == pytest.approx(-1.0, abs=0.2)
+
+
+def test_zero_rate_means_unlimited():
+    bucket = TokenBucket(0.0, 1)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.available() is None
+    policy = make_policy(rate=0.0, burst=1)
+    assert [policy.call(lambda timeout: "ok") for _ in range(3)] == ["ok"] * 3
+    assert policy.stats()["tokens"] is None
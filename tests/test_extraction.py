@@ -0,0 +1,31 @@
+from apis.search import has_unit_price
+from utils.extraction import format_price, parse_search_response
+
+
+def parse(content, query="current price of cement in Mumbai"):
+    return parse_search_response({"query": query, "results": [{"content": content, "url": "https://example.com"}]})
+
+
+def test_words_after_an_amount_are_not_units():
+    parsed = parse("Steel costs ₹2200 and cement ₹380 in Mumbai; sand ₹45 approx.")
+    assert [(r.amount, r.unit) for r in parsed.prices] == [(2200.0, None), (380.0, None), (45.0, None)]
+    assert not has_unit_price(parsed)
+
+
+def test_known_units_vendor_and_city():
+    parsed = parse("OPC 53 at ₹380 per bag (ACC Dealers, Pune); sand ₹4,574 per cubic metre; TMT inr 62 kgs")
+    assert [(r.amount, r.unit, r.vendor, r.city) for r in parsed.prices] == [
+        (380.0, "per bag", "ACC Dealers", "Pune"),
+        (4574.0, "per cubic metre", None, None),
+        (62.0, "kgs", None, None),
+    ]
+    assert has_unit_price(parsed)
+    assert format_price(parsed.prices[0]) == "₹380 per bag"
+
+
+def test_query_fields_and_permits():
+    parsed = parse("A building permit and NOC are required; municipal approval takes 30 days.",
+                   query="permits needed in Pune, Maharashtra")
+    assert parsed.location == "pune"
+    assert parsed.material is None
+    assert parsed.permits == ("building permit", "noc", "municipal approval")
@@ -0,0 +1,26 @@
+from utils.gazetteer import format_place, resolve_location, unresolved_message
+
+
+def resolved(text):
+    resolution = resolve_location(text)
+    return resolution.method, format_place(resolution.place)
+
+
+def test_exact_alias_and_ngram_matches():
+    assert resolved("Jaipur") == ("exact", "Jaipur, Rajasthan")
+    assert resolved("Bombay") == ("exact", "Mumbai, Maharashtra")
+    assert resolved("Navi Mumbai, MH") == ("exact", "Navi Mumbai, Maharashtra")
+    assert resolved("Pune Maharashtra India") == ("ngram", "Pune, Maharashtra")
+
+
+def test_fuzzy_match_for_misspellings():
+    assert resolved("Jaipr, Rajasthan") == ("fuzzy", "Jaipur, Rajasthan")
+
+
+def test_ambiguous_conflicting_and_unknown_places():
+    ambiguous = resolve_location("Aurangabad")
+    assert ambiguous.place is None and ambiguous.method == "ambiguous"
+    assert {format_place(p) for p in ambiguous.candidates} == {"Aurangabad, Bihar", "Aurangabad, Maharashtra"}
+    assert "add the state" in unresolved_message(ambiguous)
+    assert resolve_location("Mumbai, Rajasthan").method == "conflict"
+    assert resolve_location("Atlantis").method == "unresolved"
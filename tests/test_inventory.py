@@ -0,0 +1,22 @@
+import pytest
+
+from utils.inventory import InventoryStore
+
+
+def test_import_skips_non_finite_quantities(tmp_path):
+    store = InventoryStore(str(tmp_path / "inventory.sqlite3"))
+    result = store.import_csv("site,material,quantity\nMain Site,Steel,10\nMain Site,Steel,nan\nMain Site,Sand,inf\n,Sand,-inf\n")
+    assert result == {"imported": 1, "skipped": 3}
+    with pytest.raises(ValueError):
+        store.add("Cement", float("nan"))
+
+
+def test_import_rejects_overdraw_and_export_round_trips(tmp_path):
+    store = InventoryStore(str(tmp_path / "inventory.sqlite3"))
+    with pytest.raises(ValueError, match="below zero"):
+        store.import_csv("site,material,quantity\nMain Site,Steel,-50\n")
+    store.import_csv("site,material,quantity\nMain Site,Steel,1234567.5\nMain Site,Steel,-0.25\n")
+    copy = InventoryStore(str(tmp_path / "copy.sqlite3"))
+    copy.import_csv(store.export_csv())
+    assert copy.export_csv() == store.export_csv()
+    assert "1234567.25" in store.export_csv()
@@ -0,0 +1,38 @@
+import time
+
+from utils.extraction import PriceRecord
+from utils.price_observations import PriceObservationStore, is_fresh, quantile
+
+
+def quote(amount, vendor="Apex", city="Jaipur", url="https://example.com/a"):
+    return PriceRecord(amount, "per sqft", vendor, city, url)
+
+
+def test_aggregate_percentiles_per_group(tmp_path):
+    store = PriceObservationStore(str(tmp_path / "obs.sqlite3"))
+    store.record("competitor", "Residential Construction", ["Jaipur, Rajasthan", "Rajasthan"],
+                 [quote(2000, "A"), quote(2200, "B"), quote(2400, "C"), quote(2600, "D"), quote(2800, "E")])
+    aggregate = store.aggregate("competitor", "residential", "Rajasthan")
+    assert (aggregate.count, aggregate.low, aggregate.p25, aggregate.median, aggregate.p75, aggregate.high) == (
+        5, 2000, 2200, 2400, 2600, 2800)
+    assert aggregate.unit == "per sqft"
+    assert is_fresh(aggregate)
+    assert not is_fresh(aggregate, now=time.time() + 30 * 86400)
+    assert store.aggregate("competitor", "commercial", "Rajasthan") is None
+
+
+def test_seen_again_quote_keeps_first_timestamp(tmp_path):
+    store = PriceObservationStore(str(tmp_path / "obs.sqlite3"))
+    store.record("material", "cement", ["India"], [quote(380)])
+    first = store.aggregate("material", "cement", "India")
+    time.sleep(0.01)
+    assert store.record("material", "cement", ["India"], [quote(380)]) == 1
+    again = store.aggregate("material", "cement", "India")
+    assert again.count == 1
+    assert again.updated_at == first.updated_at
+    assert store.observations("material", "cement", "India")[0]["observed_at"] == first.updated_at
+
+
+def test_quantile_interpolates():
+    assert quantile([1.0, 2.0, 3.0, 4.0], 0.5) == 2.5
+    assert quantile([7.0], 0.75) == 7.0
@@ -0,0 +1,41 @@
+import math
+
+import numpy as np
+import pytest
+
+from utils.price_series import DAY, parse_window, rolling_stats
+
+
+def test_count_window_matches_a_direct_computation():
+    prices = [100.0, 110.0, 99.0, 120.0, 130.0, 90.0]
+    stats = rolling_stats(np.arange(len(prices)) * DAY, prices, 3)
+    assert stats["count"].tolist() == [1, 2, 3, 3, 3, 3]
+    for end in range(len(prices)):
+        window = prices[max(0, end - 2):end + 1]
+        assert stats["mean"][end] == pytest.approx(sum(window) / len(window))
+        assert stats["min"][end] == min(window)
+        assert stats["max"][end] == max(window)
+        returns = np.diff(np.log(window))
+        expected = np.std(returns, ddof=1) if len(returns) > 1 else math.nan
+        assert stats["volatility"][end] == pytest.approx(expected, nan_ok=True)
+
+
+def test_time_window_is_half_open():
+    ts = np.array([0.0, 1.0, 2.0, 10.0]) * DAY
+    stats = rolling_stats(ts, [10.0, 20.0, 30.0, 40.0], "2d")
+    # (t - 2d, t]: the point exactly two days back is outside the window
+    assert stats["count"].tolist() == [1, 2, 2, 1]
+    assert stats["mean"].tolist() == [10.0, 15.0, 25.0, 40.0]
+
+
+def test_parse_window():
+    assert parse_window(5) == ("count", 5)
+    assert parse_window("12h") == ("time", 12 * 3600.0)
+    assert parse_window(90.0) == ("time", 90.0)
+    with pytest.raises(ValueError):
+        parse_window("fortnight")
+
+
+def test_empty_series():
+    stats = rolling_stats([], [], "30d")
+    assert len(stats["mean"]) == 0
@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Directory for on-disk caches (survives Streamlit restarts)
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+
+_MISSING = object()
+
+
+def normalize_key(text):
+    # Case- and whitespace-insensitive key, so "Cement  price" == "cement price"
+    return " ".join(str(text).lower().split())
+
+
+class TTLCache:
+    """In-process LRU cache with a per-entry time-to-live."""
+
+    def __init__(self, maxsize=256, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._data[key]
+                self.evictions += 1
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteStore:
+    """JSON key/value store on SQLite with TTL and size-bounded eviction."""
+
+    def __init__(self, path, max_entries=10000, ttl=86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return default
+            if row[1] < now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.evictions += 1
+                return default
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        payload = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, expires_at, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        # Drop expired rows first, then least recently used rows above the bound
+        expired = self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,)).rowcount
+        overflow = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            )
+        self.evictions += expired + max(overflow, 0)
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one upstream call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        # Returns (result, shared) where shared is True for callers that waited on a leader
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = {"event": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+                leader = True
+            else:
+                leader = False
+        if not leader:
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"], True
+        try:
+            call["result"] = fn()
+            return call["result"], False
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call["event"].set()
+
+
+class TieredCache:
+    """Memory LRU in front of an SQLite store, with single-flight fills and counters."""
+
+    def __init__(self, name, maxsize=256, ttl=3600, max_entries=10000, path=None):
+        self.name = name
+        self.ttl = ttl
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        try:
+            self.disk = SQLiteStore(path or os.path.join(CACHE_DIR, f"{name}.sqlite3"), max_entries=max_entries, ttl=ttl)
+        except Exception as e:
+            logger.error(f"Disk cache '{name}' unavailable, using memory only: {str(e)}")
+            self.disk = None
+        self.flight = SingleFlight()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "bypassed": 0}
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get(self, key, default=None):
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            self._count("hits")
+            self._count("memory_hits")
+            return value
+        if self.disk is not None:
+            try:
+                value = self.disk.get(key, _MISSING)
+            except Exception as e:
+                logger.error(f"Disk cache '{self.name}' read failed: {str(e)}")
+                value = _MISSING
+            if value is not _MISSING:
+                self.memory.set(key, value)
+                self._count("hits")
+                self._count("disk_hits")
+                return value
+        return default
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value)
+            except Exception as e:
+                logger.error(f"Disk cache '{self.name}' write failed: {str(e)}")
+
+    def get_or_compute(self, key, fn, bypass=False, should_cache=bool, with_source=False):
+        # bypass skips the lookup but still refreshes the cache with the new value. with_source returns
+        # (value, source), source being "hit", "computed" or "coalesced" (shared another caller's fn)
+        if bypass:
+            self._count("bypassed")
+        else:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return (value, "hit") if with_source else value
+
+        def fill():
+            value = fn()
+            if should_cache(value):
+                self.set(key, value)
+            return value
+
+        value, shared = self.flight.do(key, fill)
+        self._count("coalesced" if shared else "misses")
+        if with_source:
+            return value, "coalesced" if shared else "computed"
+        return value
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["evictions"] = self.memory.evictions + (self.disk.evictions if self.disk is not None else 0)
+        stats["memory_entries"] = len(self.memory)
+        return stats
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
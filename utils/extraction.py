@@ -0,0 +1,91 @@
+import re
+import logging
+from collections import namedtuple
+
+from utils.materials import KNOWN_UNITS, UNIT_ALIASES
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Compact records kept after parsing; raw result content is dropped once scanned
+PriceRecord = namedtuple("PriceRecord", ["amount", "unit", "vendor", "city", "source_url"])
+ParsedResponse = namedtuple("ParsedResponse", ["query", "material", "location", "project_type", "prices", "permits"])
+
+# Unit spellings accepted after an amount, longest first so "cubic metre" wins over "cubic"; words that
+# are also ordinary English ("no", "unit") only count in the "per X" form
+UNIT_WORDS = sorted(KNOWN_UNITS | set(UNIT_ALIASES), key=len, reverse=True)
+BARE_UNIT_WORDS = [w for w in UNIT_WORDS if w not in ("no", "unit")]
+
+def _alternation(words):
+    return "|".join(r"\s+".join(map(re.escape, w.split())) for w in words)
+
+# Precompiled patterns, applied to lowercased content (cheaper than IGNORECASE scanning)
+PRICE_PATTERN = re.compile(
+    r"(?:₹|inr|rs\.?)\s*(\d[\d,]*\.?\d*)"                             # amount, e.g. ₹2,200 / inr 60 / rs. 8
+    rf"(?:\s*(per\s*(?:{_alternation(UNIT_WORDS)})|(?:{_alternation(BARE_UNIT_WORDS)}))(?:e?s)?\b)?"  # optional unit, e.g. per sqft / bags
+    r"(?:\s*\(([^,()]+),\s*([^()]+)\))?"                               # optional "(vendor, city)"
+)
+PERMIT_PATTERN = re.compile(r"building permit|noc|municipal approval|environmental clearance|urban development approval")
+# Query shapes produced by the agents; each is optional so unexpected queries never raise
+MATERIAL_QUERY = re.compile(r"price of (.*?)(?: in|$)", re.IGNORECASE)
+PERMIT_QUERY = re.compile(r"permits needed in ([^,]*)", re.IGNORECASE)
+PROJECT_QUERY = re.compile(r"pricing for (.*)$", re.IGNORECASE)
+
+def _query_field(pattern, query):
+    match = pattern.search(query)
+    return match.group(1).strip().lower() if match else None
+
+def _amount(text):
+    text = text.replace(",", "").rstrip(".")
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+def parse_search_response(search_results):
+    # Single pass over a Tavily-style response into query fields, price records and permits
+    if not isinstance(search_results, dict):
+        search_results = {}
+    query = str(search_results.get("query") or "")
+    prices = []
+    permits = []
+    for result in search_results.get("results") or ():
+        if not isinstance(result, dict):
+            continue
+        content = result.get("content") or ""
+        if not content:
+            continue
+        lower = content.lower()
+        # Vendor/city keep their original case when lowercasing preserved offsets
+        source = content if len(lower) == len(content) else lower
+        url = result.get("url")
+        for match in PRICE_PATTERN.finditer(lower):
+            amount = _amount(match.group(1))
+            if amount is None:
+                continue
+            unit = match.group(2)
+            vendor = source[match.start(3):match.end(3)].strip() if match.group(3) else None
+            city = source[match.start(4):match.end(4)].strip() if match.group(4) else None
+            prices.append(PriceRecord(amount, unit, vendor, city, url))
+        if "permit" in lower or "approval" in lower or "clearance" in lower:
+            permits.extend(PERMIT_PATTERN.findall(lower))
+    return ParsedResponse(
+        query,
+        _query_field(MATERIAL_QUERY, query),
+        _query_field(PERMIT_QUERY, query),
+        _query_field(PROJECT_QUERY, query),
+        tuple(prices),
+        tuple(dict.fromkeys(permits)),
+    )
+
+def parse_search_responses(responses):
+    # Batch mode over many responses (e.g. a BOM or a replayed benchmark set)
+    return [parse_search_response(response) for response in responses]
+
+def as_parsed(search_results):
+    return search_results if isinstance(search_results, ParsedResponse) else parse_search_response(search_results)
+
+def format_price(record):
+    amount = f"{record.amount:.2f}".rstrip("0").rstrip(".")
+    return f"₹{amount} {record.unit}" if record.unit else f"₹{amount}"
@@ -0,0 +1,242 @@
+import os
+import re
+import csv
+import threading
+import functools
+import logging
+from collections import namedtuple, defaultdict, Counter
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "india_gazetteer.csv"))
+RESOLVE_CACHE_SIZE = int(os.getenv("GAZETTEER_CACHE_SIZE", "4096"))
+
+# Canonical key; city and/or district are None for district- or state-level matches
+Place = namedtuple("Place", ["city", "district", "state"])
+# method: exact | ngram | fuzzy | ambiguous | conflict | unresolved; candidates lists the competing places
+Resolution = namedtuple("Resolution", ["query", "place", "method", "candidates"])
+
+CITY, DISTRICT, STATE = 0, 1, 2
+MAX_SPAN_WORDS = 4
+MIN_FUZZY_LENGTH = 4
+NOISE_TOKENS = {"india", "bharat"}
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+
+
+def normalize_name(text):
+    text = str(text or "").lower().replace("&", " and ")
+    words = _NON_WORD.sub(" ", text).split()
+    return " ".join(w for w in words if w not in NOISE_TOKENS and not w.isdigit())
+
+
+def format_place(place):
+    if place is None:
+        return ""
+    if place.city:
+        return place.city if place.city == place.state else f"{place.city}, {place.state}"
+    if place.district:
+        return f"{place.district} district, {place.state}"
+    return place.state
+
+
+def _trigrams(name):
+    padded = f" {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    # Levenshtein distance, returning limit + 1 as soon as it is certain to exceed limit
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _fuzzy_limit(length):
+    return 1 if length <= 5 else 2 if length <= 9 else 3
+
+
+class Gazetteer:
+    """Hash + prefix-trie index over Indian states, districts and cities, with trigram/edit-distance fuzzy lookup."""
+
+    def __init__(self, rows):
+        self._exact = defaultdict(set)     # normalized name -> {(level, Place)}
+        self._grams = defaultdict(set)     # trigram -> {normalized name}
+        self._trie = {}
+        self.places = set()
+        for row in rows:
+            state = row["state"].strip()
+            if row["kind"] == "state":
+                entries = [(STATE, Place(None, None, state), [row["name"], *row["aliases"]])]
+            else:
+                district = row["district"].strip() or None
+                entries = [(CITY, Place(row["name"].strip(), district, state), [row["name"], *row["aliases"]])]
+                if district:
+                    entries.append((DISTRICT, Place(None, district, state), [district]))
+            for level, place, names in entries:
+                self.places.add(place)
+                for name in names:
+                    self._add(normalize_name(name), level, place)
+        self.resolve = functools.lru_cache(maxsize=RESOLVE_CACHE_SIZE)(self._resolve)
+
+    @classmethod
+    def from_csv(cls, path=GAZETTEER_PATH):
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = [
+                {**row, "aliases": [a for a in (row.get("aliases") or "").split("|") if a.strip()]}
+                for row in csv.DictReader(f)
+            ]
+        return cls(rows)
+
+    def _add(self, name, level, place):
+        if not name:
+            return
+        if name not in self._exact:
+            node = self._trie
+            for char in name:
+                node = node.setdefault(char, {})
+            node["$"] = name
+            if len(name) >= MIN_FUZZY_LENGTH:
+                for gram in _trigrams(name):
+                    self._grams[gram].add(name)
+        self._exact[name].add((level, place))
+
+    def suggest(self, prefix, limit=10):
+        # Prefix-trie walk for autocomplete; returns display names of the matched places
+        node = self._trie
+        for char in normalize_name(prefix):
+            node = node.get(char)
+            if node is None:
+                return []
+        names, stack = [], [node]
+        while stack and len(names) < limit:
+            node = stack.pop()
+            if "$" in node:
+                names.append(node["$"])
+            stack.extend(child for key, child in sorted(node.items(), reverse=True) if key != "$")
+        places = {place for name in names for _, place in self._exact[name]}
+        return sorted({format_place(p) for p in places})[:limit]
+
+    def _fuzzy(self, text):
+        # Trigram overlap picks candidates; bounded edit distance decides
+        if len(text) < MIN_FUZZY_LENGTH:
+            return set()
+        overlap = Counter()
+        for gram in _trigrams(text):
+            for name in self._grams.get(gram, ()):
+                overlap[name] += 1
+        limit = _fuzzy_limit(len(text))
+        best, best_distance = [], limit + 1
+        for name, _ in overlap.most_common(12):
+            pair_limit = min(limit, _fuzzy_limit(len(name)))
+            distance = edit_distance(text, name, pair_limit)
+            if distance > pair_limit:
+                continue
+            if distance < best_distance:
+                best, best_distance = [name], distance
+            elif distance == best_distance:
+                best.append(name)
+        return {entry for name in best for entry in self._exact[name]}
+
+    def _scan(self, words):
+        # Greedy longest-span exact matches over word n-grams; returns (mentions, leftover word runs)
+        mentions, leftovers, run, i = [], [], [], 0
+        while i < len(words):
+            for size in range(min(MAX_SPAN_WORDS, len(words) - i), 0, -1):
+                hit = self._exact.get(" ".join(words[i:i + size]))
+                if hit:
+                    mentions.append(hit)
+                    if run:
+                        leftovers.append(run)
+                        run = []
+                    i += size
+                    break
+            else:
+                run.append(words[i])
+                i += 1
+        if run:
+            leftovers.append(run)
+        return mentions, leftovers
+
+    def _resolve(self, text):
+        # Every comma part / word span is a mention; the answer is the most specific place all mentions agree on
+        parts = [normalize_name(p) for p in str(text or "").split(",")]
+        mentions, method = [], "exact"
+        for part in filter(None, parts):
+            hit = self._exact.get(part)
+            if hit:
+                mentions.append(hit)
+                continue
+            found, leftovers = self._scan(part.split())
+            if found:
+                method = "ngram" if method == "exact" else method
+            for run in leftovers:
+                # Unmatched words: the whole run first, then word by word
+                phrase = self._fuzzy(" ".join(run))
+                fuzzy = [phrase] if phrase else [f for f in map(self._fuzzy, run) if f]
+                if fuzzy:
+                    found.extend(fuzzy)
+                    method = "fuzzy"
+            mentions.extend(found)
+        if not mentions:
+            return Resolution(text, None, "unresolved", ())
+        candidates = {
+            (level, place) for mention in mentions for level, place in mention
+            if all(any(_compatible(place, other) for _, other in m) for m in mentions)
+        }
+        if not candidates:
+            everything = {place for mention in mentions for _, place in mention}
+            return Resolution(text, None, "conflict", tuple(sorted(everything, key=format_place)))
+        level = min(level for level, _ in candidates)
+        best = sorted({place for lvl, place in candidates if lvl == level}, key=format_place)
+        if len(best) == 1:
+            return Resolution(text, best[0], method, ())
+        return Resolution(text, None, "ambiguous", tuple(best))
+
+
+def _contains(outer, inner):
+    return (outer.state == inner.state
+            and (outer.district is None or outer.district == inner.district)
+            and (outer.city is None or outer.city == inner.city))
+
+
+def _compatible(a, b):
+    # Same place, or one lies inside the other (Mumbai / Maharashtra)
+    return _contains(a, b) or _contains(b, a)
+
+
+_gazetteer = None
+_lock = threading.Lock()
+
+
+def get_gazetteer():
+    global _gazetteer
+    if _gazetteer is None:
+        with _lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer.from_csv()
+                logger.info(f"Loaded gazetteer with {len(_gazetteer.places)} places")
+    return _gazetteer
+
+
+def resolve_location(text):
+    return get_gazetteer().resolve(text)
+
+
+def unresolved_message(resolution):
+    # User-facing explanation for a location that could not be resolved to one place
+    options = "; ".join(format_place(p) for p in resolution.candidates[:5])
+    if resolution.method == "ambiguous":
+        return f"Location '{resolution.query}' is ambiguous ({options}). Please add the state."
+    if resolution.method == "conflict":
+        return f"Location '{resolution.query}' names places that do not match ({options})."
+    return f"Could not resolve location '{resolution.query}' to an Indian city, district or state."
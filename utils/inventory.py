@@ -0,0 +1,253 @@
+import os
+import io
+import csv
+import math
+import time
+import sqlite3
+import threading
+import logging
+
+from utils.cache import CACHE_DIR
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INVENTORY_DB = os.getenv("INVENTORY_DB", os.path.join(CACHE_DIR, "inventory.sqlite3"))
+DEFAULT_SITE = os.getenv("INVENTORY_DEFAULT_SITE", "Main Site")
+# Alert thresholds (units); same defaults the Inventory tab always used
+SHORTAGE_BELOW = float(os.getenv("INVENTORY_SHORTAGE_BELOW", "50"))
+OVERSTOCK_ABOVE = float(os.getenv("INVENTORY_OVERSTOCK_ABOVE", "500"))
+
+CSV_COLUMNS = ["site", "material", "quantity", "reason"]
+
+# The ledger is append-only; balances are maintained from it by trigger, one upsert per movement
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movements (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    site TEXT NOT NULL COLLATE NOCASE,
+    material TEXT NOT NULL COLLATE NOCASE,
+    delta REAL NOT NULL,
+    reason TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS balances (
+    site TEXT NOT NULL COLLATE NOCASE,
+    material TEXT NOT NULL COLLATE NOCASE,
+    quantity REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (site, material)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_balances_quantity ON balances (quantity);
+CREATE INDEX IF NOT EXISTS idx_balances_site_quantity ON balances (site, quantity);
+CREATE TRIGGER IF NOT EXISTS movements_apply AFTER INSERT ON movements BEGIN
+    INSERT INTO balances (site, material, quantity, updated_at)
+    VALUES (NEW.site, NEW.material, NEW.delta, NEW.ts)
+    ON CONFLICT (site, material) DO UPDATE SET
+        quantity = quantity + excluded.quantity,
+        updated_at = excluded.updated_at;
+END;
+CREATE TRIGGER IF NOT EXISTS movements_no_update BEFORE UPDATE ON movements BEGIN
+    SELECT RAISE(ABORT, 'movements ledger is append-only');
+END;
+CREATE TRIGGER IF NOT EXISTS movements_no_delete BEFORE DELETE ON movements BEGIN
+    SELECT RAISE(ABORT, 'movements ledger is append-only');
+END;
+"""
+
+
+def _name(value):
+    return " ".join(str(value or "").split())
+
+
+class InventoryStore:
+    """Per-site material stock on SQLite: append-only movement ledger plus indexed running balances."""
+
+    def __init__(self, path=INVENTORY_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def _balance(self, site, material):
+        row = self._conn.execute(
+            "SELECT quantity FROM balances WHERE site = ? AND material = ?", (site, material)
+        ).fetchone()
+        return row[0] if row else 0.0
+
+    def record(self, material, delta, site=DEFAULT_SITE, reason=""):
+        # One ledger insert and one balance upsert; returns the new balance
+        material, site = _name(material), _name(site) or DEFAULT_SITE
+        if not material:
+            raise ValueError("Material name is required")
+        # The ledger is append-only, so a NaN or infinite movement could never be taken back out of the balance
+        if not math.isfinite(delta):
+            raise ValueError(f"Quantity must be a finite number, got {delta}")
+        with self._lock:
+            if delta < 0 and self._balance(site, material) + delta < 0:
+                raise ValueError(f"Only {self._balance(site, material):g} units of {material} at {site}")
+            self._conn.execute(
+                "INSERT INTO movements (ts, site, material, delta, reason) VALUES (?, ?, ?, ?, ?)",
+                (time.time(), site, material, float(delta), reason),
+            )
+            balance = self._balance(site, material)
+            self._conn.commit()
+        return balance
+
+    def add(self, material, quantity, site=DEFAULT_SITE, reason="receipt"):
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive")
+        return self.record(material, quantity, site, reason)
+
+    def remove(self, material, quantity, site=DEFAULT_SITE, reason="issue"):
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive")
+        return self.record(material, -quantity, site, reason)
+
+    def balance(self, material, site=DEFAULT_SITE):
+        with self._lock:
+            return self._balance(_name(site), _name(material))
+
+    def _where(self, site, in_stock):
+        clauses, params = [], []
+        if site:
+            clauses.append("site = ?")
+            params.append(_name(site))
+        if in_stock:
+            clauses.append("quantity > 0")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def balances(self, site=None, limit=50, offset=0, in_stock=False):
+        # One page of balances, ordered by site then material
+        where, params = self._where(site, in_stock)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT site, material, quantity, updated_at FROM balances{where} "
+                "ORDER BY site, material LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+        return [{"site": r[0], "material": r[1], "quantity": r[2], "updated_at": r[3]} for r in rows]
+
+    def count(self, site=None, in_stock=False):
+        where, params = self._where(site, in_stock)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM balances{where}", params).fetchone()[0]
+
+    def sites(self):
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT DISTINCT site FROM balances ORDER BY site")]
+
+    def _range(self, condition, value, order, site, limit):
+        where = f" WHERE {condition}" + (" AND site = ?" if site else "")
+        params = (value, _name(site)) if site else (value,)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT site, material, quantity FROM balances{where} ORDER BY quantity {order} LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [{"site": r[0], "material": r[1], "quantity": r[2]} for r in rows]
+
+    def shortages(self, site=None, below=SHORTAGE_BELOW, limit=100):
+        # Range scan on the quantity index, lowest stock first
+        return self._range("quantity < ?", below, "ASC", site, limit)
+
+    def overstock(self, site=None, above=OVERSTOCK_ABOVE, limit=100):
+        return self._range("quantity > ?", above, "DESC", site, limit)
+
+    def alert_counts(self, site=None, below=SHORTAGE_BELOW, above=OVERSTOCK_ABOVE):
+        site_clause = " AND site = ?" if site else ""
+        extra = (_name(site),) if site else ()
+        with self._lock:
+            shortage = self._conn.execute(f"SELECT COUNT(*) FROM balances WHERE quantity < ?{site_clause}", (below, *extra)).fetchone()[0]
+            overstock = self._conn.execute(f"SELECT COUNT(*) FROM balances WHERE quantity > ?{site_clause}", (above, *extra)).fetchone()[0]
+        return {"shortage": shortage, "overstock": overstock}
+
+    def movements(self, site=None, material=None, limit=50, offset=0):
+        clauses, params = [], []
+        if site:
+            clauses.append("site = ?")
+            params.append(_name(site))
+        if material:
+            clauses.append("material = ?")
+            params.append(_name(material))
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, ts, site, material, delta, reason FROM movements{where} ORDER BY id DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+        return [{"id": r[0], "ts": r[1], "site": r[2], "material": r[3], "delta": r[4], "reason": r[5]} for r in rows]
+
+    def import_csv(self, file, default_site=DEFAULT_SITE):
+        # Bulk movements (site, material, quantity[, reason]) in one transaction; negative quantities are issues
+        reader = csv.DictReader(io.StringIO(file) if isinstance(file, str) else file)
+        now = time.time()
+        rows, lines, skipped = [], [], 0
+        for record in reader:
+            material = _name(record.get("material"))
+            try:
+                quantity = float(record.get("quantity") or "")
+            except ValueError:
+                quantity = 0.0
+            # nan/inf parse as floats but would poison the balance for good
+            if not material or not quantity or not math.isfinite(quantity):
+                skipped += 1
+                continue
+            site = _name(record.get("site")) or default_site
+            rows.append((now, site, material, quantity, record.get("reason") or "import"))
+            lines.append(reader.line_num)
+        with self._lock:
+            # Same rule as record(): no row may take a site's stock below zero; one bad row rejects the import
+            running, overdrawn = {}, []
+            for line, (_, site, material, quantity, _) in zip(lines, rows):
+                key = (site.casefold(), material.casefold())
+                if key not in running:
+                    running[key] = self._balance(site, material)
+                running[key] += quantity
+                if quantity < 0 and running[key] < 0:
+                    overdrawn.append(f"row {line} ({material} at {site})")
+            if overdrawn:
+                shown = ", ".join(overdrawn[:5]) + (f" and {len(overdrawn) - 5} more" if len(overdrawn) > 5 else "")
+                raise ValueError(f"Import would take stock below zero: {shown}")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO movements (ts, site, material, delta, reason) VALUES (?, ?, ?, ?, ?)", rows
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        logger.info(f"Imported {len(rows)} inventory movements ({skipped} rows skipped)")
+        return {"imported": len(rows), "skipped": skipped}
+
+    def export_csv(self, site=None):
+        # Current balances in the import format, so an export re-imports as opening stock
+        where, params = self._where(site, False)
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(CSV_COLUMNS)
+        with self._lock:
+            for site_name, material, quantity in self._conn.execute(
+                f"SELECT site, material, quantity FROM balances{where} ORDER BY site, material", params
+            ):
+                writer.writerow([site_name, material, repr(float(quantity)), "opening"])
+        return output.getvalue()
+
+    def export_movements_csv(self):
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(["id", "ts", *CSV_COLUMNS])
+        with self._lock:
+            for row in self._conn.execute("SELECT id, ts, site, material, delta, reason FROM movements ORDER BY id"):
+                writer.writerow(row)
+        return output.getvalue()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,113 @@
+import os
+import re
+import csv
+import threading
+import functools
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MATERIAL_ALIASES_PATH = os.getenv(
+    "MATERIAL_ALIASES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "material_aliases.csv")
+)
+
+# Grades, sizes and pack units ("53 grade", "Fe500", "12mm", "50 kg bags") do not change which material is meant
+NOISE_WORDS = {"grade", "kg", "kgs", "bag", "bags", "ton", "tons", "tonne", "tonnes", "mt", "cft", "cum", "sqft",
+               "nos", "no", "pcs", "piece", "pieces", "mm", "per", "of", "quality", "best", "premium", "standard"}
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+
+# Spellings of the same quantity unit, for checking a BOM line's unit against the unit a price was quoted in
+UNIT_ALIASES = {
+    "ton": "tonne", "mt": "tonne", "metric ton": "tonne", "metric tonne": "tonne", "kgs": "kg", "kilogram": "kg",
+    "qtl": "quintal", "no": "piece", "nos": "piece", "pc": "piece", "pcs": "piece", "unit": "piece",
+    "cum": "cubic meter", "m3": "cubic meter", "cu m": "cubic meter", "cubic metre": "cubic meter",
+    "cft": "cubic foot", "cubic feet": "cubic foot", "sq ft": "sqft", "square feet": "sqft", "square foot": "sqft",
+    "each": "piece", "sq m": "sqm", "square meter": "sqm", "square metre": "sqm", "metre": "meter", "rmt": "meter",
+    "liter": "litre", "ltr": "litre",
+}
+# Canonical quantity units; a word after a price only counts as its unit when unit_key maps it to one of these
+KNOWN_UNITS = {"bag", "kg", "quintal", "tonne", "piece", "cubic meter", "cubic foot", "sqft", "sqm", "meter", "litre", "brass"}
+# Mass units convert through kilograms; any other pair of different units is not convertible
+MASS_IN_KG = {"kg": 1.0, "quintal": 100.0, "tonne": 1000.0}
+
+
+def _singular(word):
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def material_key(name):
+    # "OPC Cement 53 Grade (50kg bags)" -> "opc cement"
+    words = _NON_WORD.sub(" ", str(name or "").lower()).split()
+    return " ".join(_singular(w) for w in words if w not in NOISE_WORDS and not any(c.isdigit() for c in w))
+
+
+def unit_key(unit):
+    # "per Bags" -> "bag", "MT" -> "tonne"; "" when no unit is given
+    text = " ".join(_NON_WORD.sub(" ", str(unit or "").lower()).split())
+    if text.startswith("per "):
+        text = text[4:]
+    text = " ".join(_singular(w) for w in text.split())
+    return UNIT_ALIASES.get(text, text)
+
+
+@functools.lru_cache(maxsize=1024)
+def unit_factor(from_unit, to_unit):
+    # Multiplier taking a quantity in from_unit to to_unit, or None when the units cannot be compared
+    source, target = unit_key(from_unit), unit_key(to_unit)
+    if source == target:
+        return 1.0
+    if source in MASS_IN_KG and target in MASS_IN_KG:
+        return MASS_IN_KG[source] / MASS_IN_KG[target]
+    return None
+
+
+class MaterialCatalog:
+    """Alias map from normalized BOM spellings to one canonical material name."""
+
+    def __init__(self, rows):
+        self._aliases = {}
+        for row in rows:
+            name = row["name"].strip()
+            for alias in [name, *row["aliases"]]:
+                key = material_key(alias)
+                if key:
+                    self._aliases.setdefault(key, name)
+        self.canonical = functools.lru_cache(maxsize=4096)(self._canonical)
+
+    @classmethod
+    def from_csv(cls, path=MATERIAL_ALIASES_PATH):
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = [
+                {**row, "aliases": [a for a in (row.get("aliases") or "").split("|") if a.strip()]}
+                for row in csv.DictReader(f)
+            ]
+        return cls(rows)
+
+    def _canonical(self, name):
+        # Unknown materials still collapse case, spacing, plurals and grades onto one title-cased name
+        key = material_key(name)
+        if not key:
+            return str(name or "").strip()
+        return self._aliases.get(key) or key.title()
+
+    def names(self):
+        return sorted(set(self._aliases.values()))
+
+
+_catalog = None
+_lock = threading.Lock()
+
+
+def get_material_catalog():
+    global _catalog
+    if _catalog is None:
+        with _lock:
+            if _catalog is None:
+                _catalog = MaterialCatalog.from_csv()
+    return _catalog
+
+
+def canonical_material(name):
+    return get_material_catalog().canonical(name)
@@ -0,0 +1,184 @@
+import os
+import time
+import sqlite3
+import threading
+import logging
+from collections import namedtuple
+
+from utils.cache import CACHE_DIR
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PRICE_OBSERVATIONS_DB = os.getenv("PRICE_OBSERVATIONS_DB", os.path.join(CACHE_DIR, "price_observations.sqlite3"))
+# Percentiles are taken over the most recent observations of a group
+AGGREGATE_WINDOW = int(os.getenv("PRICE_AGGREGATE_WINDOW", "200"))
+# An aggregate answers queries on its own when it is at most this old and has this many observations
+AGGREGATE_MAX_AGE = float(os.getenv("PRICE_AGGREGATE_MAX_AGE", str(7 * 86400)))
+AGGREGATE_MIN_COUNT = int(os.getenv("PRICE_AGGREGATE_MIN_COUNT", "5"))
+
+# updated_at is the group's newest observed_at, so a re-seen quote cannot make an aggregate look fresh
+Aggregate = namedtuple("Aggregate", ["kind", "subject", "location_key", "unit", "count", "p25", "median", "p75", "low", "high", "updated_at"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    location_key TEXT NOT NULL,
+    amount REAL NOT NULL,
+    unit TEXT NOT NULL DEFAULT '',
+    vendor TEXT NOT NULL DEFAULT '',
+    city TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    observed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_observations_group ON observations (kind, subject, location_key, unit, observed_at);
+-- The same quote seen again (e.g. an old page crawled again) keeps its first timestamp and adds no row
+CREATE UNIQUE INDEX IF NOT EXISTS idx_observations_quote ON observations (kind, subject, location_key, unit, amount, vendor, city, source);
+CREATE TABLE IF NOT EXISTS aggregates (
+    kind TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    location_key TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    p25 REAL NOT NULL,
+    median REAL NOT NULL,
+    p75 REAL NOT NULL,
+    low REAL NOT NULL,
+    high REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (kind, subject, location_key, unit)
+) WITHOUT ROWID;
+"""
+
+
+def normalize_subject(text):
+    # "Residential Construction" and "residential" share one group
+    words = str(text or "").lower().split()
+    return " ".join(w for w in words if w != "construction") or "general"
+
+
+def normalize_unit(unit):
+    return " ".join(str(unit or "").lower().split())
+
+
+def quantile(sorted_values, q):
+    # Linear interpolation between closest ranks
+    position = (len(sorted_values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def is_fresh(aggregate, now=None, max_age=AGGREGATE_MAX_AGE, min_count=AGGREGATE_MIN_COUNT):
+    if aggregate is None:
+        return False
+    now = time.time() if now is None else now
+    return aggregate.count >= min_count and now - aggregate.updated_at <= max_age
+
+
+def format_amount(amount):
+    return f"₹{amount:,.0f}" if amount >= 100 else f"₹{amount:,.2f}".rstrip("0").rstrip(".")
+
+
+def format_aggregate(aggregate):
+    unit = f" {aggregate.unit}" if aggregate.unit else ""
+    return (f"{format_amount(aggregate.median)}{unit} median "
+            f"(p25 {format_amount(aggregate.p25)}, p75 {format_amount(aggregate.p75)}, {aggregate.count} quotes)")
+
+
+class PriceObservationStore:
+    """Extracted prices as observations on SQLite, with per-group p25/median/p75 kept up to date on write."""
+
+    def __init__(self, path=PRICE_OBSERVATIONS_DB, window=AGGREGATE_WINDOW):
+        self.path = path
+        self.window = window
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def record(self, kind, subject, location_keys, records, source=""):
+        # Stores each PriceRecord once per location key and refreshes only the groups it touched
+        subject = normalize_subject(subject)
+        now = time.time()
+        rows, groups = [], set()
+        for location_key in dict.fromkeys(k for k in location_keys if k):
+            for record in records:
+                unit = normalize_unit(record.unit)
+                rows.append((kind, subject, location_key, record.amount, unit, record.vendor or "", record.city or "",
+                             record.source_url or source or "", now))
+                groups.add((kind, subject, location_key, unit))
+        if not rows:
+            return 0
+        with self._lock:
+            try:
+                self._conn.executemany(
+                    "INSERT INTO observations (kind, subject, location_key, amount, unit, vendor, city, source, observed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (kind, subject, location_key, unit, amount, vendor, city, source) "
+                    "DO NOTHING", rows
+                )
+                for group in groups:
+                    self._refresh(group)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return len(rows)
+
+    def _refresh(self, group):
+        # Reads the group's most recent window through the group index
+        rows = self._conn.execute(
+            "SELECT amount, observed_at FROM observations WHERE kind = ? AND subject = ? AND location_key = ? AND unit = ? "
+            "ORDER BY observed_at DESC LIMIT ?", (*group, self.window)
+        ).fetchall()
+        amounts = sorted(r[0] for r in rows)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO aggregates (kind, subject, location_key, unit, count, p25, median, p75, low, high, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (*group, len(amounts), quantile(amounts, 0.25), quantile(amounts, 0.5), quantile(amounts, 0.75),
+             amounts[0], amounts[-1], rows[0][1]),
+        )
+
+    def aggregates(self, kind, subject, location_key):
+        # All unit groups for one subject/location, densest first
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(Aggregate._fields)} FROM aggregates WHERE kind = ? AND subject = ? AND location_key = ? "
+                "ORDER BY count DESC", (kind, normalize_subject(subject), location_key)
+            ).fetchall()
+        return [Aggregate(*row) for row in rows]
+
+    def aggregate(self, kind, subject, location_key):
+        rows = self.aggregates(kind, subject, location_key)
+        return rows[0] if rows else None
+
+    def observations(self, kind, subject, location_key, limit=50):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT amount, unit, vendor, city, source, observed_at FROM observations "
+                "WHERE kind = ? AND subject = ? AND location_key = ? ORDER BY observed_at DESC LIMIT ?",
+                (kind, normalize_subject(subject), location_key, limit),
+            ).fetchall()
+        return [dict(zip(("amount", "unit", "vendor", "city", "source", "observed_at"), row)) for row in rows]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_observation_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PriceObservationStore()
+    return _store
@@ -0,0 +1,274 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import logging
+
+from utils.cache import CACHE_DIR
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PRICE_SERIES_DIR = os.getenv("PRICE_SERIES_DIR", os.path.join(CACHE_DIR, "price_series"))
+# The material agent serves a stored price without searching when it is at most this old
+PRICE_SERIES_MAX_AGE = float(os.getenv("PRICE_SERIES_MAX_AGE", "86400"))
+DEFAULT_REGION = "India"
+DAY = 86400.0
+
+# One fixed-size little-endian record per observation: 18 bytes, no header, no parsing on load
+RECORD_FIELDS = [("ts", "<f8"), ("price", "<f8"), ("unit", "<u2")]
+_SLUG = re.compile(r"[^a-z0-9]+")
+# Unit name <-> code registry, shared by every process writing to the same directory; codes never change once given
+UNITS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    code INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+INSERT OR IGNORE INTO units (code, name) VALUES (0, '');
+"""
+
+
+def _dtype():
+    # numpy is imported on first use so the agents path stays cheap to import
+    import numpy as np
+    return np.dtype(RECORD_FIELDS)
+
+
+def series_slug(material, region=DEFAULT_REGION):
+    return f"{_SLUG.sub('-', str(material).lower()).strip('-')}__{_SLUG.sub('-', str(region).lower()).strip('-')}"
+
+
+def parse_window(window):
+    # int -> last N points; "30d" / "12h" / seconds (float) -> time window
+    if isinstance(window, int):
+        return "count", window
+    if isinstance(window, str):
+        match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([dhm]?)\s*", window.lower())
+        if not match:
+            raise ValueError(f"Unrecognized window: {window!r}")
+        scale = {"d": DAY, "h": 3600.0, "m": 60.0, "": 1.0}[match.group(2)]
+        return "time", float(match.group(1)) * scale
+    return "time", float(window)
+
+
+def _sparse_table(values, reducer):
+    # levels[k][i] = reducer over values[i : i + 2**k]; built once, then any range is two lookups
+    levels = [values]
+    width = 1
+    while width * 2 <= len(values):
+        previous = levels[-1]
+        levels.append(reducer(previous[:-width], previous[width:]))
+        width *= 2
+    return levels
+
+
+def _range_query(levels, starts, ends, reducer):
+    # Vectorized reducer over values[starts[i] : ends[i] + 1] for every i
+    import numpy as np
+    lengths = ends - starts + 1
+    k = np.floor(np.log2(lengths)).astype(np.int64)
+    result = np.empty(len(starts), dtype=levels[0].dtype)
+    for level in np.unique(k):
+        mask = k == level
+        table = levels[level]
+        result[mask] = reducer(table[starts[mask]], table[ends[mask] - (1 << level) + 1])
+    return result
+
+
+def rolling_stats(ts, prices, window):
+    """Rolling mean/min/max/volatility ending at every point, over a count or time window.
+
+    Volatility is the sample standard deviation of log returns inside the window.
+    """
+    import numpy as np
+    ts = np.asarray(ts, dtype=np.float64)
+    prices = np.asarray(prices, dtype=np.float64)
+    n = len(prices)
+    ends = np.arange(n)
+    kind, size = parse_window(window)
+    if kind == "count":
+        starts = np.maximum(ends - max(int(size), 1) + 1, 0)
+    else:
+        # Time windows are (t - size, t], as in pandas offset windows
+        starts = np.searchsorted(ts, ts - size, side="right")
+    counts = ends - starts + 1
+    if n == 0:
+        empty = np.empty(0)
+        return {"ts": ts, "price": prices, "count": counts, "mean": empty, "min": empty, "max": empty, "volatility": empty}
+
+    csum = np.concatenate(([0.0], np.cumsum(prices)))
+    mean = (csum[ends + 1] - csum[starts]) / counts
+    low = _range_query(_sparse_table(prices, np.minimum), starts, ends, np.minimum)
+    high = _range_query(_sparse_table(prices, np.maximum), starts, ends, np.maximum)
+
+    # Log return r[i] is from point i-1 to i; a window [s, e] holds returns s+1..e
+    returns = np.zeros(n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[1:] = np.log(prices[1:] / prices[:-1])
+    returns = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+    rsum = np.concatenate(([0.0], np.cumsum(returns)))
+    rsq = np.concatenate(([0.0], np.cumsum(returns * returns)))
+    m = counts - 1
+    s1 = rsum[ends + 1] - rsum[starts + 1]
+    s2 = rsq[ends + 1] - rsq[starts + 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = (s2 - s1 * s1 / m) / (m - 1)
+    volatility = np.where(m > 1, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+    return {"ts": ts, "price": prices, "count": counts, "mean": mean, "min": low, "max": high, "volatility": volatility}
+
+
+class PriceSeriesStore:
+    """Append-only per-material/region price series in flat binary files, read back as NumPy memmaps."""
+
+    def __init__(self, root=PRICE_SERIES_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._maps = {}
+        self._units_conn = sqlite3.connect(os.path.join(root, "units.sqlite3"), timeout=30, check_same_thread=False)
+        self._units_conn.execute("PRAGMA journal_mode=WAL")
+        self._units_conn.executescript(UNITS_SCHEMA)
+        self._import_legacy_units(os.path.join(root, "units.json"))
+        self._units, self._unit_names = {}, {}
+        self._reload_units()
+
+    def _import_legacy_units(self, path):
+        # Directories written before the SQLite registry keep their codes; the JSON file is left in place
+        try:
+            with open(path, encoding="utf-8") as f:
+                legacy = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._units_conn:
+            self._units_conn.executemany("INSERT OR IGNORE INTO units (code, name) VALUES (?, ?)",
+                                         [(int(code), name) for name, code in legacy.items()])
+
+    def _reload_units(self):
+        rows = self._units_conn.execute("SELECT code, name FROM units").fetchall()
+        self._units = {name: code for code, name in rows}
+        self._unit_names = {code: name for code, name in rows}
+
+    def _path(self, material, region):
+        return os.path.join(self.root, series_slug(material, region) + ".bin")
+
+    def unit_code(self, unit):
+        unit = " ".join(str(unit or "").lower().split())
+        code = self._units.get(unit)
+        if code is None:
+            with self._lock:
+                # The insert takes the next free code under SQLite's write lock, so processes never share a code;
+                # if another process registered the unit first, its code is the one read back
+                with self._units_conn:
+                    self._units_conn.execute(
+                        "INSERT OR IGNORE INTO units (code, name) SELECT COALESCE(MAX(code), 0) + 1, ? FROM units", (unit,)
+                    )
+                self._reload_units()
+                code = self._units[unit]
+        return code
+
+    def unit_name(self, code):
+        code = int(code)
+        if code not in self._unit_names:
+            # Registered by another process since this one last looked
+            with self._lock:
+                self._reload_units()
+        return self._unit_names.get(code, "")
+
+    def append_many(self, material, region, ts, prices, units=None):
+        # Timestamps must not go backwards; history is only ever appended
+        import numpy as np
+        ts = np.asarray(ts, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(ts) != len(prices):
+            raise ValueError("ts and prices must have the same length")
+        if len(ts) == 0:
+            return 0
+        if isinstance(units, (list, tuple)):
+            codes = np.array([self.unit_code(u) for u in units], dtype=np.uint16)
+        else:
+            codes = np.full(len(ts), self.unit_code(units), dtype=np.uint16)
+        records = np.empty(len(ts), dtype=_dtype())
+        records["ts"], records["price"], records["unit"] = ts, prices, codes
+        path = self._path(material, region)
+        with self._lock:
+            last = self._last_ts(path)
+            if np.any(np.diff(ts) < 0) or (last is not None and ts[0] < last):
+                raise ValueError(f"Out-of-order timestamps for {material} ({region})")
+            with open(path, "ab") as f:
+                f.write(records.tobytes())
+            self._maps.pop(path, None)
+        return len(records)
+
+    def append(self, material, price, unit=None, region=DEFAULT_REGION, ts=None):
+        return self.append_many(material, region, [time.time() if ts is None else ts], [price], unit)
+
+    def _last_ts(self, path):
+        import numpy as np
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        itemsize = _dtype().itemsize
+        if size < itemsize:
+            return None
+        with open(path, "rb") as f:
+            f.seek(size - size % itemsize - itemsize)
+            return float(np.frombuffer(f.read(itemsize), dtype=_dtype())["ts"][0])
+
+    def load(self, material, region=DEFAULT_REGION):
+        # Zero-copy view of the whole series; remapped only when the file has grown
+        import numpy as np
+        path = self._path(material, region)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        count = size // _dtype().itemsize
+        if count == 0:
+            return np.empty(0, dtype=_dtype())
+        with self._lock:
+            cached = self._maps.get(path)
+            if cached is None or len(cached) != count:
+                cached = np.memmap(path, dtype=_dtype(), mode="r", shape=(count,))
+                self._maps[path] = cached
+        return cached
+
+    def window(self, material, region=DEFAULT_REGION, start=None, end=None):
+        import numpy as np
+        series = self.load(material, region)
+        ts = series["ts"]
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+        hi = len(series) if end is None else int(np.searchsorted(ts, end, side="right"))
+        return series[lo:hi]
+
+    def latest(self, material, region=DEFAULT_REGION):
+        series = self.load(material, region)
+        if len(series) == 0:
+            return None
+        record = series[-1]
+        return {"ts": float(record["ts"]), "price": float(record["price"]), "unit": self.unit_name(record["unit"])}
+
+    def fresh_price(self, material, region=DEFAULT_REGION, max_age=PRICE_SERIES_MAX_AGE, now=None):
+        latest = self.latest(material, region)
+        now = time.time() if now is None else now
+        if latest is None or now - latest["ts"] > max_age:
+            return None
+        return latest
+
+    def rolling(self, material, window, region=DEFAULT_REGION, start=None, end=None):
+        series = self.window(material, region, start, end)
+        return rolling_stats(series["ts"], series["price"], window)
+
+    def series(self):
+        # (material slug, region slug) for every stored series
+        return sorted(tuple(name[:-4].split("__", 1)) for name in os.listdir(self.root) if name.endswith(".bin"))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_series_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PriceSeriesStore()
+    return _store
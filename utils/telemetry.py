@@ -0,0 +1,236 @@
+import os
+import json
+import time
+import random
+import threading
+import functools
+import logging
+from collections import deque
+from contextlib import contextmanager
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rolling window per histogram; percentiles are computed over the most recent samples
+HISTOGRAM_WINDOW = int(os.getenv("METRICS_HISTOGRAM_WINDOW", "2048"))
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", "")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Full payload logging is opt-in and sampled
+LOG_PAYLOADS = os.getenv("LOG_PAYLOADS", "0") not in ("0", "false", "False", "")
+PAYLOAD_LOG_SAMPLE_RATE = float(os.getenv("PAYLOAD_LOG_SAMPLE_RATE", "0.1"))
+PAYLOAD_LOG_MAX_CHARS = int(os.getenv("PAYLOAD_LOG_MAX_CHARS", "2000"))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Rolling-window latency histogram with lifetime count and sum."""
+
+    def __init__(self, window=HISTOGRAM_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        with self._lock:
+            self._samples.append(value)
+            self.count += 1
+            self.total += value
+
+    def percentiles(self, quantiles=QUANTILES):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {q: 0.0 for q in quantiles}
+        last = len(samples) - 1
+        return {q: samples[min(last, int(round(q * last)))] for q in quantiles}
+
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_trace_lock = threading.Lock()
+_trace_file = None
+
+
+def _histogram(name):
+    histogram = _histograms.get(name)
+    if histogram is None:
+        with _lock:
+            histogram = _histograms.setdefault(name, Histogram())
+    return histogram
+
+
+def increment(name, value=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name, seconds):
+    _histogram(name).observe(seconds)
+
+
+class Span:
+    __slots__ = ("name", "start", "attributes")
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.start = time.perf_counter()
+        self.attributes = attributes
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+def _export(record):
+    global _trace_file
+    if not TRACE_JSONL_PATH:
+        return
+    line = json.dumps(record, default=str)
+    with _trace_lock:
+        try:
+            if _trace_file is None:
+                _trace_file = open(TRACE_JSONL_PATH, "a", buffering=1)
+            _trace_file.write(line + "\n")
+        except Exception as e:
+            logger.warning(f"Trace export failed: {str(e)}")
+
+
+@contextmanager
+def span(name, **attributes):
+    # Records duration, error class and any attributes set on the span (payload_bytes, cache_hit, coalesced, ...)
+    current = Span(name, attributes)
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes.setdefault("error_class", type(e).__name__)
+        raise
+    finally:
+        duration = time.perf_counter() - current.start
+        observe(name, duration)
+        increment(f"{name}.calls")
+        error_class = current.attributes.get("error_class")
+        if error_class:
+            increment(f"{name}.errors")
+            increment(f"{name}.errors.{error_class}")
+        cache_hit = current.attributes.get("cache_hit")
+        if cache_hit is not None:
+            increment(f"{name}.cache_hits" if cache_hit else f"{name}.cache_misses")
+        if current.attributes.get("coalesced"):
+            increment(f"{name}.coalesced")
+        if "payload_bytes" in current.attributes:
+            increment(f"{name}.payload_bytes", current.attributes["payload_bytes"])
+        _export({"ts": time.time(), "span": name, "duration_ms": round(duration * 1000, 3), **current.attributes})
+
+
+def traced(name):
+    # Decorator for agents: a dict result carrying "error" marks the span as failed
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name) as current:
+                result = func(*args, **kwargs)
+                if isinstance(result, dict) and result.get("error"):
+                    current.set(error_class="AgentError")
+                return result
+        return wrapper
+    return decorator
+
+
+def log_payload(log, message, payload):
+    # Sampled DEBUG output of a full payload; a no-op unless LOG_PAYLOADS is enabled
+    if not LOG_PAYLOADS or not log.isEnabledFor(logging.DEBUG):
+        return
+    if random.random() >= PAYLOAD_LOG_SAMPLE_RATE:
+        return
+    text = str(payload)
+    if len(text) > PAYLOAD_LOG_MAX_CHARS:
+        text = text[:PAYLOAD_LOG_MAX_CHARS] + f"... ({len(text)} chars)"
+    log.debug(f"{message}: {text}")
+
+
+def snapshot():
+    # Per-span latency summary plus raw counters, e.g. for the Streamlit sidebar
+    with _lock:
+        histograms = dict(_histograms)
+        counters = dict(_counters)
+    spans = {}
+    for name, histogram in sorted(histograms.items()):
+        p = histogram.percentiles()
+        spans[name] = {
+            "count": histogram.count,
+            "p50_ms": p[0.5] * 1000,
+            "p95_ms": p[0.95] * 1000,
+            "p99_ms": p[0.99] * 1000,
+            "errors": counters.get(f"{name}.errors", 0),
+            "cache_hits": counters.get(f"{name}.cache_hits", 0),
+            "coalesced": counters.get(f"{name}.coalesced", 0),
+        }
+    return {"spans": spans, "counters": counters}
+
+
+def _metric_name(name):
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+def render_prometheus():
+    with _lock:
+        histograms = dict(_histograms)
+        counters = dict(_counters)
+    lines = ["# TYPE span_duration_seconds summary"]
+    for name, histogram in sorted(histograms.items()):
+        for q, value in histogram.percentiles().items():
+            lines.append(f'span_duration_seconds{{span="{name}",quantile="{q}"}} {value:.6f}')
+        lines.append(f'span_duration_seconds_count{{span="{name}"}} {histogram.count}')
+        lines.append(f'span_duration_seconds_sum{{span="{name}"}} {histogram.total:.6f}')
+    for name, value in sorted(counters.items()):
+        metric = _metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+_server = None
+
+
+def start_metrics_server(port=METRICS_PORT):
+    # Serves render_prometheus() at /metrics from a daemon thread; idempotent per process
+    global _server
+    if not port or _server is not None:
+        return _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+            except OSError as e:
+                logger.error(f"Could not start metrics server on port {port}: {str(e)}")
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+            logger.info(f"Metrics server listening on :{port}/metrics")
+    return _server
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
@@ -0,0 +1,364 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from datetime import datetime
+
+from utils.cache import CACHE_DIR
+from utils.gazetteer import resolve_location
+from utils.telemetry import span, increment
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TENDERS_DB = os.getenv("TENDERS_DB", os.path.join(CACHE_DIR, "tenders.sqlite3"))
+# Comma-separated JSON feeds; each returns a list of projects (or {"projects": [...]})
+TENDER_SOURCES = [url.strip() for url in os.getenv("TENDER_SOURCES", "https://api.example.com/govt_projects").split(",") if url.strip()]
+TENDER_POLL_INTERVAL = float(os.getenv("TENDER_POLL_INTERVAL", "900"))
+TENDER_POLL_TIMEOUT = float(os.getenv("TENDER_POLL_TIMEOUT", "10"))
+
+# Cost bands in ₹ crore: (label, lower bound inclusive)
+COST_BANDS = [("Under ₹100 crore", 0), ("₹100–1,000 crore", 100), ("₹1,000–10,000 crore", 1000), ("Over ₹10,000 crore", 10000)]
+UNKNOWN = "Unknown"
+
+# Sample tenders shown until a feed has been fetched (previously the tab's hard-coded fallback)
+SEED_TENDERS = [
+    {
+        "name": "Mumbai Coastal Road Phase 2",
+        "location": "Mumbai, Maharashtra",
+        "status": "Tendering (Opens Jul 15, 2025)",
+        "cost": "₹12,000 crore",
+        "tender_deadline": "Aug 10, 2025",
+        "apply_process": "Submit bids via Mumbai Metropolitan Region Development Authority (MMRDA) at mmrda.maharashtra.gov.in. Required: Technical proposal, financial bid, experience certificate.",
+        "contact": "MMRDA Office, Mumbai"
+    },
+    {
+        "name": "Hyderabad Metro Expansion",
+        "location": "Hyderabad, Telangana",
+        "status": "Planning (Tender opens Jul 20, 2025)",
+        "cost": "₹15,000 crore",
+        "tender_deadline": "Sep 5, 2025",
+        "apply_process": "Apply through Hyderabad Metro Rail Limited (HMRL) at hmrl.co.in. Submit pre-qualification and bid documents.",
+        "contact": "HMRL Office, Hyderabad"
+    }
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tenders (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    location TEXT NOT NULL DEFAULT '',
+    state TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT '',
+    cost TEXT NOT NULL DEFAULT '',
+    cost_crore REAL,
+    cost_band TEXT NOT NULL,
+    deadline TEXT,
+    tender_deadline TEXT NOT NULL DEFAULT '',
+    apply_process TEXT NOT NULL DEFAULT '',
+    contact TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    digest TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tenders_state_deadline ON tenders (state, deadline);
+CREATE INDEX IF NOT EXISTS idx_tenders_band_deadline ON tenders (cost_band, deadline);
+CREATE INDEX IF NOT EXISTS idx_tenders_deadline ON tenders (deadline);
+CREATE TABLE IF NOT EXISTS sources (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    polled_at REAL,
+    status INTEGER,
+    error TEXT
+);
+"""
+
+COST_PATTERN = re.compile(r"([\d,]+(?:\.\d+)?)\s*(crore|cr|lakh|lac)?", re.IGNORECASE)
+DATE_FORMATS = ("%b %d, %Y", "%B %d, %Y", "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%d %b %Y", "%d %B %Y")
+
+
+def parse_cost_crore(text):
+    # "₹12,000 crore" -> 12000.0; lakh amounts are converted, bare numbers are taken as crore
+    match = COST_PATTERN.search(str(text or ""))
+    if not match:
+        return None
+    value = float(match.group(1).replace(",", "") or 0)
+    unit = (match.group(2) or "crore").lower()
+    return value / 100 if unit in ("lakh", "lac") else value
+
+
+def cost_band(cost_crore):
+    if cost_crore is None:
+        return UNKNOWN
+    label = COST_BANDS[0][0]
+    for name, lower in COST_BANDS:
+        if cost_crore >= lower:
+            label = name
+    return label
+
+
+def parse_deadline(text):
+    text = str(text or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def tender_id(project):
+    # Feed ids when present, otherwise a stable hash of name and location
+    if project.get("id"):
+        return str(project["id"])
+    basis = f"{project.get('name', '')}|{project.get('location', '')}".lower()
+    return hashlib.sha1(basis.encode("utf-8")).hexdigest()[:16]
+
+
+def tender_state(project, location):
+    # Canonical state name via the gazetteer ("Jaipur" -> Rajasthan, "Navi Mumbai, MH" -> Maharashtra) so the
+    # state filter sees one spelling; the feed's own field, then the last part of the location, as a last resort
+    given = str(project.get("state") or "").strip()
+    for text in (given, location):
+        place = resolve_location(text).place if text else None
+        if place is not None:
+            return place.state
+    return given or location.split(",")[-1].strip()
+
+
+def normalize_tender(project, source=""):
+    location = str(project.get("location") or "")
+    cost_crore = parse_cost_crore(project.get("cost"))
+    row = {
+        "id": tender_id(project),
+        "name": str(project.get("name") or "Unnamed project"),
+        "location": location,
+        "state": tender_state(project, location),
+        "status": str(project.get("status") or ""),
+        "cost": str(project.get("cost") or ""),
+        "cost_crore": cost_crore,
+        "cost_band": cost_band(cost_crore),
+        "deadline": parse_deadline(project.get("tender_deadline")),
+        "tender_deadline": str(project.get("tender_deadline") or ""),
+        "apply_process": str(project.get("apply_process") or ""),
+        "contact": str(project.get("contact") or ""),
+        "source": source,
+    }
+    row["digest"] = hashlib.sha1(json.dumps(row, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return row
+
+
+COLUMNS = ["id", "name", "location", "state", "status", "cost", "cost_crore", "cost_band", "deadline",
+           "tender_deadline", "apply_process", "contact", "source", "digest", "updated_at"]
+
+
+class TenderStore:
+    """Local SQLite copy of tender feeds, indexed by state, deadline and cost band."""
+
+    def __init__(self, path=TENDERS_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def merge(self, projects, source=""):
+        # Upsert by id; rows whose content digest is unchanged are left alone
+        rows = [normalize_tender(p, source) for p in projects if isinstance(p, dict)]
+        now = time.time()
+        with self._lock:
+            before = self._conn.total_changes
+            existing = set()
+            ids = [r["id"] for r in rows]
+            # Chunked to stay under SQLite's bound-parameter limit on older builds
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                existing.update(row[0] for row in self._conn.execute(
+                    f"SELECT id FROM tenders WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                ))
+            self._conn.executemany(
+                f"INSERT INTO tenders ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+                "ON CONFLICT (id) DO UPDATE SET "
+                + ", ".join(f"{c} = excluded.{c}" for c in COLUMNS[1:])
+                + " WHERE tenders.digest != excluded.digest",
+                [[*(r[c] for c in COLUMNS[:-1]), now] for r in rows],
+            )
+            self._conn.commit()
+            changed = self._conn.total_changes - before
+        inserted = sum(1 for r in rows if r["id"] not in existing)
+        return {"inserted": inserted, "updated": changed - inserted, "unchanged": len(rows) - changed}
+
+    def remove_source(self, source):
+        # Drops every tender merged from one source; returns how many went
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM tenders WHERE source = ?", (source,)).rowcount
+            self._conn.commit()
+        return removed
+
+    def _filters(self, state=None, cost_bands=None, deadline_from=None, deadline_to=None, search=None):
+        clauses, params = [], []
+        if state:
+            clauses.append("state = ?")
+            params.append(state)
+        if cost_bands:
+            clauses.append(f"cost_band IN ({','.join('?' * len(cost_bands))})")
+            params.extend(cost_bands)
+        if deadline_from:
+            clauses.append("deadline >= ?")
+            params.append(str(deadline_from))
+        if deadline_to:
+            clauses.append("deadline <= ?")
+            params.append(str(deadline_to))
+        if search:
+            clauses.append("(name LIKE ? OR location LIKE ?)")
+            params.extend([f"%{search}%"] * 2)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, limit=20, offset=0, **filters):
+        # Soonest deadline first; undated tenders last
+        where, params = self._filters(**filters)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM tenders{where} "
+                "ORDER BY deadline IS NULL, deadline, name LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            )
+            return [dict(zip(COLUMNS, row)) for row in cursor]
+
+    def count(self, **filters):
+        where, params = self._filters(**filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM tenders{where}", params).fetchone()[0]
+
+    def states(self):
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT DISTINCT state FROM tenders WHERE state != '' ORDER BY state")]
+
+    def source_state(self, url):
+        with self._lock:
+            row = self._conn.execute("SELECT etag, last_modified FROM sources WHERE url = ?", (url,)).fetchone()
+        return {"etag": row[0], "last_modified": row[1]} if row else {}
+
+    def save_source_state(self, url, status, etag=None, last_modified=None, error=None):
+        # A 304 or failed poll keeps the validators from the last successful fetch
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sources (url, etag, last_modified, polled_at, status, error) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (url) DO UPDATE SET etag = COALESCE(excluded.etag, etag), "
+                "last_modified = COALESCE(excluded.last_modified, last_modified), "
+                "polled_at = excluded.polled_at, status = excluded.status, error = excluded.error",
+                (url, etag, last_modified, time.time(), status, error),
+            )
+            self._conn.commit()
+
+    def sources(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT url, polled_at, status, error FROM sources ORDER BY url").fetchall()
+        return [{"url": r[0], "polled_at": r[1], "status": r[2], "error": r[3]} for r in rows]
+
+
+def _feed_items(payload):
+    if isinstance(payload, dict):
+        payload = payload.get("projects") or payload.get("tenders") or payload.get("results") or []
+    return payload if isinstance(payload, list) else []
+
+
+# Source recorded for SEED_TENDERS, which fill an empty store until a feed delivers listings
+SAMPLE_SOURCE = "sample"
+
+
+class TenderPoller:
+    """Daemon thread that polls tender feeds with conditional GETs and merges them into a TenderStore."""
+
+    def __init__(self, store, sources=None, interval=TENDER_POLL_INTERVAL):
+        self.store = store
+        self.sources = TENDER_SOURCES if sources is None else sources
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_poll = None
+        if not store.count():
+            store.merge(SEED_TENDERS, source=SAMPLE_SOURCE)
+
+    def poll_source(self, url):
+        from apis.http_transport import get_client
+
+        validators = self.store.source_state(url)
+        headers = {"Accept": "application/json"}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        with span("tenders.poll", source=url) as current:
+            try:
+                response = get_client().get(url, headers=headers, timeout=TENDER_POLL_TIMEOUT)
+            except Exception as e:
+                current.set(error_class=type(e).__name__)
+                logger.warning(f"Tender feed {url} unreachable: {str(e)}")
+                self.store.save_source_state(url, None, error=str(e))
+                return {"status": None, "error": str(e)}
+            current.set(status=response.status_code)
+            if response.status_code == 304:
+                increment("tenders.not_modified")
+                self.store.save_source_state(url, 304)
+                return {"status": 304}
+            if response.status_code != 200:
+                current.set(error_class=f"HTTP{response.status_code}")
+                self.store.save_source_state(url, response.status_code, error=response.text[:200])
+                return {"status": response.status_code, "error": f"HTTP {response.status_code}"}
+            try:
+                items = _feed_items(response.json())
+            except ValueError as e:
+                current.set(error_class="InvalidJSON")
+                self.store.save_source_state(url, 200, error=str(e))
+                return {"status": 200, "error": "Invalid JSON"}
+            current.set(payload_bytes=len(response.content))
+            summary = self.store.merge(items, source=url)
+            if items:
+                # Real listings replace the sample ones for good
+                summary["samples_removed"] = self.store.remove_source(SAMPLE_SOURCE)
+            increment("tenders.merged", summary["inserted"] + summary["updated"])
+            self.store.save_source_state(
+                url, 200, etag=response.headers.get("etag"), last_modified=response.headers.get("last-modified")
+            )
+            logger.info(f"Tender feed {url}: {summary}")
+            return {"status": 200, **summary}
+
+    def poll_once(self):
+        results = {url: self.poll_source(url) for url in self.sources}
+        self.last_poll = time.time()
+        return results
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.error(f"Tender poll failed: {str(e)}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="tender-poller", daemon=True)
+            self._thread.start()
+        return self
+
+    def trigger(self):
+        # Poll now instead of waiting for the next interval; returns immediately
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()